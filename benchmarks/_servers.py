@@ -0,0 +1,49 @@
+"""
+Servers used by the benchmarks: the gateway in a thread of the benchmark, and the mock upstream (`nexura.providers.mock`) in its own process.
+"""
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import typing
+
+import uvicorn
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 5.0):
+    for _ in range(int(timeout / 0.025)):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return
+        except OSError:
+            time.sleep(0.025)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+def serve_in_thread(asgi_app) -> str:
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(asgi_app, port=port, log_level="warning", lifespan="on"))
+    threading.Thread(target=server.run, daemon=True).start()
+    wait_for_port(port)
+
+    return f"http://127.0.0.1:{port}"
+
+
+def serve_mock_upstream(env: typing.Optional[typing.Dict[str, str]] = None) -> typing.Tuple[str, subprocess.Popen]:
+    """
+    Run the mock upstream in a separate process, configured by the `NEXURA_MOCK_*` settings of `env`, so it does not skew in-process measurements.
+    """
+    port = free_port()
+    process = subprocess.Popen([sys.executable, "-m", "nexura.providers.mock", "--port", str(port)], cwd="/", env=os.environ | {"PYTHONPATH": os.getcwd()} | (env or {}))
+    # Importing the app takes a while on a loaded host.
+    wait_for_port(port, timeout=30)
+
+    return f"http://127.0.0.1:{port}", process
@@ -0,0 +1,65 @@
+"""
+API key authentication overhead with and without the in-memory cache, against a SQLite database of 10k keys.
+
+    python -m benchmarks.auth
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from nexura.auth import APIKeyAuthenticator
+from nexura.models import APIKey, User
+
+
+KEYS = 10_000
+REQUESTS = 2_000
+
+
+async def measure(authenticator: APIKeyAuthenticator, keys) -> float:
+    start = time.perf_counter()
+    for i in range(REQUESTS):
+        assert await authenticator.authenticate(keys[i % len(keys)]) is not None
+
+    return (time.perf_counter() - start) / REQUESTS
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(directory, 'auth.db')}")
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        async with engine.begin() as connection:
+            await connection.run_sync(SQLModel.metadata.create_all)
+
+        keys = []
+        async with session_factory() as session:
+            user = User()
+            session.add(user)
+            for _ in range(KEYS):
+                api_key, key = APIKey.create(user.id)
+                session.add(api_key)
+                keys.append(key)
+            await session.commit()
+
+        # A hot set of keys, as in production where a few clients send most of the traffic.
+        hot_keys = keys[:100]
+
+        uncached = await measure(APIKeyAuthenticator(session_factory, ttl=0, negative_ttl=0), hot_keys)
+        print(f"without cache: {uncached * 1e6:8.1f} µs per request")
+
+        authenticator = APIKeyAuthenticator(session_factory)
+        cold = await measure(authenticator, hot_keys)
+        print(f"with cache:    {cold * 1e6:8.1f} µs per request (cold, {len(hot_keys)} misses)")
+        warm = await measure(authenticator, hot_keys)
+        print(f"with cache:    {warm * 1e6:8.1f} µs per request (warm)")
+
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
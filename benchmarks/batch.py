@@ -0,0 +1,82 @@
+"""
+Throughput of offline jobs sending many independent completions: one HTTP call per request against a single `/batch` call, through a gateway and a mock upstream running locally.
+
+    python -m benchmarks.batch
+"""
+import asyncio
+import json
+import time
+
+import httpx
+
+from benchmarks import _servers
+from nexura import config
+from nexura.providers import nexura_provider
+from nexura.routes import batch
+
+
+REQUESTS = 1000
+# Upstream latency of a single completion: TOKENS * TOKEN_DELAY.
+TOKENS = 10
+TOKEN_DELAY = 0.005
+
+
+def item(i: int) -> dict:
+    return {"provider": "openai", "endpoint": "chat-completions", "body": {"model": "gpt-4o", "messages": [{"role": "user", "content": f"Question {i}"}]}}
+
+
+async def one_by_one(client: httpx.AsyncClient, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(i: int):
+        async with semaphore:
+            r = await client.post("/openai/chat-completions", json=item(i)["body"])
+            r.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(i) for i in range(REQUESTS)))
+    return time.perf_counter() - start
+
+
+async def batched(client: httpx.AsyncClient, concurrency: int) -> float:
+    config.BATCH_CONCURRENCY = concurrency
+    batch._semaphores.clear()
+    content = b"\n".join(json.dumps(item(i)).encode() for i in range(REQUESTS))
+
+    start = time.perf_counter()
+    indices = set()
+    async with client.stream("POST", "/batch", content=content) as r:
+        async for line in r.aiter_lines():
+            result = json.loads(line)
+            assert result["status"] == 200, result
+            indices.add(result["index"])
+
+    assert len(indices) == REQUESTS
+    return time.perf_counter() - start
+
+
+async def main():
+    upstream_url, upstream = _servers.serve_mock_upstream({"NEXURA_MOCK_COMPLETION_TOKENS": f"constant:{TOKENS}", "NEXURA_MOCK_TOKEN_DELAY": str(TOKEN_DELAY)})
+    nexura_provider.get_provider("openai").base_url = upstream_url
+
+    from nexura.main import app
+    gateway_url = _servers.serve_in_thread(app)
+
+    print(f"{REQUESTS} requests, {TOKENS * TOKEN_DELAY * 1000:.0f} ms upstream latency each\n")
+    print(f"{'mode':<28} {'in flight':>9} {'time':>8} {'req/s':>8}")
+    try:
+        async with httpx.AsyncClient(base_url=gateway_url, timeout=300, limits=httpx.Limits(max_connections=64)) as client:
+            elapsed = await one_by_one(client, 1)
+            print(f"{'one call per request':<28} {1:>9} {elapsed:>6.1f} s {REQUESTS / elapsed:>8.0f}")
+            elapsed = await one_by_one(client, 32)
+            print(f"{'one call per request':<28} {32:>9} {elapsed:>6.1f} s {REQUESTS / elapsed:>8.0f}")
+
+            for concurrency in (8, 32, 100):
+                elapsed = await batched(client, concurrency)
+                print(f"{'/batch':<28} {concurrency:>9} {elapsed:>6.1f} s {REQUESTS / elapsed:>8.0f}")
+    finally:
+        upstream.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
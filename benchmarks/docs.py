@@ -0,0 +1,125 @@
+"""
+Docs generation with many endpoints and wide request dataclasses: full, incremental with nothing changed, and incremental with one changed endpoint.
+
+    python -m benchmarks.docs
+"""
+import importlib
+import os
+import sys
+import tempfile
+import time
+
+import generate_docs
+from nexura.providers import nexura_provider
+from nexura.utils.dataclass_with_doc import DataclassWithDoc, get_dataclass_attributes_doc
+
+
+ENDPOINTS = 20
+FIELDS = 50
+
+
+def write_module(directory: str, name: str, fields: int):
+    lines = [
+        "from dataclasses import dataclass",
+        "import typing",
+        "",
+        "from nexura.providers.endpoint import Endpoint",
+        "from nexura.utils.dataclass_with_doc import DataclassWithDoc",
+        "",
+        "",
+        "@dataclass",
+        "class _Message(DataclassWithDoc):",
+        "    # The role of the author.",
+        "    role: str",
+        "    # The content of the message.",
+        "    content: str",
+        "",
+        "",
+        "@dataclass",
+        "class Request(DataclassWithDoc):",
+        "    # The conversation.",
+        "    messages: typing.List[_Message]",
+    ]
+    for i in range(fields):
+        lines += [f"    # Description of parameter {i}, [BETA] maybe.", f"    parameter_{i}: typing.Optional[int] = None"]
+    lines += [
+        "",
+        "",
+        "@dataclass",
+        "class Response(DataclassWithDoc):",
+        "    # The generated text.",
+        "    text: str",
+        "",
+        "",
+        "class BenchmarkEndpoint(Endpoint):",
+        '    """',
+        "    Endpoint generated by the docs benchmark.",
+        '    """',
+        "    async def handle_request(self, body: Request) -> Response:",
+        "        raise NotImplementedError",
+    ]
+    with open(os.path.join(directory, f"{name}.py"), "w") as f:
+        f.write("\n".join(lines))
+
+
+def clear_caches():
+    generate_docs.get_dataclass_fields.cache_clear()
+    get_dataclass_attributes_doc.cache_clear()
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    sys.path.insert(0, directory)
+
+    from nexura.providers.base import Provider
+
+    provider = Provider("Benchmark", "http://127.0.0.1", "key")
+    for i in range(ENDPOINTS):
+        write_module(directory, f"bench_endpoint_{i}", FIELDS)
+        module = importlib.import_module(f"bench_endpoint_{i}")
+        provider.add_endpoint(module.BenchmarkEndpoint(f"Endpoint {i}", "POST", f"/endpoint/{i}"))
+    nexura_provider.add_provider(provider)
+    # Import the built-in providers up front, so it isn't counted in the first generation.
+    nexura_provider.load_providers()
+
+    print(f"{ENDPOINTS} endpoints with {FIELDS} documented fields each")
+
+    # The previous generator read the comments of the whole dataclass for every one of its fields.
+    DataclassWithDoc.DOC = classmethod(get_dataclass_attributes_doc.__wrapped__)
+    previous = timed(lambda: [generate_docs.get_dataclass_fields.__wrapped__(e.handle_request.__annotations__["body"]) for e in provider.endpoints.values()])
+    DataclassWithDoc.DOC = classmethod(get_dataclass_attributes_doc)
+    print(f"request schemas, DOC() per field (previous): {previous:8.0f} ms")
+
+    clear_caches()
+    print(f"request schemas, memoized DOC():             {timed(lambda: [generate_docs.get_dataclass_fields(e.handle_request.__annotations__['body']) for e in provider.endpoints.values()]):8.0f} ms")
+
+    clear_caches()
+    data, manifest, regenerated = None, None, 0
+
+    def full():
+        nonlocal data, manifest, regenerated
+        data, manifest, regenerated = generate_docs.read_providers()
+
+    print(f"full generation:                             {timed(full):8.0f} ms, {regenerated} endpoints regenerated")
+
+    clear_caches()
+    result = []
+    t = timed(lambda: result.append(generate_docs.read_providers(data, manifest)))
+    print(f"incremental, nothing changed:                {t:8.0f} ms, {result[-1][2]} endpoints regenerated")
+
+    # Change one endpoint's source.
+    with open(os.path.join(directory, "bench_endpoint_0.py"), "a") as f:
+        f.write("\n# changed\n")
+    clear_caches()
+    t = timed(lambda: result.append(generate_docs.read_providers(data, manifest)))
+    print(f"incremental, one endpoint changed:           {t:8.0f} ms, {result[-1][2]} endpoints regenerated")
+
+
+if __name__ == "__main__":
+    main()
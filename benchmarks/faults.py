@@ -0,0 +1,155 @@
+"""
+Fault injection: endpoint policies (timeouts, retries, circuit breaker) against a local upstream which hangs, flaps, rate limits or goes down.
+
+    python -m benchmarks.faults
+
+Every scenario checks its expected outcome, the script exits with an error if one doesn't hold.
+"""
+import asyncio
+import sys
+import time
+
+import httpx
+
+from benchmarks import _servers
+from nexura.exceptions import CircuitOpenError
+from nexura.providers import nexura_provider
+from nexura.providers.mock import MockSettings, MockUpstream
+from nexura.providers.policy import CLOSED, HALF_OPEN, OPEN, EndpointPolicy
+
+
+# Fault injected by the upstream: `ok`, `hang`, `flap` (every other request fails with 503), `ratelimit` (429 with `Retry-After: 1` once) or `down` (500).
+fault = "ok"
+calls = 0
+
+upstream = MockUpstream(MockSettings(error_rate=0.0))
+
+
+async def app(scope, receive, send):
+    """
+    The mock upstream, behind the fault of the current scenario.
+    """
+    global fault
+    global calls
+    if scope["type"] != "http":
+        return await upstream(scope, receive, send)
+    calls += 1
+
+    if fault == "hang":
+        await asyncio.sleep(3600)
+    status, headers = 200, []
+    if fault == "flap" and calls % 2 == 1:
+        status = 503
+    if fault == "ratelimit":
+        fault = "ok"
+        status, headers = 429, [(b"retry-after", b"1")]
+    if fault == "down":
+        status = 500
+    if status == 200:
+        return await upstream(scope, receive, send)
+
+    await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"application/json"), *headers]})
+    await send({"type": "http.response.body", "body": b'{"error":{"message":"Injected fault","type":"server_error"}}'})
+
+
+endpoint = nexura_provider.get_route("openai", "chat-completions")
+failures = []
+
+
+def use_policy(**kwargs):
+    endpoint.policy = EndpointPolicy(**kwargs)
+    endpoint._breaker = None
+
+
+def inject(name: str):
+    global fault
+    global calls
+    fault, calls = name, 0
+
+
+def check(name: str, condition: bool, detail: str):
+    print(f"{'ok' if condition else 'FAILED':>6}  {name}: {detail}")
+    if not condition:
+        failures.append(name)
+
+
+async def send():
+    body = endpoint.parse_body({"model": "gpt-4o", "messages": [{"role": "user", "content": "Hello"}]})
+    start = time.perf_counter()
+    try:
+        r = await nexura_provider.handle_request("openai", "chat-completions", body=body)
+        outcome = r.status_code
+    except (httpx.HTTPError, CircuitOpenError) as e:
+        outcome = type(e).__name__
+
+    return outcome, time.perf_counter() - start
+
+
+async def hanging_upstream():
+    inject("hang")
+    use_policy(read_timeout=0.2, max_retries=1, retry_base=0.05)
+    outcome, elapsed = await send()
+    check("read timeout", outcome == "ReadTimeout" and calls == 2 and elapsed < 1, f"{outcome} after {calls} attempts in {elapsed:.2f}s")
+
+    use_policy(read_timeout=10, total_timeout=0.5, max_retries=0)
+    outcome, elapsed = await send()
+    check("total timeout", outcome == "TimeoutException" and elapsed < 1, f"{outcome} in {elapsed:.2f}s")
+
+
+async def flapping_upstream():
+    for retries in (0, 2):
+        inject("flap")
+        use_policy(max_retries=retries, retry_base=0.01, breaker_threshold=0)
+        outcomes = [(await send())[0] for _ in range(20)]
+        succeeded = outcomes.count(200)
+        expected = 20 if retries else 10
+        check(f"flapping, {retries} retries", succeeded == expected, f"{succeeded}/20 succeeded with {calls} upstream calls")
+
+
+async def rate_limited_upstream():
+    inject("ratelimit")
+    use_policy(max_retries=2, retry_base=0.01)
+    outcome, elapsed = await send()
+    check("Retry-After", outcome == 200 and 1 <= elapsed < 1.5, f"{outcome} after waiting {elapsed:.2f}s")
+
+    inject("ratelimit")
+    use_policy(max_retries=2, retry_max=0.5)
+    outcome, elapsed = await send()
+    check("Retry-After above the max", outcome == 429 and elapsed < 0.5, f"{outcome} returned in {elapsed:.2f}s")
+
+
+async def down_upstream():
+    inject("down")
+    use_policy(max_retries=0, breaker_threshold=5, breaker_reset_timeout=0.5)
+    outcomes = [await send() for _ in range(50)]
+    rejected = [elapsed for outcome, elapsed in outcomes if outcome == "CircuitOpenError"]
+    check("breaker opens", calls == 5 and len(rejected) == 45 and endpoint.breaker.state == OPEN, f"{calls} upstream calls for 50 requests, rejected in {max(rejected) * 1e6:.0f} µs at most")
+
+    await asyncio.sleep(0.5)
+    check("breaker half-open", endpoint.breaker.state == HALF_OPEN, endpoint.breaker.state)
+    # A single probe goes through while the others are rejected, it fails and the circuit opens again.
+    outcomes = await asyncio.gather(*(send() for _ in range(10)))
+    check("failed probe", calls == 6 and endpoint.breaker.state == OPEN, f"{calls - 5} probe for 10 concurrent requests, {[outcome for outcome, _ in outcomes].count('CircuitOpenError')} rejected")
+
+    inject("ok")
+    await asyncio.sleep(0.5)
+    outcome, _ = await send()
+    check("successful probe", outcome == 200 and endpoint.breaker.state == CLOSED, f"{outcome}, circuit {endpoint.breaker.state}")
+    print(f"        breakers: {nexura_provider.breaker_states()['openai/chat-completions']}")
+
+
+async def main():
+    nexura_provider.get_provider("openai").base_url = _servers.serve_in_thread(app)
+    await nexura_provider.get_provider("openai").close()
+
+    await hanging_upstream()
+    await flapping_upstream()
+    await rate_limited_upstream()
+    await down_upstream()
+
+    if failures:
+        sys.exit(f"{len(failures)} scenarios failed: {', '.join(failures)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""
+Job queue on a local SQLite database: enqueue throughput, draining a backlog, dispatch and completion latency at a steady arrival rate, and dispatch latency of two priorities in a burst.
+
+    python -m benchmarks.jobs
+
+The upstream is mocked in process (`httpx.MockTransport`) with a fixed latency, so only the queue itself is measured.
+"""
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from nexura.jobs import JobQueue
+from nexura.models.job import Job
+from nexura.providers import nexura_provider
+
+
+BACKLOG = 2000
+RATE = 100
+DURATION = 5
+BURST = 1000
+UPSTREAM_LATENCY = 0.05
+CONCURRENCY = 16
+BODY = '{"model":"gpt-4o","messages":[{"role":"user","content":"Hello"}]}'
+
+
+async def upstream(request: httpx.Request) -> httpx.Response:
+    await asyncio.sleep(UPSTREAM_LATENCY)
+    return httpx.Response(200, json={"id": "chatcmpl-1", "choices": [], "created": 0, "model": "gpt-4o", "object": "chat.completion", "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20}})
+
+
+def percentiles(values: list) -> str:
+    values = sorted(values)
+    return f"p50 {statistics.median(values) * 1000:6.1f} ms, p99 {values[int(len(values) * 0.99)] * 1000:6.1f} ms"
+
+
+async def wait_until_done(queue: JobQueue, count: int):
+    while queue.succeeded + queue.failed < count:
+        await asyncio.sleep(0.01)
+
+
+async def main():
+    provider = nexura_provider.get_provider("openai")
+    provider._create_client = lambda: httpx.AsyncClient(base_url="http://upstream", transport=httpx.MockTransport(upstream))
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(directory, 'jobs.db')}")
+        async with engine.begin() as connection:
+            await connection.run_sync(SQLModel.metadata.create_all)
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        queue = JobQueue(session_factory, concurrency=CONCURRENCY, poll_interval=0.1)
+
+        # Enqueue, one at a time and concurrently, with no worker running.
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(BACKLOG // 2):
+            t = time.perf_counter()
+            await queue.submit("key", "openai", "chat-completions", BODY)
+            latencies.append(time.perf_counter() - t)
+        elapsed = time.perf_counter() - start
+        print(f"enqueue, sequential:      {BACKLOG // 2 / elapsed:6.0f} jobs/s, {percentiles(latencies)}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(queue.submit("key", "openai", "chat-completions", BODY) for _ in range(BACKLOG // 2)))
+        print(f"enqueue, 1000 concurrent: {BACKLOG // 2 / (time.perf_counter() - start):6.0f} jobs/s")
+
+        # Drain the backlog.
+        start = time.perf_counter()
+        queue.start()
+        await wait_until_done(queue, BACKLOG)
+        elapsed = time.perf_counter() - start
+        print(f"drain {BACKLOG} jobs:         {BACKLOG / elapsed:6.0f} jobs/s, {CONCURRENCY} at once, upstream ceiling {CONCURRENCY / UPSTREAM_LATENCY:.0f}/s")
+
+        # Steady arrivals, below what the queue can run.
+        start = time.perf_counter()
+        for tick in range(DURATION * RATE):
+            await queue.submit("key", "openai", "chat-completions", BODY)
+            await asyncio.sleep(max(0.0, start + (tick + 1) / RATE - time.perf_counter()))
+        await wait_until_done(queue, BACKLOG + DURATION * RATE)
+
+        # A burst the queue needs several seconds to run, 1 in 10 jobs from a key with a higher priority.
+        await asyncio.gather(*(queue.submit("key", "openai", "chat-completions", BODY, priority=1 if i % 10 == 0 else 0) for i in range(BURST)))
+        await wait_until_done(queue, BACKLOG + DURATION * RATE + BURST)
+        await queue.stop()
+
+        async with session_factory() as session:
+            jobs = (await session.exec(select(Job).order_by(Job.created_at).offset(BACKLOG))).all()
+        await engine.dispose()
+
+    steady, burst = jobs[:DURATION * RATE], jobs[DURATION * RATE:]
+    print(f"\nsteady {RATE} jobs/s for {DURATION} s, {UPSTREAM_LATENCY * 1000:.0f} ms upstream latency:")
+    print(f"  dispatch   {percentiles([(job.started_at - job.created_at).total_seconds() for job in steady])}")
+    print(f"  completion {percentiles([(job.completed_at - job.created_at).total_seconds() for job in steady])}")
+
+    print(f"\nburst of {BURST} jobs, dispatch:")
+    for priority in (1, 0):
+        print(f"  priority {priority}: {percentiles([(job.started_at - job.created_at).total_seconds() for job in burst if job.priority == priority])}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+"""
+Throughput of the usage ledger with 5k synthetic records per second, written to a local SQLite database.
+
+    python -m benchmarks.ledger
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# Imported for its side effect: the tables are registered in the metadata created below.
+import nexura.models  # noqa: F401
+from nexura.ledger import UsageEntry, UsageLedger
+
+
+RATE = 5_000
+DURATION = 5
+TICK = 0.01
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(directory, 'ledger.db')}")
+        async with engine.begin() as connection:
+            await connection.run_sync(SQLModel.metadata.create_all)
+
+        ledger = UsageLedger(async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False), flush_interval=0.5, rollup_interval=1.0)
+        ledger.start()
+
+        per_tick = int(RATE * TICK)
+        record_time = 0.0
+        max_queued = 0
+        start = time.perf_counter()
+        for tick in range(int(DURATION / TICK)):
+            t = time.perf_counter()
+            for i in range(per_tick):
+                ledger.record(UsageEntry(f"key-{i % 100}", "openai", "chat-completions", "gpt-4o", 120, 380, 0.0063, 0.85))
+            record_time += time.perf_counter() - t
+            max_queued = max(max_queued, ledger.queue.qsize())
+
+            # Keep a steady arrival rate, the flusher runs in the gaps.
+            await asyncio.sleep(max(0.0, start + (tick + 1) * TICK - time.perf_counter()))
+
+        produced = time.perf_counter() - start
+        await ledger.stop()
+        drained = time.perf_counter() - start
+        await engine.dispose()
+
+    stats = ledger.stats()
+    print(f"recorded {stats['recorded']} entries in {produced:.2f}s ({stats['recorded'] / produced:.0f}/s), dropped {stats['dropped']}")
+    print(f"flushed {stats['flushed']} entries, fully drained after {drained:.2f}s")
+    print(f"record() cost: {record_time / stats['recorded'] * 1e6:.2f} µs, max queue depth {max_queued}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
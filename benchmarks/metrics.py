@@ -0,0 +1,167 @@
+"""
+Cost of the metrics instrumentation (`NEXURA_METRICS_ENABLED`) per request.
+
+    python -m benchmarks.metrics
+
+The instrumentation is measured alone, replaying what the request path records for a request, then end to end: requests through the whole app, with an in-memory upstream, with metrics disabled and enabled.
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import typing
+
+import httpcore
+
+from nexura.metrics import ConnectionTrace, Metrics
+
+
+RUNS = 7
+REQUESTS = 100000
+E2E_REQUESTS = 3000
+# Label combinations of the replayed requests.
+PROVIDERS = [f"provider-{i}" for i in range(4)]
+MODELS = [f"model-{i}" for i in range(5)]
+STATUSES = [200, 200, 200, 200, 429, 500]
+# `httpcore` trace events of a request on a kept-alive connection.
+TRACE_EVENTS = [
+    "http11.send_request_headers.started", "http11.send_request_headers.complete",
+    "http11.send_request_body.started", "http11.send_request_body.complete",
+    "http11.receive_response_headers.started", "http11.receive_response_headers.complete",
+    "http11.receive_response_body.started", "http11.receive_response_body.complete",
+    "http11.response_closed.started", "http11.response_closed.complete",
+]
+USAGE = {"prompt_tokens": 120, "completion_tokens": 40, "total_tokens": 160}
+
+E2E = """
+import asyncio, json, sys, time
+import httpx
+from nexura.main import app
+from nexura.providers import nexura_provider
+
+UPSTREAM = json.dumps({"id": "x", "object": "chat.completion", "created": 1, "model": "gpt-4o", "choices": [], "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}}).encode()
+
+provider = nexura_provider.get_provider("openai")
+create_client = provider._create_client
+
+def mock_client():
+    client = create_client()
+    client._transport = httpx.MockTransport(lambda request: httpx.Response(200, content=UPSTREAM, headers={"content-type": "application/json"}))
+    return client
+
+provider._create_client = mock_client
+body = {"model": "gpt-4o", "messages": [{"role": "user", "content": "Hello"}], "max_tokens": 16}
+
+async def main(requests):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://nexura") as client:
+        await client.post("/openai/chat-completions", json=body)
+        start = time.perf_counter()
+        for _ in range(requests):
+            await client.post("/openai/chat-completions", json=body)
+        print((time.perf_counter() - start) / requests)
+
+asyncio.run(main(int(sys.argv[1])))
+"""
+
+
+async def replay(metrics: Metrics, requests: int) -> float:
+    """
+    Record the metrics of `requests` requests like the request path does, and return the time per request.
+    """
+    traces = {provider: ConnectionTrace(metrics, (provider,)) for provider in PROVIDERS}
+    request = httpcore.Request("POST", "http://upstream/v1/chat/completions")
+
+    start = time.perf_counter()
+    for i in range(requests):
+        provider, model, status = PROVIDERS[i % 4], MODELS[i % 5], STATUSES[i % 6]
+
+        # Provider event hooks and connection trace, `httpcore` looks the trace up for every event.
+        sent = time.perf_counter()
+        request.extensions["nexura_start"] = sent
+        request.extensions["trace"] = traces[provider]
+        for event in TRACE_EVENTS:
+            trace = request.extensions.get("trace")
+            if trace is not None:
+                await trace(event, {"request": request})
+        metrics.upstream_ttfb.observe((provider,), time.perf_counter() - sent)
+
+        # `NexuraProvider._send`, the handler and `record_usage`.
+        metrics.upstream_duration.observe((provider, "chat", status), 0.25)
+        metrics.observe_usage(provider, "chat", model, USAGE, 0.001, 0.00002)
+        metrics.observe_request(provider, "chat", model, status, 0.26, 0.25, 300, 1200)
+
+    return (time.perf_counter() - start) / requests
+
+
+async def baseline(requests: int) -> float:
+    """
+    The same loop without recording anything: the trace lookups `httpcore` makes anyway.
+    """
+    request = httpcore.Request("POST", "http://upstream/v1/chat/completions")
+
+    start = time.perf_counter()
+    for i in range(requests):
+        for event in TRACE_EVENTS:
+            trace = request.extensions.get("trace")
+            if trace is not None:
+                await trace(event, {"request": request})
+
+    return (time.perf_counter() - start) / requests
+
+
+def usage_accounting() -> float:
+    """
+    Time to read the usage of a response and price it, which metrics need for tokens and cost when neither the ledger nor the rate limiter already does it.
+    """
+    from nexura.providers import nexura_provider
+
+    endpoint = nexura_provider.get_route("openai", "chat-completions")
+    body = endpoint.parse_body({"model": "gpt-4o", "messages": [{"role": "user", "content": "Hello"}]})
+    content = json.dumps({"id": "x", "object": "chat.completion", "created": 1, "model": "gpt-4o", "choices": [{"index": 0, "message": {"role": "assistant", "content": "Hi " * 100}}], "usage": USAGE}).encode()
+
+    times = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        for _ in range(10000):
+            endpoint.calculate_cost(body, endpoint.peek_usage(content))
+        times.append((time.perf_counter() - start) / 10000)
+
+    return min(times)
+
+
+def end_to_end() -> typing.Tuple[float, float]:
+    """
+    Time per request through the app without and with metrics, runs interleaved so load changes affect both alike.
+    """
+    times: typing.Dict[bool, typing.List[float]] = {False: [], True: []}
+    for _ in range(RUNS):
+        for enabled in times:
+            env = os.environ | {"PYTHONPATH": os.getcwd(), "NEXURA_METRICS_ENABLED": str(enabled).lower()}
+            out = subprocess.run([sys.executable, "-c", E2E, str(E2E_REQUESTS)], cwd="/", env=env, capture_output=True, text=True, check=True).stdout
+            times[enabled].append(float(out))
+
+    return min(times[False]), min(times[True])
+
+
+async def main():
+    recorded = min([await replay(Metrics(), REQUESTS) for _ in range(RUNS)])
+    bare = min([await baseline(REQUESTS) for _ in range(RUNS)])
+    print(f"instrumentation per request: {(recorded - bare) * 1e6:.2f} µs ({recorded * 1e6:.2f} µs replayed, {bare * 1e6:.2f} µs without recording)")
+
+    metrics = Metrics()
+    await replay(metrics, REQUESTS)
+    start = time.perf_counter()
+    text = metrics.render()
+    series = len(metrics.requests) + len(metrics.usage) + sum(len(histogram.series) for histogram in (metrics.upstream_duration, metrics.upstream_ttfb, metrics.pool_wait))
+    print(f"render /metrics: {(time.perf_counter() - start) * 1000:.1f} ms for {series} series ({len(text) / 1024:.0f} KiB)")
+
+    print(f"reading and pricing the usage: {usage_accounting() * 1e6:.2f} µs")
+
+    disabled, enabled = end_to_end()
+    print(f"end to end: {disabled * 1e6:.0f} µs per request without metrics, {enabled * 1e6:.0f} µs with ({(enabled - disabled) * 1e6:+.1f} µs)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+"""
+Gateway time per request against the mock upstream (`nexura/providers/mock.py`), answered in-process (`NEXURA_BASE_URLS=openai=mock,edenai=mock`) or over loopback HTTP by a mock upstream process. The upstream answers at once, so the times are the gateway's own work plus the client and, over HTTP, the sockets.
+
+    python -m benchmarks.mock
+"""
+import json
+import os
+import subprocess
+import sys
+import typing
+
+from benchmarks import _servers
+
+
+RUNS = 5
+REQUESTS = 1000
+
+REQUESTS_BY_KIND = {
+    "OpenAI chat completion": ("/openai/chat-completions", {"model": "gpt-4o", "messages": [{"role": "user", "content": "Hello"}], "max_tokens": 64}),
+    "OpenAI streamed, 20 tokens": ("/openai/chat-completions", {"model": "gpt-4o", "messages": [{"role": "user", "content": "Hello"}], "stream": True}),
+    "EdenAI chat": ("/edenai/chat", {"providers": "openai/gpt-4o", "fallback_providers": [], "text": "Hello"}),
+}
+
+E2E = """
+import asyncio, json, sys, time
+import httpx
+from nexura.main import app
+
+path, body = json.loads(sys.argv[1])
+
+async def main(requests):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://nexura") as client:
+        for _ in range(20):
+            r = await client.post(path, json=body)
+            assert r.status_code == 200, r.text
+        start = time.perf_counter()
+        for _ in range(requests):
+            await client.post(path, json=body)
+        print((time.perf_counter() - start) / requests)
+
+asyncio.run(main(int(sys.argv[2])))
+"""
+
+
+def run(base_url: str, path: str, body: typing.Dict[str, typing.Any]) -> float:
+    env = os.environ | {"PYTHONPATH": os.getcwd(), "NEXURA_BASE_URLS": f"openai={base_url},edenai={base_url}", "NEXURA_MOCK_COMPLETION_TOKENS": "constant:20"}
+    out = subprocess.run([sys.executable, "-c", E2E, json.dumps([path, body]), str(REQUESTS)], cwd="/", env=env, capture_output=True, text=True, check=True).stdout
+
+    return float(out)
+
+
+def main():
+    port = _servers.free_port()
+    env = os.environ | {"PYTHONPATH": os.getcwd(), "NEXURA_MOCK_COMPLETION_TOKENS": "constant:20"}
+    upstream = subprocess.Popen([sys.executable, "-m", "nexura.providers.mock", "--port", str(port)], cwd="/", env=env)
+    try:
+        _servers.wait_for_port(port)
+
+        print(f"{'request':<28} {'in-process':>11} {'loopback HTTP':>14}")
+        for kind, (path, body) in REQUESTS_BY_KIND.items():
+            in_process = min(run("mock", path, body) for _ in range(RUNS))
+            loopback = min(run(f"http://127.0.0.1:{port}", path, body) for _ in range(RUNS))
+            print(f"{kind:<28} {in_process * 1e6:>8.0f} µs {loopback * 1e6:>11.0f} µs")
+    finally:
+        upstream.terminate()
+        upstream.wait()
+
+
+if __name__ == "__main__":
+    main()
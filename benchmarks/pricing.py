@@ -0,0 +1,88 @@
+"""
+Month-end repricing of ledger rows: the pricing strategy called row by row against the vectorized batch API.
+
+    python -m benchmarks.pricing [rows]
+
+Rows mix OpenAI models (one of them without a price), EdenAI rows with a reported cost and rows of an unpriced provider, over two versions of the OpenAI price table.
+"""
+import datetime
+import sys
+import time
+
+import numpy as np
+
+from nexura.exceptions import PriceNotFoundError
+from nexura.strategies.pricing.base import PriceVersion, IOPricing
+from nexura.strategies.pricing.engine import PricingEngine
+from nexura.strategies.pricing.openai import OpenAIPricingStrategy
+
+
+ROWS = 10_000_000
+# Rows priced one at a time, the time of all rows is extrapolated from them.
+LOOP_ROWS = 200_000
+PROVIDERS = np.array(["openai", "openai", "openai", "openai", "openai", "edenai", "other"], dtype=object)
+MODELS = np.array(["gpt-4o", "gpt-4o-mini", "gpt-4", "gpt-3.5-turbo", "gpt-5", "openai/gpt-4o", "model"], dtype=object)
+
+
+def ledger(rows: int) -> dict:
+    rng = np.random.default_rng(0)
+    kind = rng.integers(0, len(PROVIDERS), rows)
+    return {
+        "provider_ids": PROVIDERS[kind],
+        "models": MODELS[kind],
+        "prompt_tokens": rng.integers(10, 10000, rows),
+        "completion_tokens": rng.integers(1, 2000, rows),
+        "at": np.datetime64("2024-09-01") + rng.integers(0, 61, rows).astype("timedelta64[D]"),
+        "reported_costs": np.where(PROVIDERS[kind] == "edenai", rng.random(rows) / 100, np.nan),
+    }
+
+
+def engine() -> PricingEngine:
+    engine = PricingEngine()
+    engine.register("openai", OpenAIPricingStrategy([PriceVersion(datetime.date(2024, 10, 2), {"gpt-4o": IOPricing(2.50, 10.00)})]))
+    return engine
+
+
+def loop(engine: PricingEngine, rows: dict) -> list:
+    costs = []
+    for provider_id, model, prompt_tokens, completion_tokens, at, reported_cost in zip(*(column.tolist() for column in rows.values())):
+        try:
+            costs.append(engine.calculate_cost(provider_id, {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "cost": reported_cost}, model, at))
+        except PriceNotFoundError:
+            costs.append(None)
+
+    return costs
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    engine_ = engine()
+
+    data = ledger(rows)
+    sample = {name: column[:LOOP_ROWS] for name, column in data.items()}
+
+    start = time.perf_counter()
+    expected = loop(engine_, sample)
+    per_row = (time.perf_counter() - start) / LOOP_ROWS
+
+    start = time.perf_counter()
+    costs = engine_.calculate_batch(**data)
+    batch = time.perf_counter() - start
+
+    # Both must agree, unpriced rows being None and NaN.
+    np.testing.assert_allclose(costs[:LOOP_ROWS], np.array([np.nan if cost is None else cost for cost in expected]))
+
+    print(f"rows: {rows:,}, {np.isnan(costs).mean():.0%} unpriced, total ${np.nansum(costs):,.2f}")
+    print(f"row by row:  {per_row * rows:7.2f} s  ({per_row * 1e6:.2f} µs per row, from {LOOP_ROWS:,} rows)")
+    print(f"batch:       {batch:7.2f} s  ({batch / rows * 1e9:.0f} ns per row, {per_row * rows / batch:.0f}x)")
+
+    strategy = engine_.get("openai")
+    openai = data["provider_ids"] == "openai"
+    models, prompt_tokens, completion_tokens, at = (data[name][openai] for name in ("models", "prompt_tokens", "completion_tokens", "at"))
+    start = time.perf_counter()
+    strategy.calculate_batch(models, prompt_tokens, completion_tokens, at)
+    print(f"batch, OpenAI rows only ({openai.sum():,}): {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
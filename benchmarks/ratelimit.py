@@ -0,0 +1,42 @@
+"""
+Overhead of the rate limiter per request (acquire and reconcile), for the in-process and the SQLite backends.
+
+    python -m benchmarks.ratelimit
+"""
+import os
+import tempfile
+import time
+
+from nexura.ratelimit.backends import MemoryRateLimitBackend, SQLiteRateLimitBackend
+from nexura.ratelimit.limiter import Limit, RateLimiter
+
+
+KEYS = 1000
+ITERATIONS = 100_000
+
+
+def measure(limiter: RateLimiter, iterations: int) -> float:
+    start = time.perf_counter()
+    for i in range(iterations):
+        reservation = limiter.acquire(f"key-{i % KEYS}", 500)
+        limiter.reconcile(reservation, 420)
+
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    # Limits high enough to never reject, so every request does the full amount of work.
+    requests, tokens = Limit(1e9), Limit(1e12, 60)
+
+    memory = measure(RateLimiter(requests, tokens, MemoryRateLimitBackend()), ITERATIONS)
+    print(f"memory backend: {memory * 1e6:6.2f} µs per request")
+
+    with tempfile.TemporaryDirectory() as directory:
+        backend = SQLiteRateLimitBackend(os.path.join(directory, "ratelimit.db"))
+        sqlite = measure(RateLimiter(requests, tokens, backend), ITERATIONS // 10)
+        backend.close()
+    print(f"sqlite backend: {sqlite * 1e6:6.2f} µs per request")
+
+
+if __name__ == "__main__":
+    main()
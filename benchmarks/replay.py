@@ -0,0 +1,198 @@
+"""
+Replay captured traffic (`NEXURA_CAPTURE_DIR`) or a JSONL file of requests through the gateway, against a local mock upstream, and report latency percentiles, throughput and the gateway CPU time per request.
+
+    python -m benchmarks.replay captures/*.jsonl.gz --rps 200 --requests 5000
+    python -m benchmarks.replay requests.jsonl --concurrency 32
+
+Inputs are capture segments or plain JSONL in the `/batch` format, one `{"provider": ..., "endpoint": ..., "body": ...}` object per line. Lines which aren't requests are skipped and counted. Without input, a synthetic mix of OpenAI chat completions and EdenAI chats is sent.
+
+The gateway runs in its own process with the current `NEXURA_*` settings and every provider pointed at the mock upstream (`nexura/providers/mock.py`) in another process, which answers OpenAI chat completions and EdenAI chat (other endpoints get its 404). With `--rps`, requests are sent at a fixed rate whatever the latency (open loop) and latency is measured from the time each request was due, so a gateway falling behind shows in the percentiles. With `--concurrency`, that many clients send their next request once the previous one is answered (closed loop).
+"""
+import argparse
+import asyncio
+import collections
+import os
+import statistics
+import subprocess
+import sys
+import time
+import typing
+
+import httpx
+import orjson
+
+from benchmarks import _servers
+from nexura.capture import read_captures
+
+
+GATEWAY = """
+import sys
+import uvicorn
+from nexura.main import app
+from nexura.providers import nexura_provider
+
+for provider_id in [*nexura_provider.providers, *nexura_provider.lazy_providers]:
+    nexura_provider.get_provider(provider_id).base_url = sys.argv[1]
+uvicorn.run(app, port=int(sys.argv[2]), log_level="warning")
+"""
+
+Request = typing.Tuple[str, bytes, bool]
+
+
+def load(paths: typing.Sequence[str]) -> typing.Tuple[typing.List[Request], int]:
+    """
+    Requests of the input files as `(path, body, streamed)`, and the number of lines skipped.
+    """
+    requests, skipped = [], 0
+    for path in paths:
+        for record in read_captures(path):
+            provider, endpoint, body = record.get("provider"), record.get("endpoint"), record.get("body")
+            if not isinstance(provider, str) or not isinstance(endpoint, str) or not isinstance(body, dict):
+                skipped += 1
+                continue
+
+            requests.append((f"/{provider}/{endpoint}", orjson.dumps(body), bool(body.get("stream"))))
+
+    return requests, skipped
+
+
+def synthetic(count: int = 100) -> typing.List[Request]:
+    requests = []
+    for i in range(count):
+        if i % 5 == 4:
+            body = {"providers": "openai/gpt-4o", "fallback_providers": [], "text": "lorem ipsum " * (5 + i % 50)}
+            requests.append(("/edenai/chat", orjson.dumps(body), False))
+            continue
+
+        body = {"model": "gpt-4o-mini" if i % 3 else "gpt-4o", "messages": [{"role": "user", "content": "lorem ipsum " * (5 + i % 50)}], "stream": i % 10 == 0}
+        requests.append(("/openai/chat-completions", orjson.dumps(body), body["stream"]))
+
+    return requests
+
+
+def cpu_seconds(pid: int) -> float:
+    """
+    User and system CPU time of a process, from `/proc` (Linux only).
+    """
+    with open(f"/proc/{pid}/stat") as f:
+        # The command name may contain spaces, fields are counted from its closing parenthesis.
+        fields = f.read().rsplit(")", 1)[1].split()
+
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def send(client: httpx.AsyncClient, request: Request) -> typing.Union[int, str]:
+    path, content, streamed = request
+    try:
+        if streamed:
+            async with client.stream("POST", path, content=content, headers={"content-type": "application/json"}) as r:
+                async for _ in r.aiter_raw():
+                    pass
+                return r.status_code
+
+        r = await client.post(path, content=content, headers={"content-type": "application/json"})
+        return r.status_code
+    except httpx.HTTPError as e:
+        return type(e).__name__
+
+
+async def open_loop(client: httpx.AsyncClient, requests: typing.Sequence[Request], count: int, rps: float) -> typing.List[typing.Tuple[float, typing.Any]]:
+    results = []
+
+    async def run(request: Request, due: float):
+        status = await send(client, request)
+        results.append((time.perf_counter() - due, status))
+
+    tasks = []
+    start = time.perf_counter()
+    for i in range(count):
+        due = start + i / rps
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(run(requests[i % len(requests)], due)))
+
+    await asyncio.gather(*tasks)
+    return results
+
+
+async def closed_loop(client: httpx.AsyncClient, requests: typing.Sequence[Request], count: int, concurrency: int) -> typing.List[typing.Tuple[float, typing.Any]]:
+    results = []
+    indices = iter(range(count))
+
+    async def worker():
+        for i in indices:
+            start = time.perf_counter()
+            status = await send(client, requests[i % len(requests)])
+            results.append((time.perf_counter() - start, status))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results
+
+
+def report(results: typing.List[typing.Tuple[float, typing.Any]], elapsed: float, cpu: float):
+    latencies = sorted(latency for latency, _ in results)
+    statuses = collections.Counter(status for _, status in results)
+    errors = sum(count for status, count in statuses.items() if not isinstance(status, int) or status >= 400)
+    p50, p95, p99 = (statistics.quantiles(latencies, n=100, method="inclusive")[q - 1] for q in (50, 95, 99)) if len(latencies) > 1 else (latencies[0],) * 3
+
+    print(f"requests:     {len(results)} in {elapsed:.2f} s, {len(results) / elapsed:.0f} req/s")
+    print(f"latency:      p50 {p50 * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms")
+    print(f"errors:       {errors} ({', '.join(f'{status}: {count}' for status, count in sorted(statuses.items(), key=str))})")
+    print(f"gateway CPU:  {cpu / len(results) * 1e6:.0f} µs per request ({cpu / elapsed:.0%} of a core)")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip(), formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help="capture segments (.jsonl.gz) or JSONL files of requests")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--rps", type=float, help="open loop: requests sent per second")
+    mode.add_argument("--concurrency", type=int, default=16, help="closed loop: requests in flight (default: 16)")
+    parser.add_argument("--requests", type=int, help="requests to send, the input is cycled (default: the input once)")
+    parser.add_argument("--warmup", type=int, default=50, help="requests sent before measuring (default: 50)")
+    parser.add_argument("--latency", default="lognormal:0.02,0.5", help="mock upstream latency before the first token (default: lognormal:0.02,0.5)")
+    parser.add_argument("--tokens", default="uniform:5,50", help="mock upstream completion tokens (default: uniform:5,50)")
+    parser.add_argument("--token-delay", type=float, default=0.001, help="seconds per token of the mock upstream (default: 0.001)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of the requests the mock upstream fails (default: 0)")
+    args = parser.parse_args()
+
+    requests, skipped = load(args.paths) if args.paths else (synthetic(), 0)
+    if not requests:
+        sys.exit(f"No requests found in {', '.join(args.paths)} ({skipped} lines skipped)")
+    count = args.requests or len(requests)
+    print(f"{len(requests)} distinct requests, {skipped} lines skipped, sending {count}")
+    print(f"mock upstream: {args.latency} s latency, {args.tokens} tokens, {args.token_delay * 1000:g} ms per token, {args.error_rate:.0%} errors\n")
+
+    env = os.environ | {"PYTHONPATH": os.getcwd()}
+    upstream_port = _servers.free_port()
+    upstream_env = env | {"NEXURA_MOCK_LATENCY": args.latency, "NEXURA_MOCK_COMPLETION_TOKENS": args.tokens, "NEXURA_MOCK_TOKEN_DELAY": str(args.token_delay), "NEXURA_MOCK_ERROR_RATE": str(args.error_rate)}
+    upstream = subprocess.Popen([sys.executable, "-m", "nexura.providers.mock", "--port", str(upstream_port)], cwd="/", env=upstream_env)
+
+    port = _servers.free_port()
+    gateway = subprocess.Popen([sys.executable, "-c", GATEWAY, f"http://127.0.0.1:{upstream_port}", str(port)], cwd="/", env=env)
+    try:
+        _servers.wait_for_port(upstream_port)
+        _servers.wait_for_port(port)
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=300, limits=limits) as client:
+            await closed_loop(client, requests, args.warmup, min(args.warmup, 8))
+
+            cpu = cpu_seconds(gateway.pid)
+            start = time.perf_counter()
+            if args.rps:
+                results = await open_loop(client, requests, count, args.rps)
+            else:
+                results = await closed_loop(client, requests, count, args.concurrency)
+            elapsed = time.perf_counter() - start
+            cpu = cpu_seconds(gateway.pid) - cpu
+
+        print(f"{f'open loop at {args.rps:g} req/s' if args.rps else f'closed loop, {args.concurrency} in flight'}")
+        report(results, elapsed, cpu)
+    finally:
+        for process in (gateway, upstream):
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
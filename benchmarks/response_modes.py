@@ -0,0 +1,81 @@
+"""
+Gateway-side cost of answering a chat completion in passthrough and typed response modes: reading its usage and building the response sent to the caller.
+
+    python -m benchmarks.response_modes
+"""
+import json
+import timeit
+import tracemalloc
+
+import httpx
+import orjson
+
+from nexura.providers.base import Provider
+from nexura.providers.endpoint import PASSTHROUGH, TYPED
+from nexura.providers.openai.endpoints.completions import ChatCompletionsEndpoint
+from nexura.routes.handler import to_response
+
+
+SIZES = (1, 8, 64)
+ITERATIONS = 2000
+
+
+def completion(choices: int) -> bytes:
+    return json.dumps({
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o",
+        "choices": [{"index": i, "finish_reason": "stop", "message": {"role": "assistant", "content": "lorem ipsum " * 300}} for i in range(choices)],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 600 * choices, "total_tokens": 10 + 600 * choices},
+        "system_fingerprint": "fp_0",
+    }, indent=2).encode()
+
+
+def measure(fn) -> tuple:
+    per_call = min(timeit.repeat(fn, number=ITERATIONS // 5, repeat=5)) / (ITERATIONS // 5) * 1e6
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    return per_call, peak
+
+
+def main():
+    endpoint = ChatCompletionsEndpoint()
+    endpoint.provider = Provider("OpenAI", "http://127.0.0.1", "key")
+    endpoint.id = "chat-completions"
+    endpoint.compile()
+
+    print(f"{'choices':>7} {'size':>8}  {'mode':<22} {'time':>9} {'allocated':>10}")
+    for choices in SIZES:
+        content = completion(choices)
+        r = httpx.Response(200, content=content, headers={"content-type": "application/json", "x-request-id": "req_1"})
+        r.extensions["nexura_endpoint"] = endpoint
+
+        def previous():
+            # Usage read from the fully decoded response.
+            endpoint.get_usage(orjson.loads(r.content))
+            endpoint.response_mode = PASSTHROUGH
+            return to_response(r)
+
+        def passthrough():
+            endpoint.peek_usage(r.content)
+            endpoint.response_mode = PASSTHROUGH
+            return to_response(r)
+
+        def typed():
+            endpoint.peek_usage(r.content)
+            endpoint.response_mode = TYPED
+            return to_response(r)
+
+        for mode, fn in (("passthrough, decoded", previous), ("passthrough, peek", passthrough), ("typed", typed)):
+            per_call, peak = measure(fn)
+            print(f"{choices:>7} {len(content) / 1024:>6.0f} KiB  {mode:<22} {per_call:>6.1f} µs {peak / 1024:>6.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
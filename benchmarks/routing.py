@@ -0,0 +1,70 @@
+"""
+Dispatch overhead of `NexuraProvider` with hundreds of registered providers.
+
+    python -m benchmarks.routing
+"""
+import asyncio
+import time
+import timeit
+
+import httpx
+
+from nexura.providers import NexuraProvider
+from nexura.providers.base import Provider
+from nexura.providers.endpoint import Endpoint
+
+
+PROVIDERS = 500
+ENDPOINTS_PER_PROVIDER = 5
+ITERATIONS = 100_000
+
+
+class NoopEndpoint(Endpoint):
+    async def handle_request(self, body: dict) -> httpx.Response:
+        return httpx.Response(200)
+
+
+def linear_lookup(registry: NexuraProvider, provider_id: str, endpoint_id: str) -> Endpoint:
+    # Dispatch as it was done before the route table: a scan over all providers.
+    for provider in registry.providers.values():
+        if provider.id == provider_id:
+            return provider.get_endpoint(endpoint_id)
+
+    raise ValueError(f"Provider {provider_id} not found")
+
+
+def build_registry() -> NexuraProvider:
+    registry = NexuraProvider()
+    for i in range(PROVIDERS):
+        provider = Provider(f"Provider {i}", "http://127.0.0.1", "key")
+        for j in range(ENDPOINTS_PER_PROVIDER):
+            provider.add_endpoint(NoopEndpoint(f"Endpoint {j}", "POST", f"/endpoint/{j}"))
+        registry.add_provider(provider)
+
+    return registry
+
+
+def main():
+    start = time.perf_counter()
+    registry = build_registry()
+    print(f"register {PROVIDERS} providers x {ENDPOINTS_PER_PROVIDER} endpoints: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    last = f"provider-{PROVIDERS - 1}"
+    per_call = lambda t: t / ITERATIONS * 1e9  # noqa: E731
+
+    t = timeit.timeit(lambda: linear_lookup(registry, last, "endpoint-4"), number=ITERATIONS)
+    print(f"linear scan lookup (worst case): {per_call(t):8.0f} ns")
+    t = timeit.timeit(lambda: registry.get_route(last, "endpoint-4"), number=ITERATIONS)
+    print(f"route table lookup:              {per_call(t):8.0f} ns")
+
+    async def dispatch():
+        start = time.perf_counter()
+        for _ in range(ITERATIONS):
+            await registry.handle_request(last, "endpoint-4", body=None)
+        return time.perf_counter() - start
+
+    print(f"full dispatch (handle_request):  {per_call(asyncio.run(dispatch())):8.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Lookup latency of the semantic cache index at 10k, 100k and 1M cached prompts.
+
+    python -m benchmarks.semantic_cache
+"""
+import time
+
+import numpy as np
+
+from nexura.caching.semantic import HashingEmbedder, VectorIndex, normalize_text
+
+
+SIZES = (10_000, 100_000, 1_000_000)
+DIM = 256
+QUERIES = 50
+BATCH = 32
+
+
+def random_unit_vectors(n: int, rng: np.random.Generator) -> np.ndarray:
+    vectors = rng.random((n, DIM), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    embedder = HashingEmbedder(DIM)
+    prompts = [normalize_text(f"Summarize the attached document number {i}, in at most {i % 7 + 3} sentences.") for i in range(BATCH)]
+
+    start = time.perf_counter()
+    for _ in range(QUERIES):
+        embedder.embed(prompts[:1])
+    print(f"embed 1 prompt: {(time.perf_counter() - start) / QUERIES * 1e6:.0f} µs")
+
+    for size in SIZES:
+        index = VectorIndex(DIM, capacity=size)
+        for chunk in range(0, size, 100_000):
+            index.extend(random_unit_vectors(min(100_000, size - chunk), rng))
+
+        start = time.perf_counter()
+        for _ in range(QUERIES):
+            index.search(embedder.embed(prompts[:1]), k=1)
+        single = (time.perf_counter() - start) / QUERIES * 1000
+
+        start = time.perf_counter()
+        for _ in range(QUERIES):
+            index.search(embedder.embed(prompts), k=5)
+        batched = (time.perf_counter() - start) / QUERIES / BATCH * 1000
+
+        print(f"{size:>9} entries: {single:7.2f} ms per lookup, {batched:7.3f} ms per query in batches of {BATCH} (top-5)")
+
+        del index
+
+
+if __name__ == "__main__":
+    main()
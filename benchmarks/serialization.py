@@ -0,0 +1,83 @@
+"""
+Serialization of chat completion requests with 1k-message conversations: `asdict` + `json` against the compiled encoder + orjson, and request validation from raw JSON.
+
+    python -m benchmarks.serialization
+"""
+from dataclasses import asdict
+import json
+import timeit
+import typing
+
+from pydantic import TypeAdapter
+
+from nexura.providers.openai.endpoints.completions import ChatCompletionsEndpoint, CompletionResponse, _AssistantMessage, _SystemMessage, _UserMessage
+from nexura.utils.serialization import compile_encoder, dumps, encode, get_adapter
+
+
+MESSAGES = 1000
+ITERATIONS = 200
+
+
+def conversation() -> bytes:
+    messages = [{"role": "system", "content": "You are a helpful assistant."}]
+    for i in range(MESSAGES - 1):
+        role = "user" if i % 2 == 0 else "assistant"
+        messages.append({"role": role, "content": f"Message {i}: " + "lorem ipsum dolor sit amet " * 8})
+
+    return json.dumps({"model": "gpt-4o", "messages": messages}).encode()
+
+
+def completion() -> bytes:
+    choices = [{"finish_reason": "stop", "index": i, "message": {"role": "assistant", "content": "lorem ipsum " * 200}} for i in range(8)]
+    return json.dumps({
+        "id": "chatcmpl-1",
+        "choices": choices,
+        "created": 0,
+        "model": "gpt-4o",
+        "object": "chat.completion",
+        "usage": {"prompt_tokens": 10, "completion_tokens": 3200, "total_tokens": 3210},
+    }).encode()
+
+
+def measure(label: str, fn, reference: float = None) -> float:
+    # Best of 5 runs, the single core of the benchmark machine is noisy.
+    t = min(timeit.repeat(fn, number=ITERATIONS // 5, repeat=5)) / (ITERATIONS // 5) * 1000
+    speedup = f"  ({reference / t:4.1f}x)" if reference else ""
+    print(f"{label:<40} {t:8.3f} ms{speedup}")
+    return t
+
+
+def main():
+    endpoint = ChatCompletionsEndpoint()
+    endpoint.compile()
+
+    raw = conversation()
+    body = endpoint.parse_body(raw)
+    compile_encoder(type(body))
+    print(f"request: {MESSAGES} messages, {len(raw) / 1024:.0f} KiB")
+
+    print("\nencode")
+    reference = measure("asdict + json.dumps (previous)", lambda: json.dumps(asdict(body)).encode())
+    measure("asdict", lambda: asdict(body))
+    measure("compiled encoder", lambda: encode(body), reference)
+    measure("compiled encoder + orjson", lambda: dumps(body), reference)
+
+    print("\nvalidate request")
+    # The messages union used to be matched member by member, it's now discriminated by `role`.
+    previous = TypeAdapter(typing.List[typing.Union[_SystemMessage, _UserMessage, _AssistantMessage]])
+    messages = json.loads(raw)["messages"]
+    reference = measure("json.loads + undiscriminated messages", lambda: (json.loads(raw), previous.validate_python(messages)))
+    adapter = get_adapter(type(body))
+    measure("json.loads + validate_python", lambda: adapter.validate_python(json.loads(raw)), reference)
+    measure("validate_json (one pass)", lambda: endpoint.parse_body(raw), reference)
+
+    response = completion()
+    response_adapter = get_adapter(CompletionResponse)
+    print(f"\nparse response: {len(response) / 1024:.0f} KiB")
+    measure("json.loads (untyped)", lambda: json.loads(response))
+    reference = measure("json.loads + validate_python", lambda: response_adapter.validate_python(json.loads(response)))
+    measure("validate_json into CompletionResponse", lambda: endpoint.parse_response(response), reference)
+
+
+if __name__ == "__main__":
+    main()
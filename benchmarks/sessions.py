@@ -0,0 +1,107 @@
+"""
+Bytes on the wire and gateway time per turn over 100-turn conversations, with the client resending the whole history on every turn, or with a conversation session (`NEXURA_SESSIONS_ENABLED`) and only the new message sent.
+
+    python -m benchmarks.sessions
+
+Requests go through the app to the in-process mock upstream (`NEXURA_BASE_URLS=openai=mock`), replying with 60 tokens at once. Request bodies are encoded before the clock starts, and the time of the upstream call (encoding the upstream request and the mock upstream) is left out, so the times are the gateway's own work: parsing the request, rebuilding it from the session, saving the turn and answering.
+"""
+import json
+import os
+import subprocess
+import sys
+import typing
+
+
+RUNS = 5
+TURNS = 100
+REPORTED_TURNS = (1, 10, 25, 50, 100)
+
+MODES = {
+    "full history resent": {},
+    "session": {"NEXURA_SESSIONS_ENABLED": "true"},
+    "session, 4000 token window": {"NEXURA_SESSIONS_ENABLED": "true", "NEXURA_SESSIONS_MAX_TOKENS": "4000"},
+}
+
+CONVERSATION = """
+import asyncio, json, sys, time
+import httpx
+import orjson
+from nexura.main import app, lifespan
+from nexura.providers import nexura_provider
+
+turns, session = int(sys.argv[1]), sys.argv[2] == "session"
+SYSTEM = {"role": "system", "content": "You are a helpful assistant answering questions about the user's travel plans. " * 4}
+QUESTION = "Could you suggest what to visit on day {} of the trip, given the places we already talked about and the budget? "
+
+async def main():
+    async with lifespan(app):
+        endpoint = nexura_provider.get_route("openai", "chat-completions")
+        upstream, upstream_time = [], []
+        encode_body, handle_request = endpoint.encode_body, endpoint.handle_request
+        def record(body):
+            content = encode_body(body)
+            upstream.append(len(content))
+            return content
+        async def timed(body):
+            start = time.perf_counter()
+            r = await handle_request(body)
+            upstream_time.append(time.perf_counter() - start)
+            return r
+        endpoint.encode_body, endpoint.handle_request = record, timed
+
+        results = []
+        history = [SYSTEM]
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://nexura") as client:
+            for _ in range(20):
+                await client.post("/openai/chat-completions", json={"model": "gpt-4o", "messages": [SYSTEM], "max_tokens": 100})
+
+            for turn in range(turns):
+                message = {"role": "user", "content": QUESTION.format(turn + 1) * 2}
+                if session:
+                    messages = [SYSTEM, message] if turn == 0 else [message]
+                else:
+                    messages = history + [message]
+                content = orjson.dumps({"model": "gpt-4o", "messages": messages, "max_tokens": 100})
+
+                start = time.perf_counter()
+                r = await client.post("/openai/chat-completions" + ("?session=bench" if session else ""), content=content, headers={"content-type": "application/json"})
+                elapsed = time.perf_counter() - start
+                assert r.status_code == 200, r.text
+
+                history += [message, {"role": "assistant", "content": r.json()["choices"][0]["message"]["content"]}]
+                # The gateway's own time, without encoding the upstream request and waiting for the mock upstream.
+                results.append((len(content), upstream[-1], elapsed - upstream_time[-1]))
+
+    print(json.dumps(results))
+
+asyncio.run(main())
+"""
+
+
+def conversation(env: typing.Dict[str, str]) -> typing.List[typing.Tuple[int, int, float]]:
+    env = os.environ | {"PYTHONPATH": os.getcwd(), "NEXURA_BASE_URLS": "openai=mock", "NEXURA_MOCK_COMPLETION_TOKENS": "constant:60"} | env
+    session = "session" if "NEXURA_SESSIONS_ENABLED" in env else "full"
+    out = subprocess.run([sys.executable, "-c", CONVERSATION, str(TURNS), session], cwd="/", env=env, capture_output=True, text=True, check=True).stdout
+
+    return json.loads(out)
+
+
+def main():
+    print(f"{'mode':<28} {'turn':>4} {'request':>9} {'upstream':>9} {'gateway':>9}")
+    for mode, env in MODES.items():
+        runs = [conversation(env) for _ in range(RUNS)]
+        # Bytes are the same on every run, the fastest time per turn is kept.
+        turns = [(request, upstream, min(run[i][2] for run in runs)) for i, (request, upstream, _) in enumerate(runs[0])]
+
+        for turn in REPORTED_TURNS:
+            request, upstream, elapsed = turns[turn - 1]
+            print(f"{mode:<28} {turn:>4} {request:>7} B {upstream:>7} B {elapsed * 1e6:>6.0f} µs")
+
+        total_request = sum(request for request, _, _ in turns)
+        total_upstream = sum(upstream for _, upstream, _ in turns)
+        total_time = sum(elapsed for _, _, elapsed in turns)
+        print(f"{mode:<28} {'all':>4} {total_request / 1024:>5.0f} KiB {total_upstream / 1024:>5.0f} KiB {total_time * 1000:>6.0f} ms\n")
+
+
+if __name__ == "__main__":
+    main()
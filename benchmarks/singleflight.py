@@ -0,0 +1,87 @@
+"""
+Load test of upstream request coalescing: bursts of identical requests against a local mock upstream, with and without singleflight.
+
+    python -m benchmarks.singleflight
+"""
+import asyncio
+import time
+
+from benchmarks import _servers
+from nexura.caching.singleflight import SingleFlight
+from nexura.providers import nexura_provider
+
+
+BURSTS = 10
+BURST_SIZE = 200
+DISTINCT_BODIES = 5
+
+
+def body(i: int):
+    endpoint = nexura_provider.get_route("openai", "chat-completions")
+    return endpoint.parse_body({"model": "gpt-4o", "messages": [{"role": "user", "content": f"Question {i % DISTINCT_BODIES}"}]})
+
+
+async def run(singleflight) -> tuple[int, float]:
+    nexura_provider.singleflight = singleflight
+    provider = nexura_provider.get_provider("openai")
+    await provider.close()
+
+    upstream_calls = 0
+
+    async def count(request):
+        nonlocal upstream_calls
+        upstream_calls += 1
+
+    provider.client.event_hooks["request"].append(count)
+
+    start = time.perf_counter()
+    for _ in range(BURSTS):
+        await asyncio.gather(*(nexura_provider.handle_request("openai", "chat-completions", body=body(i)) for i in range(BURST_SIZE)))
+
+    return upstream_calls, time.perf_counter() - start
+
+
+async def cancellation() -> str:
+    singleflight = nexura_provider.singleflight = SingleFlight()
+    tasks = [asyncio.create_task(nexura_provider.handle_request("openai", "chat-completions", body=body(0))) for _ in range(100)]
+
+    # Half of the clients disconnect while the upstream call is running, the others must still get the response.
+    await asyncio.sleep(0.02)
+    for task in tasks[:50]:
+        task.cancel()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    completed = sum(1 for r in results if not isinstance(r, BaseException) and r.status_code == 200)
+
+    # When every client disconnects, the upstream call itself is cancelled.
+    tasks = [asyncio.create_task(nexura_provider.handle_request("openai", "chat-completions", body=body(1))) for _ in range(10)]
+    await asyncio.sleep(0.02)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    return f"{completed}/50 remaining waiters completed, {len(singleflight)} upstream calls left in flight after all waiters cancelled"
+
+
+async def main():
+    # 100 ms per upstream call.
+    upstream_url, upstream = _servers.serve_mock_upstream({"NEXURA_MOCK_COMPLETION_TOKENS": "constant:20", "NEXURA_MOCK_TOKEN_DELAY": "0.005"})
+    nexura_provider.get_provider("openai").base_url = upstream_url
+
+    try:
+        for singleflight in (None, SingleFlight()):
+            calls, elapsed = await run(singleflight)
+            label = "singleflight" if singleflight is not None else "no coalescing"
+            requests = BURSTS * BURST_SIZE
+            line = f"{label:>13}: {requests} requests, {calls} upstream calls, {requests / elapsed:7.0f} req/s"
+            if singleflight is not None:
+                line += f", coalesce ratio {singleflight.stats()['coalesce_ratio']:.3f}"
+            print(line)
+
+        print(await cancellation())
+    finally:
+        await nexura_provider.close()
+        upstream.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""
+Cold start of a gateway worker: time to import `nexura.main` in a fresh interpreter, checked against a startup budget.
+
+    python -m benchmarks.startup
+
+Exits with status 1 when over budget. Imports are broken down with `python -X importtime`, the modules adding the most are listed.
+"""
+import os
+import subprocess
+import sys
+import time
+
+
+RUNS = 7
+# Time Nexura may add on top of the libraries it's built on (FastAPI, httpx, pydantic, orjson), which are imported by any worker anyway.
+BUDGET_MS = 100
+FRAMEWORK = "import fastapi, fastapi.responses, httpx, orjson, pydantic"
+
+
+def run(code: str, *args: str) -> subprocess.CompletedProcess:
+    # From an unrelated directory, as a worker started by a process manager would be.
+    return subprocess.run([sys.executable, *args, "-c", code], cwd="/", env=os.environ | {"PYTHONPATH": os.getcwd()}, capture_output=True, text=True, check=True)
+
+
+def best_time(code: str) -> float:
+    times = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        run(code)
+        times.append(time.perf_counter() - start)
+
+    return min(times) * 1000
+
+
+def incremental_time(code: str) -> float:
+    """
+    Time `code` takes once the framework is imported, measured inside the interpreter so startup noise doesn't hide it.
+    """
+    times = []
+    for _ in range(RUNS):
+        out = run(f"{FRAMEWORK}\nimport time\nstart = time.perf_counter()\n{code}\nprint(time.perf_counter() - start)").stdout
+        times.append(float(out))
+
+    return min(times) * 1000
+
+
+def import_times() -> dict:
+    """
+    Cumulative import time of each module, in milliseconds.
+    """
+    times = {}
+    for line in run("import nexura.main", "-X", "importtime").stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(cumulative) / 1000
+
+    return times
+
+
+def main():
+    interpreter = best_time("pass")
+    framework = best_time(FRAMEWORK)
+    gateway = best_time("import nexura.main")
+    overhead = incremental_time("import nexura.main")
+    first_request = incremental_time("import nexura.main\nfrom nexura.providers import nexura_provider\nnexura_provider.get_route('openai', 'chat-completions')") - overhead
+
+    print(f"interpreter:                         {interpreter:7.0f} ms")
+    print(f"framework imports:                   {framework:7.0f} ms")
+    print(f"import nexura.main:                  {gateway:7.0f} ms")
+    print(f"  of which nexura itself:            {overhead:7.0f} ms")
+    print(f"loading the OpenAI provider:         {first_request:7.0f} ms (first request)")
+
+    times = import_times()
+    own = sorted(((t, name) for name, t in times.items() if name.startswith("nexura")), reverse=True)
+    heavy = [name for name in ("numpy", "sqlalchemy", "sqlmodel", "simple_parsing") if name in times]
+    print("\nslowest nexura modules (cumulative, -X importtime):")
+    for t, name in own[:8]:
+        print(f"  {name:<40} {t:7.1f} ms")
+    print(f"optional dependencies imported at startup: {', '.join(heavy) or 'none'}")
+
+    print(f"\nnexura overhead: {overhead:.0f} ms, budget {BUDGET_MS} ms")
+    if overhead > BUDGET_MS:
+        print("over budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
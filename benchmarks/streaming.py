@@ -0,0 +1,62 @@
+"""
+Time to first byte and peak gateway memory of streamed vs buffered chat completions.
+
+    python -m benchmarks.streaming
+
+The mock upstream runs in its own process, so its memory isn't measured, and generates 2000 tokens at 1 ms each.
+"""
+import asyncio
+import statistics
+import time
+import tracemalloc
+
+import httpx
+
+from benchmarks import _servers
+from nexura.main import app
+from nexura.providers import nexura_provider
+
+
+REQUESTS = 10
+MOCK = {"NEXURA_MOCK_COMPLETION_TOKENS": "constant:2000", "NEXURA_MOCK_TOKEN_DELAY": "0.001"}
+
+
+async def measure(gateway_url: str, stream: bool) -> tuple[float, float, int]:
+    body = {"model": "gpt-4o", "messages": [{"role": "user", "content": "Tell me a story"}], "stream": stream}
+
+    async with httpx.AsyncClient(base_url=gateway_url, timeout=60) as client:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        ttfb = None
+        async with client.stream("POST", "/openai/chat-completions", json=body) as r:
+            async for _ in r.aiter_raw():
+                if ttfb is None:
+                    ttfb = time.perf_counter() - start
+        total = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+
+    return ttfb, total, peak - baseline
+
+
+async def main():
+    upstream_url, upstream = _servers.serve_mock_upstream(MOCK)
+    nexura_provider.get_provider("openai").base_url = upstream_url
+    gateway_url = _servers.serve_in_thread(app)
+
+    tracemalloc.start()
+    try:
+        for stream in (False, True):
+            results = [await measure(gateway_url, stream) for _ in range(REQUESTS)]
+            ttfb = statistics.median(r[0] for r in results) * 1000
+            total = statistics.median(r[1] for r in results) * 1000
+            peak = max(r[2] for r in results) / 1024
+            print(f"{'streamed' if stream else 'buffered':>8}: TTFB {ttfb:8.1f} ms  total {total:8.1f} ms  peak memory {peak:8.1f} KiB")
+    finally:
+        tracemalloc.stop()
+        upstream.terminate()
+        upstream.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+"""
+Prompt cache hits, bytes on the wire and gateway time per request for requests sharing a 2000-token system prompt, sent by the client or referenced as a prompt template (`NEXURA_TEMPLATES_ENABLED`, `?template=policy@1`).
+
+    python -m benchmarks.templates
+
+Requests go through the app to the in-process mock upstream (`NEXURA_BASE_URLS=openai=mock`), which simulates OpenAI's prompt caching: prompts of 1024 tokens and more are cached in steps of 128 tokens. The time of the upstream call is left out, so the times are the gateway's own work.
+"""
+import json
+import os
+import subprocess
+import sys
+import typing
+
+
+RUNS = 5
+REQUESTS = 200
+
+MODES = {
+    # Clients often start the system prompt with something which changes on every request, a date or a request id.
+    "prompt resent, varying first line": "varying",
+    "prompt resent, stable": "stable",
+    "template": "template",
+}
+
+SCENARIO = """
+import asyncio, json, sys, time
+import httpx
+import orjson
+from nexura.main import app, lifespan
+from nexura.providers import nexura_provider
+
+requests, mode = int(sys.argv[1]), sys.argv[2]
+PROMPT = "Answer as the support desk of ACME, following the policy: refunds within 30 days, exchanges within 60 days, no refunds on sale items. " * 60
+
+async def main():
+    async with lifespan(app):
+        endpoint = nexura_provider.get_route("openai", "chat-completions")
+        upstream_time = []
+        handle_request = endpoint.handle_request
+        async def timed(body):
+            start = time.perf_counter()
+            r = await handle_request(body)
+            upstream_time.append(time.perf_counter() - start)
+            return r
+        endpoint.handle_request = timed
+
+        results = []
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://nexura") as client:
+            for _ in range(20):
+                await client.post("/openai/chat-completions", json={"model": "gpt-4o", "messages": [{"role": "user", "content": "Hello"}], "max_tokens": 50})
+            if mode == "template":
+                await client.put("/templates/policy/1", json={"system": PROMPT})
+
+            for i in range(requests):
+                header = f"Request {i}, customer {i % 17}."
+                question = {"role": "user", "content": f"{header} Can I return the shoes I bought {i % 40} days ago?"}
+                if mode == "varying":
+                    messages = [{"role": "system", "content": f"{header}\\n{PROMPT}"}, question]
+                elif mode == "stable":
+                    messages = [{"role": "system", "content": PROMPT}, question]
+                else:
+                    messages = [question]
+                content = orjson.dumps({"model": "gpt-4o", "messages": messages, "max_tokens": 50})
+
+                start = time.perf_counter()
+                r = await client.post("/openai/chat-completions" + ("?template=policy@1" if mode == "template" else ""), content=content, headers={"content-type": "application/json"})
+                elapsed = time.perf_counter() - start
+                assert r.status_code == 200, r.text
+
+                usage = r.json()["usage"]
+                results.append((len(content), usage["prompt_tokens"], usage["prompt_tokens_details"]["cached_tokens"], elapsed - upstream_time[-1]))
+
+            stats = (await client.get("/templates")).json() if mode == "template" else None
+
+    print(json.dumps({"results": results, "stats": stats}))
+
+asyncio.run(main())
+"""
+
+
+def scenario(mode: str) -> typing.Dict[str, typing.Any]:
+    env = os.environ | {"PYTHONPATH": os.getcwd(), "NEXURA_BASE_URLS": "openai=mock", "NEXURA_TEMPLATES_ENABLED": "true"}
+    out = subprocess.run([sys.executable, "-c", SCENARIO, str(REQUESTS), mode], cwd="/", env=env, capture_output=True, text=True, check=True).stdout
+
+    return json.loads(out)
+
+
+def main():
+    print(f"{'mode':<34} {'request':>9} {'hits':>6} {'cached':>7} {'gateway':>9}")
+    for name, mode in MODES.items():
+        runs = [scenario(mode) for _ in range(RUNS)]
+        results = runs[0]["results"]
+
+        request = sum(result[0] for result in results) / len(results)
+        hits = sum(1 for result in results if result[2]) / len(results)
+        cached = sum(result[2] for result in results) / sum(result[1] for result in results)
+        # Median over the requests of the fastest run for each request.
+        gateway = sorted(min(run["results"][i][3] for run in runs) for i in range(len(results)))[len(results) // 2]
+        print(f"{name:<34} {request:>7.0f} B {hits:>6.1%} {cached:>7.1%} {gateway * 1e6:>6.0f} µs")
+
+        if runs[0]["stats"]:
+            print(f"{'':<34} GET /templates: {json.dumps(runs[0]['stats'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Pre-flight token counting of 1k-message chat conversations: the pure Python BPE tokenizer against `tiktoken` and the length heuristic, and the full estimate run for every request.
+
+    NEXURA_TOKENIZER_DIR=/path/to/vocabularies python -m benchmarks.tokens
+
+Vocabularies (`o200k_base.tiktoken`) aren't shipped with Nexura, `tiktoken` downloads the same files. Tokenizers which aren't available are skipped.
+"""
+import json
+import os
+import time
+import timeit
+
+from nexura import config
+from nexura.providers.openai.endpoints.completions import ChatCompletionsEndpoint
+from nexura.tokenization.registry import count_chat_tokens, register_tokenizer
+from nexura.tokenization.tokenizers import O200K_PATTERN, BPETokenizer, HeuristicTokenizer, TiktokenTokenizer
+
+
+MESSAGES = 1000
+ITERATIONS = 20
+WORDS = "the quick brown fox jumps over the lazy dog while gateway requests are counted priced and sent upstream".split()
+
+
+def conversation() -> list:
+    messages = [("system", "You are a helpful assistant.")]
+    for i in range(MESSAGES - 1):
+        role = "user" if i % 2 == 0 else "assistant"
+        # Varied numbers and words, so not every piece is already cached.
+        text = " ".join(WORDS[(i * 7 + j) % len(WORDS)] for j in range(40))
+        messages.append((role, f"Message {i}, order #{i * 7919 % 100000}: {text}."))
+
+    return messages
+
+
+def factories() -> dict:
+    found = {"heuristic": HeuristicTokenizer}
+
+    path = os.path.join(config.TOKENIZER_DIR or "", "o200k_base.tiktoken")
+    if config.TOKENIZER_DIR and os.path.exists(path):
+        found["bpe"] = lambda: BPETokenizer.from_file(path, O200K_PATTERN)
+
+    found["tiktoken"] = lambda: TiktokenTokenizer("o200k_base")
+    return found
+
+
+def best(fn, number: int = ITERATIONS) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1000
+
+
+def main():
+    messages = conversation()
+    print(f"conversation: {MESSAGES} messages, {sum(len(content) for _, content in messages) / 1024:.0f} KiB of text")
+
+    counts, loaded = {}, {}
+    print(f"\n{'tokenizer':<10} {'load':>9} {'cold':>10} {'warm':>10} {'tokens':>8}")
+    for name, factory in factories().items():
+        start = time.perf_counter()
+        try:
+            tokenizer = loaded[name] = factory()
+        except Exception as e:
+            print(f"{name:<10} skipped: {e}")
+            continue
+        load = (time.perf_counter() - start) * 1000
+
+        register_tokenizer("gpt-4o", tokenizer)
+        # Cold: the first conversation seen, with an empty cache of pieces.
+        start = time.perf_counter()
+        counts[name] = count_chat_tokens("gpt-4o", messages)
+        cold = (time.perf_counter() - start) * 1000
+        warm = best(lambda: count_chat_tokens("gpt-4o", messages))
+        print(f"{name:<10} {load:>6.0f} ms {cold:>7.2f} ms {warm:>7.2f} ms {counts[name]:>8}")
+
+    if "tiktoken" in counts:
+        for name, count in counts.items():
+            print(f"{name}: {count - counts['tiktoken']:+d} tokens from tiktoken")
+
+    # Everything the gateway does before sending a request: counting and pricing, with the most exact tokenizer available.
+    register_tokenizer("gpt-4o", loaded.get("bpe") or loaded.get("tiktoken") or loaded["heuristic"])
+    endpoint = ChatCompletionsEndpoint()
+    body = endpoint.parse_body(json.dumps({"model": "gpt-4o", "messages": [{"role": role, "content": content} for role, content in messages], "max_tokens": 500}))
+    print(f"\npre-flight estimate of the conversation: {best(lambda: endpoint.estimate_cost(body)):.2f} ms")
+    short = endpoint.parse_body(json.dumps({"model": "gpt-4o", "messages": [{"role": "user", "content": "What's the capital of France?"}]}))
+    print(f"pre-flight estimate of a one message request: {best(lambda: endpoint.estimate_cost(short), 2000) * 1000:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Scaling of the multi-worker mode (`python -m nexura.serve`) from 1 to N workers, and consistency of the state they share through the state daemon.
+
+    python -m benchmarks.workers
+
+Every worker answers with the in-process mock upstream (`NEXURA_BASE_URLS=openai=mock`, 20 ms before the first token), so only the gateway uses CPU besides the load generator. The load generator runs in this process: on a host with few cores it competes with the workers.
+"""
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import typing
+
+import httpx
+
+from benchmarks import _servers
+from nexura.caching.backends import StateCacheBackend
+from nexura.ratelimit.backends import MemoryRateLimitBackend, SQLiteRateLimitBackend, StateRateLimitBackend
+from nexura.serve import available_cores, start_state_daemon
+
+
+REQUESTS = 2000
+CONCURRENCY = 32
+BODY = {"model": "gpt-4o", "messages": [{"role": "user", "content": "Hello"}], "max_tokens": 16}
+MOCK = {"NEXURA_BASE_URLS": "openai=mock", "NEXURA_MOCK_LATENCY": "constant:0.02", "NEXURA_MOCK_COMPLETION_TOKENS": "constant:16"}
+
+
+def serve(workers: int, env: typing.Dict[str, str]) -> typing.Tuple[subprocess.Popen, str]:
+    port = _servers.free_port()
+    socket_path = f"/tmp/nexura-bench-{os.getpid()}.sock"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "nexura.serve", "--workers", str(workers), "--port", str(port), "--state-socket", socket_path, "--log-level", "warning"],
+        cwd="/", env=os.environ | {"PYTHONPATH": os.getcwd()} | MOCK | env,
+    )
+    # Workers start one after the other, on a loaded host it takes a while.
+    _servers.wait_for_port(port, timeout=60)
+
+    return process, f"http://127.0.0.1:{port}"
+
+
+def stop(process: subprocess.Popen):
+    process.terminate()
+    process.wait()
+
+
+async def load(url: str, requests: int, concurrency: int, warmup: bool = True) -> typing.Tuple[float, typing.List[float], typing.List[int]]:
+    latencies, statuses = [], []
+    indices = iter(range(requests))
+
+    async def worker(client: httpx.AsyncClient):
+        for _ in indices:
+            start = time.perf_counter()
+            r = await client.post("/openai/chat-completions", json=BODY)
+            latencies.append(time.perf_counter() - start)
+            statuses.append(r.status_code)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        if warmup:
+            # Warm every worker up: connections are spread over them by the kernel.
+            await asyncio.gather(*(client.post("/openai/chat-completions", json=BODY) for _ in range(concurrency)))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return elapsed, latencies, statuses
+
+
+async def scaling(cores: int):
+    print(f"{REQUESTS} requests, {CONCURRENCY} in flight, {cores} available cores\n")
+    print(f"{'workers':>7} {'req/s':>8} {'p50':>9} {'p99':>9}")
+    for workers in sorted({1, 2, 4, cores}):
+        process, url = serve(workers, {})
+        try:
+            elapsed, latencies, _ = await load(url, REQUESTS, CONCURRENCY)
+        finally:
+            stop(process)
+
+        quantiles = statistics.quantiles(latencies, n=100)
+        print(f"{workers:>7} {REQUESTS / elapsed:>8.0f} {quantiles[49] * 1000:>6.1f} ms {quantiles[98] * 1000:>6.1f} ms")
+
+
+async def shared_rate_limit():
+    """
+    A burst of requests from a single client against a limit of 10 requests per second with a burst of 20: when the workers share their buckets, as many get through as with a single worker (the burst, plus 10 per second the test lasts).
+    """
+    print("\nburst of 200 requests, limit of 10 req/s with a burst of 20")
+    env = {"NEXURA_RATE_LIMIT_ENABLED": "true", "NEXURA_RATE_LIMIT_RPS": "10", "NEXURA_RATE_LIMIT_RPS_BURST": "20", "NEXURA_RATE_LIMIT_TPM": "0"}
+    for workers, shared in ((1, True), (4, False), (4, True)):
+        # A backend set explicitly (here in-process buckets) is kept by the launcher.
+        process, url = serve(workers, env if shared else env | {"NEXURA_RATE_LIMIT_BACKEND": ""})
+        try:
+            _, _, statuses = await load(url, 200, 50, warmup=False)
+        finally:
+            stop(process)
+
+        accepted = statuses.count(200)
+        print(f"{workers} workers, {'shared buckets' if shared else 'buckets per worker'}: {accepted} accepted, {statuses.count(429)} rejected")
+
+
+async def round_trips():
+    """
+    Cost of the shared state operations on the request path: a rate limit check with each backend, and cache lookups through the state daemon.
+    """
+    print("\nshared state operations")
+    socket_path = f"/tmp/nexura-bench-{os.getpid()}.sock"
+    daemon = start_state_daemon(socket_path)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            backends = {"in-process": MemoryRateLimitBackend(), "SQLite": SQLiteRateLimitBackend(os.path.join(directory, "ratelimit.db")), "state daemon": StateRateLimitBackend(socket_path)}
+            for name, backend in backends.items():
+                start = time.perf_counter()
+                for i in range(5000):
+                    backend.update(f"key-{i % 100}", 1, 1e-6, 1.0)
+                print(f"rate limit check, {name}: {(time.perf_counter() - start) / 5000 * 1e6:.0f} µs")
+                backend.close()
+
+        cache = StateCacheBackend(socket_path)
+        await cache.set("key", b"x" * 2048)
+        start = time.perf_counter()
+        for _ in range(5000):
+            await cache.get("key")
+        print(f"cache lookup, one at a time: {(time.perf_counter() - start) / 5000 * 1e6:.0f} µs")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(cache.get("key") for _ in range(5000)))
+        print(f"cache lookup, 5000 concurrent: {(time.perf_counter() - start) / 5000 * 1e6:.0f} µs each")
+        await cache.close()
+    finally:
+        stop(daemon)
+
+
+async def main():
+    cores = available_cores()
+    await scaling(cores)
+    await shared_rate_limit()
+    await round_trips()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,4 +1,8 @@
+import argparse
 from dataclasses import asdict, fields, is_dataclass, MISSING
+from functools import cache
+import hashlib
+import inspect
 import json
 import logging
 import re
@@ -8,6 +12,10 @@ from nexura.providers import nexura_provider
 
 API_URL = "https://nexura.dev/api"
 
+DOCS_PATH = "docs/src/docs.json"
+# Source hash of every generated provider and endpoint, to only regenerate the ones which changed.
+MANIFEST_PATH = "docs/src/docs.manifest.json"
+
 
 def get_docstring(obj):
     if obj.__doc__:
@@ -121,10 +129,14 @@ def get_default_value(field):
     return None
 
 
+# Nested dataclasses (e.g. messages, tool calls) are shared by many fields and endpoints, so each one is only described once. Don't mutate the returned list.
+@cache
 def get_dataclass_fields(dataclass_type):
     fields_info = []
+    # Resolved hints rather than `field.type`, so `Annotated` metadata (e.g. union discriminators) doesn't leak into the docs.
+    type_hints = typing.get_type_hints(dataclass_type)
     for field in fields(dataclass_type):
-        field_type = field.type
+        field_type = type_hints[field.name]
         is_optional = False
         if is_field_optional(field_type):
             is_optional = True
@@ -177,13 +189,97 @@ def get_type_as_json(func, key: str):
     return get_dataclass_fields(func.__annotations__[key])
 
 
-def read_providers():
+def iter_dataclasses(_type, seen: typing.Set[type]):
+    """
+    Collect the dataclasses used by a type, including nested ones, into `seen`.
+    """
+    if is_dataclass(_type):
+        if _type in seen:
+            return
+        seen.add(_type)
+        for hint in typing.get_type_hints(_type).values():
+            iter_dataclasses(hint, seen)
+
+    for arg in typing.get_args(_type):
+        iter_dataclasses(arg, seen)
+
+
+def file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def generator_hash() -> str:
+    # Any change to this script invalidates all the generated docs.
+    return hashlib.sha256(f"{file_hash(__file__)}\n{API_URL}".encode()).hexdigest()
+
+
+def provider_hash(provider) -> str:
+    parts = [provider.id, provider.name, get_docstring(provider) or "", file_hash(inspect.getfile(type(provider)))]
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def endpoint_hash(provider, endpoint) -> str:
+    """
+    Hash of everything an endpoint's docs are generated from: the source of its class and of the modules defining its request and response dataclasses, its examples and the provider id.
+    """
+    annotations = endpoint.handle_request.__annotations__
+    dataclasses: typing.Set[type] = set()
+    for key in ("body", "return"):
+        iter_dataclasses(annotations[key], dataclasses)
+
+    files = {inspect.getfile(type(endpoint))} | {inspect.getfile(dataclass) for dataclass in dataclasses}
+    parts = [provider.id, endpoint.id] + [file_hash(path) for path in sorted(files)]
+    parts.append(json.dumps([asdict(example) for example in endpoint.examples]))
+
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def read_endpoint(provider, path: str, endpoint):
+    return {
+        "name": endpoint.name,
+        "method": endpoint.method,
+        "path": path,
+        "nexuraPath": f"{API_URL}/{provider.id}/{endpoint.id}",
+        "category": endpoint.category,
+        "description": get_docstring(endpoint),
+        "original_docs_url": endpoint.original_docs_url,
+        "request_type": get_type_as_json(endpoint.handle_request, "body"),
+        "return_type": get_type_as_json(endpoint.handle_request, "return"),
+        "examples": [asdict(example) for example in endpoint.examples],
+    }
+
+
+def read_providers(previous: typing.Optional[dict] = None, manifest: typing.Optional[dict] = None):
+    """
+    Generate the docs of all enabled providers.
+
+    Args:
+        previous: Docs generated before, their endpoints are reused when their source hash matches `manifest`.
+        manifest: Source hashes of the `previous` docs.
+
+    Returns:
+        Tuple[dict, dict, int]: The docs, their manifest and the number of regenerated endpoints.
+    """
+    previous = previous or {}
+    manifest = manifest or {}
+    if manifest.get("generator") != generator_hash():
+        previous, manifest = {}, {}
+
     data = {}
-    for provider in nexura_provider.providers:
+    new_manifest = {"generator": generator_hash(), "providers": {}}
+    regenerated = 0
+
+    nexura_provider.load_providers()
+    for provider in nexura_provider.providers.values():
         if not provider.enabled:
             logging.info(f"Skipping provider {provider.id} because it is disabled")
             continue
 
+        previous_provider = previous.get(provider.id, {})
+        previous_hashes = manifest.get("providers", {}).get(provider.id, {})
+        hashes = new_manifest["providers"][provider.id] = {"hash": provider_hash(provider), "endpoints": {}}
+
         data[provider.id] = {
             "name": provider.name,
             "description": get_docstring(provider),
@@ -195,25 +291,43 @@ def read_providers():
                 logging.info(f"Skipping endpoint {endpoint.name} because it is disabled")
                 continue
 
-            data[provider.id]["endpoints"][endpoint.name] = {
-                "name": endpoint.name,
-                "method": endpoint.method,
-                "path": path,
-                "nexuraPath": f"{API_URL}/{provider.id}/{endpoint.id}",
-                "category": endpoint.category,
-                "description": get_docstring(endpoint),
-                "original_docs_url": endpoint.original_docs_url,
-                "request_type": get_type_as_json(endpoint.handle_request, "body"),
-                "return_type": get_type_as_json(endpoint.handle_request, "return"),
-                "examples": [asdict(example) for example in endpoint.examples],
-            }
+            source_hash = hashes["endpoints"][endpoint.name] = endpoint_hash(provider, endpoint)
+            unchanged = previous_hashes.get("hash") == hashes["hash"] and previous_hashes.get("endpoints", {}).get(endpoint.name) == source_hash
+            if unchanged and endpoint.name in previous_provider.get("endpoints", {}):
+                data[provider.id]["endpoints"][endpoint.name] = previous_provider["endpoints"][endpoint.name]
+                continue
 
-    return data
+            logging.info(f"Generating documentation of {provider.id}/{endpoint.id}")
+            data[provider.id]["endpoints"][endpoint.name] = read_endpoint(provider, path, endpoint)
+            regenerated += 1
+
+    return data, new_manifest, regenerated
+
+
+def load_json(path: str) -> typing.Optional[dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Generate docs.json, only regenerating the endpoints whose source changed.")
+    parser.add_argument("--full", action="store_true", help="regenerate the docs of every endpoint")
+    args = parser.parse_args()
+
     logging.info("Generating documentation")
-    data = read_providers()
+    previous, manifest = (None, None) if args.full else (load_json(DOCS_PATH), load_json(MANIFEST_PATH))
+    data, manifest, regenerated = read_providers(previous, manifest)
+
+    endpoints = sum(len(provider["endpoints"]) for provider in data.values())
+    logging.info(f"Regenerated {regenerated} of {endpoints} endpoints")
 
-    with open("docs/src/docs.json", "w") as f:
+    with open(DOCS_PATH, "w") as f:
         json.dump(data, f, indent=4)
+
+    with open(MANIFEST_PATH, "w") as f:
+        json.dump(manifest, f, indent=4, sort_keys=True)
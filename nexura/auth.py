@@ -0,0 +1,133 @@
+from dataclasses import dataclass
+import time
+import typing
+
+from fastapi import HTTPException, Request
+from sqlalchemy import event
+from sqlmodel import select
+
+from nexura import config
+from nexura.database import async_session
+from nexura.models.api_key import APIKey
+from nexura.utils.api_key import bearer_token, hash_apikey
+
+
+@dataclass(frozen=True)
+class AuthenticatedKey:
+    key_hash: str
+    prefix: str
+    user_id: str
+    job_priority: int = 0
+
+
+class APIKeyAuthenticator():
+    """
+    Resolve API keys to their owner, with an in-memory cache in front of the database.
+
+    Valid keys are cached for `ttl` seconds and unknown or revoked keys for `negative_ttl` seconds. Keys revoked through this process (setting `APIKey.deleted_at`) are dropped from the cache right away, other workers see it after their TTL expires.
+
+    Unknown keys have their own, smaller cache: clients sending random keys only evict each other, valid keys stay cached.
+    """
+    def __init__(
+        self,
+        session_factory=async_session,
+        ttl: float = 60,
+        negative_ttl: float = 5,
+        max_entries: int = 100000,
+        negative_max_entries: int = 10000,
+    ):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.negative_max_entries = negative_max_entries
+
+        self._cache: typing.Dict[str, typing.Tuple[AuthenticatedKey, float]] = {}
+        self._negative: typing.Dict[str, float] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    async def _load(self, key_hash: str) -> typing.Optional[AuthenticatedKey]:
+        async with self.session_factory() as session:
+            api_key = (await session.exec(select(APIKey).where(APIKey.key_hash == key_hash))).first()
+
+        if api_key is None or api_key.deleted_at is not None:
+            return None
+
+        return AuthenticatedKey(api_key.key_hash, api_key.prefix, api_key.user_id, api_key.job_priority)
+
+    @staticmethod
+    def _bounded(cache: typing.Dict[str, typing.Any], max_entries: int, key_hash: str, value: typing.Any):
+        cache.pop(key_hash, None)
+        if len(cache) >= max_entries:
+            # Dicts keep insertion order, drop the oldest entry.
+            del cache[next(iter(cache))]
+        cache[key_hash] = value
+
+    def _store(self, key_hash: str, authenticated: typing.Optional[AuthenticatedKey]):
+        if authenticated is None:
+            self._cache.pop(key_hash, None)
+            self._bounded(self._negative, self.negative_max_entries, key_hash, time.monotonic() + self.negative_ttl)
+        else:
+            self._negative.pop(key_hash, None)
+            self._bounded(self._cache, self.max_entries, key_hash, (authenticated, time.monotonic() + self.ttl))
+
+    async def authenticate(self, key: str) -> typing.Optional[AuthenticatedKey]:
+        key_hash = hash_apikey(key)
+
+        now = time.monotonic()
+        entry = self._cache.get(key_hash)
+        if entry is not None and entry[1] > now:
+            self.hits += 1
+            authenticated = entry[0]
+        elif self._negative.get(key_hash, 0) > now:
+            self.hits += 1
+            authenticated = None
+        else:
+            self.misses += 1
+            authenticated = await self._load(key_hash)
+            self._store(key_hash, authenticated)
+
+        # Keys are looked up by their hash, which doesn't reveal the key through timing.
+        return authenticated
+
+    def invalidate(self, key_hash: str):
+        self._cache.pop(key_hash, None)
+        self._negative.pop(key_hash, None)
+
+    def clear(self):
+        self._cache.clear()
+        self._negative.clear()
+
+
+authenticator = APIKeyAuthenticator(
+    ttl=config.AUTH_CACHE_TTL,
+    negative_ttl=config.AUTH_NEGATIVE_CACHE_TTL,
+    max_entries=config.AUTH_CACHE_MAX_ENTRIES,
+    negative_max_entries=config.AUTH_NEGATIVE_CACHE_MAX_ENTRIES,
+)
+
+
+@event.listens_for(APIKey, "after_update")
+def _invalidate_updated_key(mapper, connection, target: APIKey):
+    if target.deleted_at is not None:
+        authenticator.invalidate(target.key_hash)
+
+
+@event.listens_for(APIKey, "after_delete")
+def _invalidate_deleted_key(mapper, connection, target: APIKey):
+    authenticator.invalidate(target.key_hash)
+
+
+async def require_api_key(request: Request) -> AuthenticatedKey:
+    """
+    FastAPI dependency rejecting requests without a valid API key. The key is available afterwards as `request.state.api_key`.
+    """
+    key = bearer_token(request)
+    authenticated = await authenticator.authenticate(key) if key else None
+    if authenticated is None:
+        raise HTTPException(status_code=401, detail="Invalid or missing API key", headers={"WWW-Authenticate": "Bearer"})
+
+    request.state.api_key = authenticated
+    return authenticated
@@ -0,0 +1,225 @@
+from abc import ABC, abstractmethod
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+import typing
+
+from nexura.exceptions import StateError
+from nexura.state import protocol
+from nexura.state.client import AsyncStateClient
+
+
+logger = logging.getLogger(__name__)
+
+class CacheBackend(ABC):
+    """
+    Shared, second level storage behind the in-process LRU cache.
+    """
+    @abstractmethod
+    async def get(self, key: str) -> typing.Optional[bytes]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: typing.Optional[float] = None):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+    async def compare_and_set(self, key: str, expected: typing.Optional[bytes], value: bytes, ttl: typing.Optional[float] = None) -> bool:
+        """
+        Atomically set a key if its value is `expected`, or if it doesn't exist when `expected` is None.
+
+        Returns:
+            bool: Whether the value was set.
+        """
+        raise NotImplementedError(f"{type(self).__name__} doesn't support compare and set")
+
+    async def close(self):
+        pass
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Cache stored in a local SQLite file, it survives restarts and is shared by all workers on the same host.
+    """
+    # Expired rows are purged every `PURGE_INTERVAL` writes.
+    PURGE_INTERVAL = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)")
+
+    def _get(self, key: str) -> typing.Optional[bytes]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, time.time())
+            ).fetchone()
+
+        return row[0] if row else None
+
+    def _set(self, key: str, value: bytes, ttl: typing.Optional[float]):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl if ttl is not None else None),
+            )
+
+            self._writes += 1
+            if self._writes % self.PURGE_INTERVAL == 0:
+                self._connection.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+
+    def _delete(self, key: str):
+        with self._lock:
+            self._connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def _compare_and_set(self, key: str, expected: typing.Optional[bytes], value: bytes, ttl: typing.Optional[float]) -> bool:
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        # Single statements, atomic for the other processes using the file too.
+        with self._lock:
+            if expected is None:
+                # Inserted, or replacing an expired row.
+                cursor = self._connection.execute(
+                    "INSERT INTO cache (key, value, expires_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at WHERE cache.expires_at <= ?",
+                    (key, value, expires_at, now),
+                )
+            else:
+                cursor = self._connection.execute(
+                    "UPDATE cache SET value = ?, expires_at = ? WHERE key = ? AND value = ? AND (expires_at IS NULL OR expires_at > ?)",
+                    (value, expires_at, key, expected, now),
+                )
+
+        return cursor.rowcount == 1
+
+    async def get(self, key: str) -> typing.Optional[bytes]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: bytes, ttl: typing.Optional[float] = None):
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self._delete, key)
+
+    async def compare_and_set(self, key: str, expected: typing.Optional[bytes], value: bytes, ttl: typing.Optional[float] = None) -> bool:
+        return await asyncio.to_thread(self._compare_and_set, key, expected, value, ttl)
+
+    async def close(self):
+        self._connection.close()
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cache stored in Redis (or any server speaking its protocol), requires the optional `redis` package.
+    """
+    # Compare and set, atomic as a script: key, then expected value, new value and TTL in milliseconds (empty without).
+    COMPARE_AND_SET = """
+    if redis.call("GET", KEYS[1]) ~= ARGV[1] then
+        return 0
+    end
+    if ARGV[3] == "" then
+        redis.call("SET", KEYS[1], ARGV[2])
+    else
+        redis.call("SET", KEYS[1], ARGV[2], "PX", ARGV[3])
+    end
+    return 1
+    """
+
+    def __init__(self, url: str, prefix: str = "nexura:cache:"):
+        try:
+            from redis import asyncio as redis
+        except ImportError as e:
+            raise ImportError("RedisCacheBackend requires the `redis` package, install it with `pip install redis`") from e
+
+        self.prefix = prefix
+        self._redis = redis.from_url(url)
+
+    async def get(self, key: str) -> typing.Optional[bytes]:
+        return await self._redis.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: typing.Optional[float] = None):
+        await self._redis.set(self.prefix + key, value, px=int(ttl * 1000) if ttl is not None else None)
+
+    async def delete(self, key: str):
+        await self._redis.delete(self.prefix + key)
+
+    async def compare_and_set(self, key: str, expected: typing.Optional[bytes], value: bytes, ttl: typing.Optional[float] = None) -> bool:
+        px = int(ttl * 1000) if ttl is not None else None
+        if expected is None:
+            return bool(await self._redis.set(self.prefix + key, value, px=px, nx=True))
+
+        return bool(await self._redis.eval(self.COMPARE_AND_SET, 1, self.prefix + key, expected, value, px if px is not None else ""))
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+class StateCacheBackend(CacheBackend):
+    """
+    Cache held by the state daemon (`nexura.state`), shared by the workers of a host. Lookups are a round trip on a Unix socket, pipelined with the other requests of the worker.
+
+    While the daemon is unreachable, lookups miss and writes are dropped, so requests still go through.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._client = AsyncStateClient(path)
+
+    async def get(self, key: str) -> typing.Optional[bytes]:
+        try:
+            status, fields = await self._client.request(protocol.GET, key.encode())
+        except StateError as e:
+            logger.warning(f"Cache lookup failed: {e}")
+            return None
+
+        return fields[0] if status == protocol.OK else None
+
+    async def set(self, key: str, value: bytes, ttl: typing.Optional[float] = None):
+        try:
+            await self._client.request(protocol.SET, key.encode(), value, protocol.number(ttl) if ttl is not None else b"")
+        except StateError as e:
+            logger.warning(f"Cache write failed: {e}")
+
+    async def delete(self, key: str):
+        try:
+            await self._client.request(protocol.DELETE, key.encode())
+        except StateError as e:
+            logger.warning(f"Cache delete failed: {e}")
+
+    async def compare_and_set(self, key: str, expected: typing.Optional[bytes], value: bytes, ttl: typing.Optional[float] = None) -> bool:
+        fields = [key.encode(), value, protocol.number(ttl) if ttl is not None else b""]
+        if expected is not None:
+            fields.append(expected)
+        try:
+            _, fields = await self._client.request(protocol.CAS, *fields)
+        except StateError as e:
+            # Dropped like other writes, callers go on as if it was set.
+            logger.warning(f"Cache write failed: {e}")
+            return True
+
+        return fields[0] == b"1"
+
+    async def close(self):
+        await self._client.close()
+
+
+def create_backend(url: str) -> CacheBackend:
+    """
+    Create a cache backend from an URL, `sqlite:///path/to/cache.db`, `redis://host:port/db` or `nexura+unix:///path/to/state.sock`.
+    """
+    if url.startswith(protocol.SCHEME):
+        return StateCacheBackend(protocol.socket_path(url))
+    if url.startswith("sqlite:///"):
+        return SQLiteCacheBackend(url.removeprefix("sqlite:///"))
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCacheBackend(url)
+
+    raise ValueError(f"Unsupported cache backend {url}")
@@ -0,0 +1,23 @@
+import hashlib
+import typing
+
+import orjson
+
+from nexura.utils.serialization import encode
+
+
+def canonical_json(body: typing.Any) -> bytes:
+    """
+    Serialize a request body so that equal requests always produce the same bytes (sorted keys, no whitespace).
+    """
+    return orjson.dumps(encode(body), option=orjson.OPT_SORT_KEYS, default=str)
+
+
+def canonical_hash(provider_id: str, endpoint_id: str, body: typing.Any) -> str:
+    """
+    Hash identifying a request to a given provider endpoint, used as a cache key.
+    """
+    digest = hashlib.sha256(f"{provider_id}/{endpoint_id}\n".encode())
+    digest.update(canonical_json(body))
+
+    return digest.hexdigest()
@@ -0,0 +1,81 @@
+from collections import OrderedDict
+import time
+import typing
+
+
+class LRUCache():
+    """
+    In-process least recently used cache of byte strings, bounded by number of entries and total size, with per-entry TTL.
+
+    Not thread-safe, it's meant to be used from the event loop only.
+    """
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: typing.Optional[float] = None,
+        on_evict: typing.Optional[typing.Callable[[str], None]] = None,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # Called with the key of every entry dropped because of the size limits or its TTL.
+        self.on_evict = on_evict
+
+        self._entries: "OrderedDict[str, typing.Tuple[bytes, typing.Optional[float]]]" = OrderedDict()
+        self.size = 0
+
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def get(self, key: str) -> typing.Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            if self.on_evict is not None:
+                self.on_evict(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: bytes, ttl: typing.Optional[float] = None):
+        if len(value) > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        ttl = ttl if ttl is not None else self.ttl
+        self._entries[key] = (value, time.monotonic() + ttl if ttl is not None else None)
+        self.size += len(value)
+
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(oldest)
+
+    def delete(self, key: str):
+        if key in self._entries:
+            self._remove(key)
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def _remove(self, key: str):
+        value, _ = self._entries.pop(key)
+        self.size -= len(value)
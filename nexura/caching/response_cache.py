@@ -0,0 +1,99 @@
+from dataclasses import dataclass
+import json
+import typing
+
+import httpx
+
+from nexura import config
+from nexura.caching.backends import CacheBackend, create_backend
+from nexura.caching.lru import LRUCache
+
+
+@dataclass
+class CachedResponse:
+    status_code: int
+    content_type: typing.Optional[str]
+    content: bytes
+    # Price of the original upstream request, saved again on every hit.
+    cost: typing.Optional[float] = None
+
+    def dumps(self) -> bytes:
+        header = json.dumps({"status_code": self.status_code, "content_type": self.content_type, "cost": self.cost})
+        return header.encode() + b"\n" + self.content
+
+    @classmethod
+    def loads(cls, data: bytes) -> "CachedResponse":
+        header, content = data.split(b"\n", 1)
+        return cls(content=content, **json.loads(header))
+
+    @classmethod
+    def from_response(cls, response: httpx.Response, cost: typing.Optional[float] = None) -> "CachedResponse":
+        return cls(response.status_code, response.headers.get("content-type"), response.content, cost)
+
+    def to_response(self) -> httpx.Response:
+        headers = {"content-type": self.content_type} if self.content_type else None
+        return httpx.Response(self.status_code, headers=headers, content=self.content, extensions={"nexura_cached": True})
+
+
+class ResponseCache():
+    """
+    Cache of upstream responses to deterministic requests, keyed by `nexura.caching.keys.canonical_hash`.
+
+    Lookups go to the in-process LRU first and then to the optional shared backend, backend hits are promoted to the LRU.
+    """
+    def __init__(self, lru: LRUCache, backend: typing.Optional[CacheBackend] = None):
+        self.lru = lru
+        self.backend = backend
+
+        self.hits = 0
+        self.misses = 0
+        self.cost_saved = 0.0
+
+    async def get(self, key: str) -> typing.Optional[CachedResponse]:
+        data = self.lru.get(key)
+        if data is None and self.backend is not None:
+            data = await self.backend.get(key)
+            if data is not None:
+                self.lru.set(key, data)
+
+        if data is None:
+            self.misses += 1
+            return None
+
+        cached = CachedResponse.loads(data)
+        self.hits += 1
+        if cached.cost:
+            self.cost_saved += cached.cost
+
+        return cached
+
+    async def set(self, key: str, cached: CachedResponse):
+        data = cached.dumps()
+        self.lru.set(key, data)
+        if self.backend is not None:
+            await self.backend.set(key, data, self.lru.ttl)
+
+    async def close(self):
+        if self.backend is not None:
+            await self.backend.close()
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.lru.evictions,
+            "expirations": self.lru.expirations,
+            "entries": len(self.lru),
+            "bytes": self.lru.size,
+            "cost_saved": self.cost_saved,
+        }
+
+
+def create_response_cache() -> typing.Optional[ResponseCache]:
+    if not config.CACHE_ENABLED:
+        return None
+
+    lru = LRUCache(config.CACHE_MAX_ENTRIES, config.CACHE_MAX_BYTES, config.CACHE_TTL)
+    backend = create_backend(config.CACHE_BACKEND) if config.CACHE_BACKEND else None
+
+    return ResponseCache(lru, backend)
@@ -0,0 +1,239 @@
+from abc import ABC, abstractmethod
+import re
+import typing
+import zlib
+
+import numpy as np
+
+from nexura import config
+from nexura.caching.keys import canonical_hash
+from nexura.caching.lru import LRUCache
+from nexura.caching.response_cache import CachedResponse
+
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Lowercase the text and drop punctuation and repeated whitespace, which don't change the meaning of a prompt.
+    """
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+
+class Embedder(ABC):
+    dim: int
+
+    @abstractmethod
+    def embed(self, texts: typing.Sequence[str]) -> np.ndarray:
+        """
+        Embed a batch of normalized texts.
+
+        Returns:
+            np.ndarray: `(len(texts), dim)` float32 matrix of L2-normalized vectors.
+        """
+        raise NotImplementedError
+
+
+class HashingEmbedder(Embedder):
+    """
+    Local embedder hashing word unigrams and bigrams into a fixed number of buckets, weighted by sublinear term frequency.
+
+    It needs no model nor network, and is good at matching prompts differing only in formatting or a few words.
+    """
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def _features(self, text: str) -> typing.List[int]:
+        words = text.split()
+        grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        return [zlib.crc32(gram.encode()) % self.dim for gram in grams]
+
+    def embed(self, texts: typing.Sequence[str]) -> np.ndarray:
+        rows: typing.List[int] = []
+        columns: typing.List[int] = []
+        for i, text in enumerate(texts):
+            features = self._features(text)
+            rows.extend([i] * len(features))
+            columns.extend(features)
+
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(vectors, (np.asarray(rows, dtype=np.intp), np.asarray(columns, dtype=np.intp)), 1.0)
+        np.log1p(vectors, out=vectors)
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class VectorIndex():
+    """
+    Growable matrix of unit vectors searched by exact cosine similarity (a single matrix product per batch of queries).
+
+    Removed rows are zeroed, so they never score above any positive threshold, and their slots are reused.
+    """
+    def __init__(self, dim: int, capacity: int = 1024):
+        self.dim = dim
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._size = 0
+        self._free: typing.List[int] = []
+
+    def __len__(self) -> int:
+        return self._size - len(self._free)
+
+    def _grow(self, needed: int):
+        capacity = len(self._vectors)
+        if needed <= capacity:
+            return
+
+        while capacity < needed:
+            capacity *= 2
+
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        self._vectors = vectors
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        ids = []
+        for vector in vectors:
+            if self._free:
+                row = self._free.pop()
+            else:
+                self._grow(self._size + 1)
+                row = self._size
+                self._size += 1
+
+            self._vectors[row] = vector
+            ids.append(row)
+
+        return np.asarray(ids, dtype=np.intp)
+
+    def extend(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Append a batch of vectors without reusing free slots, much faster than `add` for bulk loads.
+        """
+        start = self._size
+        self._grow(start + len(vectors))
+        self._vectors[start:start + len(vectors)] = vectors
+        self._size += len(vectors)
+
+        return np.arange(start, self._size, dtype=np.intp)
+
+    def remove(self, row: int):
+        self._vectors[row] = 0.0
+        self._free.append(row)
+
+    def search(self, queries: np.ndarray, k: int = 1) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the `k` most similar vectors for every query.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: `(len(queries), k)` matrices of similarities and row ids, most similar first.
+        """
+        if self._size == 0:
+            empty = np.empty((len(queries), 0))
+            return empty, empty.astype(np.intp)
+
+        scores = queries @ self._vectors[:self._size].T
+        k = min(k, self._size)
+        if k == 1:
+            top = np.argmax(scores, axis=1)[:, None]
+        elif k < self._size:
+            top = np.argpartition(scores, -k, axis=1)[:, -k:]
+        else:
+            top = np.broadcast_to(np.arange(self._size), scores.shape)
+
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+
+        return np.take_along_axis(top_scores, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+
+class SemanticCache():
+    """
+    Cache of responses to prompts similar to previously answered ones.
+
+    Requests are split by the endpoint into a scope (all parameters which must match exactly, e.g. the model) and a text compared by cosine similarity of its embedding. Each scope has its own vector index, responses are kept in an LRU cache whose evictions also free their index rows.
+    """
+    def __init__(self, lru: LRUCache, embedder: typing.Optional[Embedder] = None, threshold: float = 0.95):
+        self.embedder = embedder or HashingEmbedder()
+        self.threshold = threshold
+
+        self.lru = lru
+        self.lru.on_evict = self._on_evict
+        self.indexes: typing.Dict[str, VectorIndex] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.cost_saved = 0.0
+
+    @staticmethod
+    def _entry_key(scope: str, row: int) -> str:
+        return f"{scope}:{row}"
+
+    def _on_evict(self, key: str):
+        scope, row = key.rsplit(":", 1)
+        index = self.indexes.get(scope)
+        if index is not None:
+            index.remove(int(row))
+
+    def scope(self, provider_id: str, endpoint_id: str, params: typing.Any) -> str:
+        return canonical_hash(provider_id, endpoint_id, params)
+
+    def lookup_many(self, scope: str, texts: typing.Sequence[str]) -> typing.List[typing.Optional[CachedResponse]]:
+        index = self.indexes.get(scope)
+        if index is None or len(index) == 0:
+            self.misses += len(texts)
+            return [None] * len(texts)
+
+        scores, rows = index.search(self.embedder.embed([normalize_text(text) for text in texts]), k=1)
+
+        results = []
+        for score, row in zip(scores[:, 0], rows[:, 0]):
+            data = self.lru.get(self._entry_key(scope, int(row))) if score >= self.threshold else None
+            if data is None:
+                self.misses += 1
+                results.append(None)
+                continue
+
+            cached = CachedResponse.loads(data)
+            self.hits += 1
+            if cached.cost:
+                self.cost_saved += cached.cost
+            results.append(cached)
+
+        return results
+
+    def lookup(self, scope: str, text: str) -> typing.Optional[CachedResponse]:
+        return self.lookup_many(scope, [text])[0]
+
+    def store(self, scope: str, text: str, cached: CachedResponse):
+        data = cached.dumps()
+        if len(data) > self.lru.max_bytes:
+            return
+
+        index = self.indexes.get(scope)
+        if index is None:
+            index = self.indexes[scope] = VectorIndex(self.embedder.dim)
+
+        row = int(index.add(self.embedder.embed([normalize_text(text)]))[0])
+        self.lru.set(self._entry_key(scope, row), data)
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.lru.evictions,
+            "expirations": self.lru.expirations,
+            "entries": len(self.lru),
+            "bytes": self.lru.size,
+            "cost_saved": self.cost_saved,
+        }
+
+
+def create_semantic_cache() -> typing.Optional[SemanticCache]:
+    if not config.SEMANTIC_CACHE_ENABLED:
+        return None
+
+    lru = LRUCache(config.SEMANTIC_CACHE_MAX_ENTRIES, config.SEMANTIC_CACHE_MAX_BYTES, config.SEMANTIC_CACHE_TTL)
+    return SemanticCache(lru, HashingEmbedder(config.SEMANTIC_CACHE_DIM), config.SEMANTIC_CACHE_THRESHOLD)
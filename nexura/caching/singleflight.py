@@ -0,0 +1,68 @@
+import asyncio
+import typing
+
+
+T = typing.TypeVar("T")
+
+
+class _Call():
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight():
+    """
+    Share a single in-flight call between concurrent callers using the same key.
+
+    The call runs in its own task, so a caller going away (e.g. a client disconnecting) doesn't cancel it for the others. It's cancelled only once every caller is gone.
+    """
+    def __init__(self):
+        self._calls: typing.Dict[str, _Call] = {}
+
+        self.calls = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def _forget(self, key: str, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key: str, fn: typing.Callable[[], typing.Awaitable[T]]) -> typing.Tuple[T, bool]:
+        """
+        Run `fn`, or wait for the result of the call already running under `key`.
+
+        Returns:
+            Tuple[T, bool]: The result, and whether it was shared from another caller's call.
+        """
+        call = self._calls.get(key)
+        shared = call is not None
+        if call is None:
+            call = self._calls[key] = _Call(asyncio.ensure_future(fn()))
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task), shared
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+                # New callers must start a fresh call instead of joining the cancelled one.
+                self._forget(key, call)
+            raise
+        finally:
+            call.waiters -= 1
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        total = self.calls + self.coalesced
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "coalesce_ratio": self.coalesced / total if total else 0.0,
+            "in_flight": len(self._calls),
+        }
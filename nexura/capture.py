@@ -0,0 +1,233 @@
+import asyncio
+import datetime
+import gzip
+import logging
+import os
+import random
+import time
+import typing
+
+import orjson
+
+from nexura import config
+
+
+logger = logging.getLogger(__name__)
+
+# Keys whose values are always removed, wherever they appear.
+SECRET_KEYS = frozenset({"api_key", "apikey", "authorization", "password", "secret", "user"})
+# Keys holding prompt and completion text, replaced by filler text of the same length.
+CONTENT_KEYS = frozenset({"content", "text", "message", "chatbot_global_action", "arguments", "generated_text"})
+FILLER = "lorem ipsum dolor sit amet "
+
+
+def redact(value: typing.Any, key: typing.Optional[str] = None, content: bool = True) -> typing.Any:
+    """
+    Remove secrets from a decoded JSON request or response, and with `content` replace its prompt and completion texts by filler text of the same length, so a replay sends payloads of the same size.
+    """
+    if key in SECRET_KEYS:
+        return "[redacted]"
+
+    if isinstance(value, dict):
+        return {k: redact(v, k, content) for k, v in value.items()}
+
+    if isinstance(value, list):
+        return [redact(item, key, content) for item in value]
+
+    if content and key in CONTENT_KEYS and isinstance(value, str):
+        return (FILLER * (len(value) // len(FILLER) + 1))[:len(value)]
+
+    return value
+
+
+def read_captures(path: str) -> typing.Iterator[typing.Dict[str, typing.Any]]:
+    """
+    Records of a capture segment (`.jsonl.gz`) or of a plain JSONL file, one JSON object per line. Lines which aren't JSON objects are skipped.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        for line in f:
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                continue
+
+            if isinstance(record, dict):
+                yield record
+
+
+class TrafficCapture():
+    """
+    Write a sample of the requests and their responses, redacted and with their timings, to compressed JSONL segments, to replay the real traffic mix later (`benchmarks/replay.py`).
+
+    Requests only append their raw bodies to a buffer. A background task writes the buffer every `flush_interval` seconds, in a thread: bodies are decoded, redacted and encoded there, then appended to the current segment as a new gzip member. Segments are never rewritten, and a segment cut short by a crash is readable up to its last complete flush. A new segment is started once the current one reaches `segment_bytes` or `segment_seconds`.
+
+    When `max_buffer` records are waiting, further ones are dropped (and counted), so a slow disk never slows requests down.
+    """
+    def __init__(
+        self,
+        directory: str,
+        sample_rate: float = 1.0,
+        redact_content: bool = True,
+        segment_bytes: int = 64 * 1024 * 1024,
+        segment_seconds: float = 3600.0,
+        flush_interval: float = 1.0,
+        max_buffer: int = 100000,
+    ):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.redact_content = redact_content
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+
+        self._buffer: typing.List[typing.Tuple[typing.Any, ...]] = []
+        self._segment: typing.Optional[str] = None
+        self._segment_started = 0.0
+        self._task: typing.Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+        self.captured = 0
+        self.dropped = 0
+        self.written = 0
+
+    def sample(self) -> bool:
+        """
+        Whether to capture the next request, decided before doing any work for it.
+        """
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def record(
+        self,
+        provider_id: str,
+        endpoint_id: str,
+        request: bytes,
+        status: int,
+        response: typing.Optional[bytes],
+        latency: float,
+        upstream: typing.Optional[float],
+        streamed: bool = False,
+    ) -> bool:
+        """
+        Queue a request and its response for the next write.
+
+        Args:
+            request: The raw request body.
+            response: The raw response body, `None` for streamed responses.
+            latency: Seconds to answer the request.
+            upstream: Seconds spent waiting for the upstream, `None` if it wasn't called.
+        """
+        if len(self._buffer) >= self.max_buffer:
+            self.dropped += 1
+            return False
+
+        self._buffer.append((time.time(), provider_id, endpoint_id, request, status, response, latency, upstream, streamed))
+        self.captured += 1
+        return True
+
+    def _encode(self, buffer: typing.List[typing.Tuple[typing.Any, ...]]) -> bytes:
+        lines = []
+        for ts, provider_id, endpoint_id, request, status, response, latency, upstream, streamed in buffer:
+            lines.append(orjson.dumps({
+                "ts": ts,
+                "provider": provider_id,
+                "endpoint": endpoint_id,
+                "body": self._decode(request),
+                "status": status,
+                "response": self._decode(response),
+                "latency": latency,
+                "upstream": upstream,
+                "streamed": streamed,
+            }))
+
+        return b"\n".join(lines) + b"\n"
+
+    def _decode(self, content: typing.Optional[bytes]) -> typing.Any:
+        if not content:
+            return None
+
+        try:
+            return redact(orjson.loads(content), content=self.redact_content)
+        except orjson.JSONDecodeError:
+            # Not JSON (e.g. an HTML error page), only its size is kept.
+            return {"size": len(content)}
+
+    def _write(self, buffer: typing.List[typing.Tuple[typing.Any, ...]]):
+        data = self._encode(buffer)
+
+        now = time.time()
+        if self._segment is None or now - self._segment_started >= self.segment_seconds or os.path.getsize(self._segment) >= self.segment_bytes:
+            os.makedirs(self.directory, exist_ok=True)
+            started = datetime.datetime.fromtimestamp(now, datetime.timezone.utc).strftime("%Y%m%dT%H%M%S")
+            # The process id keeps the segments of several workers apart.
+            self._segment = os.path.join(self.directory, f"capture-{started}-{os.getpid()}.jsonl.gz")
+            self._segment_started = now
+
+        with open(self._segment, "ab") as f:
+            with gzip.GzipFile(fileobj=f, mode="wb") as member:
+                member.write(data)
+
+        self.written += len(buffer)
+
+    async def flush(self):
+        if not self._buffer:
+            return
+
+        buffer, self._buffer = self._buffer, []
+        try:
+            await asyncio.to_thread(self._write, buffer)
+        except Exception:
+            logger.exception(f"Failed to write {len(buffer)} captured requests")
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            # Writes never overlap, a segment only ever has a single writer.
+            await self.flush()
+
+    def start(self):
+        self._stopping = False
+        self._wakeup.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the background task once the requests still buffered are written.
+        """
+        self._stopping = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+        await self.flush()
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "captured": self.captured,
+            "dropped": self.dropped,
+            "written": self.written,
+            "segment": self._segment,
+        }
+
+
+def create_traffic_capture() -> typing.Optional[TrafficCapture]:
+    if not config.CAPTURE_DIR:
+        return None
+
+    return TrafficCapture(
+        config.CAPTURE_DIR,
+        sample_rate=config.CAPTURE_SAMPLE_RATE,
+        redact_content=config.CAPTURE_REDACT_CONTENT,
+        segment_bytes=config.CAPTURE_SEGMENT_BYTES,
+        segment_seconds=config.CAPTURE_SEGMENT_SECONDS,
+    )
+
+
+traffic_capture = create_traffic_capture()
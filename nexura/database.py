@@ -0,0 +1,35 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from nexura import config
+
+
+def _engine_options(url: str) -> dict:
+    # SQLite keeps SQLAlchemy's default pool, the sizing options are meant for server databases.
+    if url.startswith("sqlite"):
+        return {}
+
+    return {
+        "pool_size": config.DATABASE_POOL_SIZE,
+        "max_overflow": config.DATABASE_MAX_OVERFLOW,
+        "pool_recycle": config.DATABASE_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+engine = create_async_engine(config.DATABASE_URL, **_engine_options(config.DATABASE_URL))
+
+async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def init_db():
+    # Import the models, so their tables are registered in the metadata.
+    import nexura.models  # noqa: F401
+
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+
+
+async def close_db():
+    await engine.dispose()
@@ -0,0 +1,103 @@
+import datetime
+import typing
+
+
+class NexuraError(Exception):
+    """Base class for all errors raised by Nexura."""
+
+
+class NotFoundError(NexuraError, ValueError):
+    """Raised when a provider, endpoint or routing strategy doesn't exist or is disabled."""
+
+
+class ProviderNotFoundError(NotFoundError):
+    def __init__(self, provider_id: str):
+        super().__init__(f"Provider {provider_id} not found")
+        self.provider_id = provider_id
+
+
+class EndpointNotFoundError(NotFoundError):
+    def __init__(self, provider_id: str, endpoint_id: str):
+        super().__init__(f"Endpoint {endpoint_id} of provider {provider_id} not found")
+        self.provider_id = provider_id
+        self.endpoint_id = endpoint_id
+
+
+class StrategyNotFoundError(NotFoundError):
+    def __init__(self, name: str):
+        super().__init__(f"Routing strategy {name} not found")
+        self.name = name
+
+
+class PriceNotFoundError(NotFoundError):
+    def __init__(self, provider_id: str, model: typing.Optional[str], at: typing.Optional[datetime.date] = None):
+        super().__init__(f"Model {model} of provider {provider_id} has no price" + (f" on {at}" if at else ""))
+        self.provider_id = provider_id
+        self.model = model
+        self.at = at
+
+
+class RateLimitExceededError(NexuraError):
+    def __init__(self, dimension: str, retry_after: float):
+        super().__init__(f"Rate limit of {dimension} exceeded, retry after {retry_after:.3f}s")
+        self.dimension = dimension
+        self.retry_after = retry_after
+
+
+class RequestTooLargeError(NexuraError):
+    """Raised when a request needs more tokens than the burst of its token limit, so it could never be let through."""
+
+    def __init__(self, tokens: int, burst: float):
+        super().__init__(f"Request needs {tokens} tokens, above the token burst of {burst:.0f}")
+        self.tokens = tokens
+        self.burst = burst
+
+
+class UpstreamError(NexuraError):
+    """Raised when a typed response is requested but the upstream answered with an error."""
+
+    def __init__(self, status_code: int, content: bytes):
+        super().__init__(f"Upstream responded with status {status_code}")
+        self.status_code = status_code
+        self.content = content
+
+
+class BudgetExceededError(NexuraError):
+    """Raised before sending a request whose worst-case cost is above the allowed one."""
+
+    def __init__(self, cost: float, budget: float):
+        super().__init__(f"Request may cost up to ${cost:.6f}, above the limit of ${budget:.6f}")
+        self.cost = cost
+        self.budget = budget
+
+
+class CircuitOpenError(NexuraError):
+    """Raised instead of calling an upstream whose circuit breaker is open, after repeated failures."""
+
+    def __init__(self, provider_id: str, endpoint_id: str, retry_after: float):
+        super().__init__(f"Circuit of {provider_id}/{endpoint_id} is open, retry after {retry_after:.3f}s")
+        self.provider_id = provider_id
+        self.endpoint_id = endpoint_id
+        self.retry_after = retry_after
+
+
+class WebhookError(NexuraError):
+    """Raised when a job's webhook URL isn't allowed, e.g. it reaches a private or loopback address."""
+
+
+class StateError(NexuraError):
+    """Raised when the state daemon shared by the worker processes can't be reached or rejects a request."""
+
+
+class SessionError(NexuraError):
+    """Raised when a request can't be part of a conversation session."""
+
+
+class TemplateError(NexuraError):
+    """Raised when a prompt template can't be registered or used by a request."""
+
+
+class TemplateNotFoundError(NotFoundError):
+    def __init__(self, reference: str):
+        super().__init__(f"Template {reference} not found")
+        self.reference = reference
@@ -0,0 +1,398 @@
+import asyncio
+import datetime
+import ipaddress
+import logging
+import random
+import socket
+import time
+import typing
+from urllib.parse import urlsplit
+
+from fastapi import HTTPException
+import httpx
+
+from nexura import config
+from nexura.exceptions import CircuitOpenError, RateLimitExceededError, RequestTooLargeError, WebhookError
+from nexura.ratelimit.limiter import rate_limiter
+
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+async def check_webhook_url(url: str):
+    """
+    Reject webhook URLs which could reach the gateway's own network: only `http` and `https`, to the hosts of `NEXURA_JOBS_WEBHOOK_HOSTS` when set, else to hosts whose addresses are all public (not private, loopback, link-local nor reserved).
+
+    Raises:
+        WebhookError: The URL isn't allowed.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise WebhookError(f"Webhook URL {url} isn't an absolute http(s) URL")
+
+    host = parts.hostname.lower()
+    if config.JOBS_WEBHOOK_HOSTS:
+        if host not in config.JOBS_WEBHOOK_HOSTS:
+            raise WebhookError(f"Webhook host {host} isn't allowed")
+        return
+
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        addresses = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (OSError, ValueError) as e:
+        raise WebhookError(f"Webhook host {host} can't be resolved: {e}")
+
+    for *_, sockaddr in addresses:
+        # IPv6 addresses may come with a scope, `fe80::1%eth0`.
+        address = ipaddress.ip_address(sockaddr[0].partition("%")[0])
+        if not address.is_global:
+            raise WebhookError(f"Webhook host {host} resolves to the non-public address {address}")
+
+
+class JobQueue():
+    """
+    Run requests in the background, from a queue persisted in the database so jobs survive restarts.
+
+    A dispatcher claims due jobs in priority order, as many as there are free slots, and runs each in its own task. Jobs failing with a network error or a retryable status are retried up to `max_attempts` times, after a backoff with full jitter.
+
+    Writes go through `_write`, which commits all the writes waiting at the same time in a single transaction. SQLite allows a single writer, so this avoids `database is locked` errors under load, and most of the cost of a commit is shared.
+
+    Attempts time out after `timeout` seconds. Jobs still `running` twice as long after they started belong to a worker that stopped abruptly, they are claimed again like queued jobs, so several worker processes can share the queue.
+    """
+    def __init__(
+        self,
+        session_factory=None,
+        concurrency: int = 16,
+        max_attempts: int = 5,
+        retry_base: float = 1.0,
+        retry_max: float = 60.0,
+        poll_interval: float = 1.0,
+        timeout: float = 300.0,
+    ):
+        if session_factory is None:
+            # Imported here rather than at the top, so SQLAlchemy is only loaded when jobs are used.
+            from nexura.database import async_session as session_factory
+
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+        self._running: typing.Set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+        self._task: typing.Optional[asyncio.Task] = None
+        self._stopping = False
+        self._webhooks: typing.Optional[httpx.AsyncClient] = None
+        self._writes: typing.List[typing.Tuple[typing.Callable[[typing.Any], typing.Awaitable[typing.Any]], asyncio.Future]] = []
+        self._writer: typing.Optional[asyncio.Task] = None
+
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+
+    async def _write(self, operation: typing.Callable[[typing.Any], typing.Awaitable[typing.Any]]) -> typing.Any:
+        """
+        Run `operation(session)` in the next transaction and return its result once committed.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._writes.append((operation, future))
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write_batches())
+
+        return await future
+
+    async def _write_batches(self):
+        try:
+            while self._writes:
+                batch, self._writes = self._writes, []
+                try:
+                    async with self.session_factory() as session:
+                        results = [await operation(session) for operation, _ in batch]
+                        await session.commit()
+                except Exception as e:
+                    # The whole transaction is rolled back, so every write of the batch failed.
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                for (_, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            self._writer = None
+
+    async def submit(self, key: str, provider_id: str, endpoint_id: str, body: str, priority: int = 0, webhook_url: typing.Optional[str] = None):
+        """
+        Persist a job, it's dispatched as soon as a slot is free.
+
+        Returns:
+            Job: The queued job, with its `id`.
+        """
+        from nexura.models.job import Job
+
+        job = Job(key=key, provider_id=provider_id, endpoint_id=endpoint_id, body=body, priority=priority, webhook_url=webhook_url, max_attempts=self.max_attempts)
+
+        async def add(session):
+            session.add(job)
+
+        await self._write(add)
+
+        self.submitted += 1
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str):
+        from nexura.models.job import Job
+
+        async with self.session_factory() as session:
+            return await session.get(Job, job_id)
+
+    async def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job which hasn't started yet.
+
+        Returns:
+            bool: Whether the job was cancelled.
+        """
+        from sqlalchemy import update
+
+        from nexura.models.job import Job
+
+        now = datetime.datetime.utcnow()
+        statement = update(Job).where(Job.id == job_id, Job.status == QUEUED).values(status=CANCELLED, completed_at=now, updated_at=now)
+
+        async def cancel(session):
+            return (await session.execute(statement)).rowcount
+
+        return await self._write(cancel) == 1
+
+    async def claim(self, limit: int) -> list:
+        """
+        Mark up to `limit` due jobs as running and return them, highest priority first.
+
+        A single `UPDATE ... RETURNING` statement, so two workers never claim the same job.
+        """
+        from sqlalchemy import and_, or_, select, update
+
+        from nexura.models.job import Job
+
+        now = datetime.datetime.utcnow()
+        lost = and_(Job.status == RUNNING, Job.started_at < now - datetime.timedelta(seconds=2 * self.timeout))
+        claimable = or_(and_(Job.status == QUEUED, Job.run_at <= now), lost)
+        due = select(Job.id).where(claimable).order_by(Job.priority.desc(), Job.run_at).limit(limit)
+        statement = (
+            update(Job)
+            .where(Job.id.in_(due.scalar_subquery()), claimable)
+            .values(status=RUNNING, attempts=Job.attempts + 1, started_at=now, updated_at=now)
+            .returning(*Job.__table__.columns)
+        )
+
+        async def claim(session):
+            # Rows rather than ORM objects: jobs submitted in the same transaction are already in the session, with their values before the update.
+            return [Job(**row._mapping) for row in await session.execute(statement)]
+
+        jobs = await self._write(claim)
+        jobs.sort(key=lambda job: (-job.priority, job.run_at))
+        return jobs
+
+    def backoff(self, attempts: int) -> float:
+        # Full jitter: retries of jobs which failed together are spread over the whole window.
+        return random.uniform(0, min(self.retry_max, self.retry_base * 2 ** (attempts - 1)))
+
+    async def _finish(self, job, **values):
+        from sqlalchemy import update
+
+        from nexura.models.job import Job
+
+        values["updated_at"] = datetime.datetime.utcnow()
+        statement = update(Job).where(Job.id == job.id).values(**values)
+
+        async def finish(session):
+            await session.execute(statement)
+
+        await self._write(finish)
+
+        for name, value in values.items():
+            setattr(job, name, value)
+
+    async def execute(self, job):
+        """
+        Send the request of a claimed job and store its outcome.
+        """
+        from nexura.providers import nexura_provider
+        from nexura.routes.handler import record_usage, to_response
+        from nexura.strategies.routing.base import RETRYABLE_STATUS_CODES
+
+        start = time.perf_counter()
+        status_code, content_type, result, error = None, None, None, None
+        # Least seconds before a retry, when the upstream can't be called until then.
+        retry_after = 0.0
+        reservation = None
+        try:
+            endpoint = nexura_provider.get_route(job.provider_id, job.endpoint_id)
+            body = endpoint.parse_body(job.body)
+            if rate_limiter is not None:
+                # Jobs take the rate limits of their key when they run, like the requests they defer.
+                reservation = rate_limiter.acquire(job.key, endpoint.estimate_tokens(body))
+            r = await asyncio.wait_for(nexura_provider.handle_request(job.provider_id, job.endpoint_id, body=body), self.timeout)
+
+            usage = endpoint.peek_usage(r.content) if r.status_code == 200 and not r.extensions.get("nexura_cached") else None
+            record_usage(job.key, endpoint, body, usage, reservation, time.perf_counter() - start)
+            reservation = None
+
+            response = to_response(r)
+            status_code, content_type, result = response.status_code, response.headers.get("content-type"), response.body.decode(errors="replace")
+            retryable = status_code in RETRYABLE_STATUS_CODES
+        except RateLimitExceededError as e:
+            # Not an attempt, the job runs once its key is under the limit again.
+            await self._finish(job, status=QUEUED, attempts=job.attempts - 1, run_at=datetime.datetime.utcnow() + datetime.timedelta(seconds=e.retry_after))
+            return
+        except RequestTooLargeError as e:
+            status_code, error, retryable = 413, str(e), False
+        except HTTPException as e:
+            # Upstream response not matching the typed response.
+            status_code, error, retryable = e.status_code, e.detail, False
+        except (httpx.HTTPError, asyncio.TimeoutError) as e:
+            error, retryable = repr(e), True
+        except CircuitOpenError as e:
+            error, retryable, retry_after = str(e), True, e.retry_after
+        except asyncio.CancelledError:
+            # The queue is stopping, the job runs again on the next start without counting this attempt.
+            await self._finish(job, status=QUEUED, attempts=job.attempts - 1, run_at=datetime.datetime.utcnow())
+            raise
+        except Exception as e:
+            logger.exception(f"Job {job.id} failed")
+            error, retryable = repr(e), False
+        finally:
+            if reservation is not None and reservation.tokens:
+                # No usage was reported, the reserved tokens are given back.
+                rate_limiter.reconcile(reservation, 0)
+
+        now = datetime.datetime.utcnow()
+        if retryable and job.attempts < job.max_attempts:
+            self.retried += 1
+            retry_at = now + datetime.timedelta(seconds=max(retry_after, self.backoff(job.attempts)))
+            await self._finish(job, status=QUEUED, run_at=retry_at, status_code=status_code, content_type=content_type, result=result, error=error)
+            return
+
+        status = SUCCEEDED if status_code is not None and status_code < 400 else FAILED
+        if status == SUCCEEDED:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+        await self._finish(job, status=status, completed_at=now, status_code=status_code, content_type=content_type, result=result, error=error)
+        if job.webhook_url:
+            await self._notify(job)
+
+    async def _notify(self, job):
+        from nexura.routes.jobs import job_content
+
+        try:
+            # Again, the host may resolve to other addresses since the job was submitted.
+            await check_webhook_url(job.webhook_url)
+        except WebhookError as e:
+            logger.warning(f"Webhook of job {job.id} not sent: {e}")
+            return
+
+        try:
+            r = await self._webhooks.post(job.webhook_url, content=job_content(job), headers={"content-type": "application/json"})
+            r.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning(f"Webhook of job {job.id} to {job.webhook_url} failed: {e!r}")
+
+    def _start_job(self, job):
+        task = asyncio.create_task(self.execute(job))
+        self._running.add(task)
+
+        def done(task: asyncio.Task):
+            self._running.discard(task)
+            # A slot is free.
+            self._wakeup.set()
+
+        task.add_done_callback(done)
+
+    async def _run(self):
+        while not self._stopping:
+            self._wakeup.clear()
+
+            free = self.concurrency - len(self._running)
+            if free > 0:
+                try:
+                    jobs = await self.claim(free)
+                except Exception:
+                    logger.exception("Failed to claim jobs")
+                    jobs = []
+
+                for job in jobs:
+                    self._start_job(job)
+
+                if len(jobs) == free:
+                    # There may be more due jobs, claim them as soon as slots are free.
+                    continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        self._stopping = False
+        self._webhooks = httpx.AsyncClient(timeout=config.HTTP_TIMEOUT)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        """
+        Stop dispatching and wait up to `timeout` seconds for running jobs, the others are cancelled and queued again.
+        """
+        self._stopping = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+        if self._running:
+            _, pending = await asyncio.wait(set(self._running), timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        if self._webhooks is not None:
+            await self._webhooks.aclose()
+
+    def stats(self) -> typing.Dict[str, int]:
+        return {
+            "submitted": self.submitted,
+            "running": len(self._running),
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retried": self.retried,
+        }
+
+
+def create_job_queue() -> typing.Optional[JobQueue]:
+    if not config.JOBS_ENABLED:
+        return None
+
+    return JobQueue(
+        concurrency=config.JOBS_CONCURRENCY,
+        max_attempts=config.JOBS_MAX_ATTEMPTS,
+        retry_base=config.JOBS_RETRY_BASE,
+        retry_max=config.JOBS_RETRY_MAX,
+        poll_interval=config.JOBS_POLL_INTERVAL,
+        timeout=config.JOBS_TIMEOUT,
+    )
+
+
+job_queue = create_job_queue()
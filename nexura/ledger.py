@@ -0,0 +1,213 @@
+import asyncio
+from dataclasses import asdict, dataclass, field
+import datetime
+import logging
+import time
+import typing
+
+from nexura import config
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class UsageEntry:
+    key: str
+    provider_id: str
+    endpoint_id: str
+    model: typing.Optional[str]
+    prompt_tokens: int
+    completion_tokens: int
+    cost: typing.Optional[float]
+    latency: float
+    created_at: datetime.datetime = field(default_factory=datetime.datetime.utcnow)
+
+
+class UsageLedger():
+    """
+    Record the usage and cost of every request without adding database latency to it.
+
+    Requests push entries onto a bounded in-memory queue, a background task flushes them in bulk inserts every `flush_interval` seconds (or as soon as `batch_size` entries are waiting), and upserts per key/day/model rollups every `rollup_interval` seconds.
+
+    When the queue is full `record` drops the entry and counts it in `dropped`, so a slow database never slows requests down. Use `put` to wait for room instead.
+    """
+    def __init__(
+        self,
+        session_factory=None,
+        max_queue: int = 100000,
+        batch_size: int = 1000,
+        flush_interval: float = 1.0,
+        rollup_interval: float = 60.0,
+    ):
+        if session_factory is None:
+            # Imported here rather than at the top, so SQLAlchemy is only loaded when the ledger is used.
+            from nexura.database import async_session as session_factory
+
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rollup_interval = rollup_interval
+
+        self.queue: asyncio.Queue[UsageEntry] = asyncio.Queue(maxsize=max_queue)
+        self._rollups: typing.Dict[typing.Tuple[str, datetime.date, str], typing.List[float]] = {}
+        self._task: typing.Optional[asyncio.Task] = None
+        self._stopping = False
+
+        self.recorded = 0
+        self.dropped = 0
+        self.flushed = 0
+
+    def record(self, entry: UsageEntry) -> bool:
+        try:
+            self.queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+        self.recorded += 1
+        return True
+
+    async def put(self, entry: UsageEntry):
+        await self.queue.put(entry)
+        self.recorded += 1
+
+    def start(self):
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the background task once every queued entry is written.
+        """
+        self._stopping = True
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    async def _next_batch(self) -> typing.List[UsageEntry]:
+        batch: typing.List[UsageEntry] = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+
+            timeout = deadline - time.monotonic()
+            if timeout <= 0 or self._stopping:
+                break
+
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        next_rollup = time.monotonic() + self.rollup_interval
+        while True:
+            batch = await self._next_batch()
+            if batch:
+                try:
+                    await self.flush(batch)
+                except Exception:
+                    logger.exception(f"Failed to write {len(batch)} usage records")
+
+            if self._stopping and self.queue.empty():
+                break
+
+            if time.monotonic() >= next_rollup:
+                await self._safe_rollup()
+                next_rollup = time.monotonic() + self.rollup_interval
+
+        await self._safe_rollup()
+
+    async def flush(self, batch: typing.List[UsageEntry]):
+        from sqlalchemy import insert
+
+        from nexura.models.usage import UsageRecord
+
+        rows = [asdict(entry) | {"updated_at": entry.created_at} for entry in batch]
+        async with self.session_factory() as session:
+            await session.execute(insert(UsageRecord), rows)
+            await session.commit()
+
+        self.flushed += len(batch)
+
+        for entry in batch:
+            self._add_rollup((entry.key, entry.created_at.date(), entry.model or ""), (1, entry.prompt_tokens, entry.completion_tokens, entry.cost or 0.0))
+
+    def _add_rollup(self, key: typing.Tuple[str, datetime.date, str], totals: typing.Sequence[float]):
+        rollup = self._rollups.setdefault(key, [0, 0, 0, 0.0])
+        for i, value in enumerate(totals):
+            rollup[i] += value
+
+    async def _safe_rollup(self):
+        try:
+            await self.rollup()
+        except Exception:
+            logger.exception("Failed to update usage rollups")
+
+    async def rollup(self):
+        """
+        Add the usage flushed since the last rollup to the per key/day/model totals.
+
+        A single upsert adding to the stored totals, so workers rolling up the same key, day and model don't overwrite each other. If it fails, the totals are kept for the next rollup.
+        """
+        if not self._rollups:
+            return
+
+        from sqlalchemy.dialects import postgresql, sqlite
+
+        from nexura.models.usage import UsageRollup
+
+        rollups, self._rollups = self._rollups, {}
+        now = datetime.datetime.utcnow()
+        rows = [
+            {"key": key, "day": day, "model": model, "requests": requests, "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "cost": cost, "created_at": now, "updated_at": now}
+            for (key, day, model), (requests, prompt_tokens, completion_tokens, cost) in rollups.items()
+        ]
+        try:
+            async with self.session_factory() as session:
+                insert = postgresql.insert if session.get_bind().dialect.name == "postgresql" else sqlite.insert
+                statement = insert(UsageRollup)
+                statement = statement.on_conflict_do_update(
+                    index_elements=["key", "day", "model"],
+                    set_={
+                        "requests": UsageRollup.requests + statement.excluded.requests,
+                        "prompt_tokens": UsageRollup.prompt_tokens + statement.excluded.prompt_tokens,
+                        "completion_tokens": UsageRollup.completion_tokens + statement.excluded.completion_tokens,
+                        "cost": UsageRollup.cost + statement.excluded.cost,
+                        "updated_at": statement.excluded.updated_at,
+                    },
+                )
+                await session.execute(statement, rows)
+                await session.commit()
+        except BaseException:
+            for key, totals in rollups.items():
+                self._add_rollup(key, totals)
+            raise
+
+    def stats(self) -> typing.Dict[str, int]:
+        return {
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "flushed": self.flushed,
+            "queued": self.queue.qsize(),
+        }
+
+
+def create_usage_ledger() -> typing.Optional[UsageLedger]:
+    if not config.LEDGER_ENABLED:
+        return None
+
+    return UsageLedger(
+        max_queue=config.LEDGER_MAX_QUEUE,
+        batch_size=config.LEDGER_BATCH_SIZE,
+        flush_interval=config.LEDGER_FLUSH_INTERVAL,
+        rollup_interval=config.LEDGER_ROLLUP_INTERVAL,
+    )
+
+
+usage_ledger = create_usage_ledger()
@@ -1,14 +1,105 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 import dotenv
 
 dotenv.load_dotenv("../.env")
 
-app = FastAPI()
+from nexura import config  # noqa: E402
+from nexura.capture import traffic_capture  # noqa: E402
+from nexura.jobs import job_queue  # noqa: E402
+from nexura.ledger import usage_ledger  # noqa: E402
+from nexura.metrics import metrics  # noqa: E402
+from nexura.providers import nexura_provider  # noqa: E402
+from nexura.routes.batch import handle_batch  # noqa: E402
+from nexura.routes.breakers import breaker_states  # noqa: E402
+from nexura.routes.cache import cache_stats  # noqa: E402
+from nexura.routes.docs import docs_json  # noqa: E402
+from nexura.routes.estimate import estimate_request  # noqa: E402
+from nexura.routes.handler import handle_request, handle_routed_request  # noqa: E402
+from nexura.routes.routing import routing_stats_view  # noqa: E402
+from nexura.sessions import session_store  # noqa: E402
+from nexura.state.sync import state_sync  # noqa: E402
+from nexura.templates import template_registry  # noqa: E402
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the pooled HTTP clients of all providers once, so requests reuse upstream connections.
+    await nexura_provider.open()
+    # Imported here, tokenizers are only needed once the app runs.
+    from nexura.tokenization.registry import load_tokenizers
+    await load_tokenizers()
+    uses_database = config.AUTH_ENABLED or usage_ledger is not None or job_queue is not None
+    if uses_database:
+        # Imported here, so workers not using the database don't pay for importing SQLAlchemy.
+        from nexura.database import close_db, init_db
+        await init_db()
+    if usage_ledger is not None:
+        usage_ledger.start()
+    if job_queue is not None:
+        job_queue.start()
+    if traffic_capture is not None:
+        traffic_capture.start()
+    if state_sync is not None:
+        state_sync.start()
+    yield
+    if state_sync is not None:
+        await state_sync.stop()
+    if traffic_capture is not None:
+        await traffic_capture.stop()
+    if job_queue is not None:
+        await job_queue.stop()
+    if usage_ledger is not None:
+        # Write the usage still queued before closing the database.
+        await usage_ledger.stop()
+    if session_store is not None:
+        # Write the turns of streams which just ended.
+        await session_store.close()
+    if template_registry is not None:
+        await template_registry.close()
+    await nexura_provider.close()
+    if uses_database:
+        await close_db()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]
 )
 
-app.add_api_route("{provider}/{endpoint}")
+app.add_api_route("/cache/stats", cache_stats, methods=["GET"])
+app.add_api_route("/docs.json", docs_json, methods=["GET"])
+app.add_api_route("/routing/stats", routing_stats_view, methods=["GET"])
+app.add_api_route("/breakers", breaker_states, methods=["GET"])
+if metrics is not None:
+    from nexura.routes.metrics import metrics_view
+    app.add_api_route("/metrics", metrics_view, methods=["GET"])
+# Routes proxying requests to the providers, the only ones requiring an API key.
+proxy_dependencies = None
+if config.AUTH_ENABLED:
+    from nexura.auth import require_api_key
+    proxy_dependencies = [Depends(require_api_key)]
+
+app.add_api_route("/batch", handle_batch, methods=["POST"], dependencies=proxy_dependencies)
+app.add_api_route("/estimate/{provider}/{endpoint}", estimate_request, methods=["POST"], dependencies=proxy_dependencies)
+if job_queue is not None:
+    from nexura.routes.jobs import cancel_job, get_job, submit_job
+    app.add_api_route("/jobs/{provider}/{endpoint}", submit_job, methods=["POST"], dependencies=proxy_dependencies)
+    app.add_api_route("/jobs/{job_id}", get_job, methods=["GET"], dependencies=proxy_dependencies)
+    app.add_api_route("/jobs/{job_id}", cancel_job, methods=["DELETE"], dependencies=proxy_dependencies)
+if session_store is not None:
+    from nexura.routes.sessions import delete_session, get_session, session_stats
+    app.add_api_route("/sessions", session_stats, methods=["GET"], dependencies=proxy_dependencies)
+    app.add_api_route("/sessions/{session_id}", get_session, methods=["GET"], dependencies=proxy_dependencies)
+    app.add_api_route("/sessions/{session_id}", delete_session, methods=["DELETE"], dependencies=proxy_dependencies)
+if template_registry is not None:
+    from nexura.routes.templates import get_template, put_template, template_stats
+    app.add_api_route("/templates", template_stats, methods=["GET"], dependencies=proxy_dependencies)
+    app.add_api_route("/templates/{name}/{version}", get_template, methods=["GET"], dependencies=proxy_dependencies)
+    app.add_api_route("/templates/{name}/{version}", put_template, methods=["PUT"], dependencies=proxy_dependencies)
+app.add_api_route("/route/{strategy}", handle_routed_request, methods=["POST"], dependencies=proxy_dependencies)
+app.add_api_route("/{provider}/{endpoint}", handle_request, methods=["POST"], dependencies=proxy_dependencies)
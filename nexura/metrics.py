@@ -0,0 +1,263 @@
+import bisect
+import time
+import typing
+
+from nexura import config
+
+
+# Upper bounds (seconds) of the latency buckets, from a cache hit to a long completion.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+Labels = typing.Tuple[str, ...]
+
+
+def _escape(value: typing.Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: typing.Sequence[str], values: typing.Sequence[typing.Any]) -> str:
+    if not names:
+        return ""
+
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _histogram_samples(name: str, names: Labels, labels: Labels, buckets: typing.Sequence[float], counts: typing.Sequence[float], total: float) -> typing.Iterator[str]:
+    count = 0
+    for bound, observed in zip(tuple(buckets) + (float("inf"),), counts):
+        count += observed
+        yield f"{name}_bucket{_format_labels(names + ('le',), labels + (_format_value(bound),))} {count}"
+
+    yield f"{name}_sum{_format_labels(names, labels)} {_format_value(total)}"
+    yield f"{name}_count{_format_labels(names, labels)} {count}"
+
+
+def _family(name: str, type: str, documentation: str, samples: typing.Iterable[str]) -> typing.Iterator[str]:
+    yield f"# HELP {name} {documentation}"
+    yield f"# TYPE {name} {type}"
+    yield from samples
+
+
+class Histogram():
+    """
+    Distribution of durations for every combination of label values.
+
+    Each series is a single list: the count of every bucket, the values above the last bucket, then the sum. Observing a value is a dict lookup, a binary search and two additions, buckets are only made cumulative when rendered.
+    """
+    def __init__(self, name: str, documentation: str, labels: typing.Sequence[str] = (), buckets: typing.Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self.series: typing.Dict[Labels, typing.List[float]] = {}
+
+    def observe(self, labels: Labels, value: float):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 2)
+
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> typing.Iterator[str]:
+        return _family(self.name, "histogram", self.documentation, (
+            sample for labels, series in self.series.items() for sample in _histogram_samples(self.name, self.labels, labels, self.buckets, series[:-1], series[-1])
+        ))
+
+
+REQUEST_LABELS = ("provider", "endpoint", "model", "status")
+USAGE_LABELS = ("provider", "endpoint", "model")
+# `model` label of the models beyond `max_models`.
+OTHER_MODEL = "other"
+
+
+class Metrics():
+    """
+    Counters and latency histograms of the request path, rendered in the Prometheus text format at `/metrics`.
+
+    Everything recorded about a request is kept in a single list per label values (`requests`, `usage`), so recording it is a single dict lookup whatever the number of metrics. Metrics live in plain dicts updated by the event loop, without locks. Every process has its own: under `nexura.serve` the workers add theirs up in the state daemon (`nexura.state.sync`), so `/metrics` reports all of them whichever worker is scraped.
+    """
+    def __init__(self, buckets: typing.Sequence[float] = LATENCY_BUCKETS, max_models: int = 100):
+        self.buckets = tuple(sorted(buckets))
+        self.max_models = max_models
+        # `model` label values seen, by provider and endpoint. Models are client input (EdenAI's `providers`), they're bounded.
+        self._models: typing.Dict[typing.Tuple[str, str], typing.Set[str]] = {}
+
+        # By provider, endpoint, model and status: buckets and sum of the duration, then of the gateway overhead, bytes in and bytes out.
+        self.requests: typing.Dict[Labels, typing.List[float]] = {}
+        # By provider, endpoint and model: prompt tokens, completion tokens, cost, then the time spent pricing and the requests priced.
+        self.usage: typing.Dict[Labels, typing.List[float]] = {}
+
+        self.upstream_duration = Histogram("nexura_upstream_duration_seconds", "Time of upstream calls, retries included, until the headers for streamed responses.", ("provider", "endpoint", "status"), buckets)
+        self.upstream_ttfb = Histogram("nexura_upstream_ttfb_seconds", "Time from sending an upstream request to receiving its response headers.", ("provider",), buckets)
+        self.pool_wait = Histogram("nexura_upstream_pool_wait_seconds", "Time upstream requests waited for a connection, from the provider's pool or newly opened.", ("provider",), buckets)
+
+        # Every family of series by name, with the length of its series.
+        n = len(self.buckets) + 2
+        self._families: typing.Dict[str, typing.Tuple[typing.Dict[Labels, typing.List[float]], int]] = {
+            "requests": (self.requests, 2 * n + 2),
+            "usage": (self.usage, 5),
+            **{histogram.name: (histogram.series, len(histogram.buckets) + 2) for histogram in (self.upstream_duration, self.upstream_ttfb, self.pool_wait)},
+        }
+
+    def values(self) -> typing.Iterator[typing.Tuple[str, Labels, int, float]]:
+        """
+        Every value recorded, with the name of its family, its label values and its position in the series. All of them only ever grow, so the values of several processes add up.
+        """
+        for family, (series_by_labels, _) in self._families.items():
+            for labels, series in series_by_labels.items():
+                for index, value in enumerate(series):
+                    yield family, labels, index, value
+
+    def add(self, family: str, labels: Labels, index: int, value: float):
+        """
+        Add to a value given by `values`, e.g. of another process.
+        """
+        series_by_labels, length = self._families[family]
+        series = series_by_labels.get(labels)
+        if series is None:
+            series = series_by_labels[labels] = [0] * length
+
+        # Counts come back from the state daemon as floats, they're rendered as integers.
+        series[index] += int(value) if float(value).is_integer() else value
+
+    def _model_label(self, provider_id: str, endpoint_id: str, model: typing.Optional[str]) -> str:
+        model = model or ""
+        models = self._models.get((provider_id, endpoint_id))
+        if models is None:
+            models = self._models[(provider_id, endpoint_id)] = set()
+
+        if model not in models:
+            if len(models) >= self.max_models:
+                return OTHER_MODEL
+            models.add(model)
+
+        return model
+
+    def observe_request(self, provider_id: str, endpoint_id: str, model: typing.Optional[str], status: int, duration: float, upstream: typing.Optional[float], bytes_in: int, bytes_out: int):
+        """
+        Args:
+            duration: Seconds to answer the request.
+            upstream: Seconds spent waiting for the upstream, `None` if the request failed before being sent.
+            bytes_in: Size of the request body.
+            bytes_out: Size of the response body.
+        """
+        labels = (provider_id, endpoint_id, model or "", status)
+        series = self.requests.get(labels)
+        n = len(self.buckets) + 2
+        if series is None:
+            # A new series, the model may be one too many.
+            labels = (provider_id, endpoint_id, self._model_label(provider_id, endpoint_id, model), status)
+            series = self.requests.get(labels)
+            if series is None:
+                series = self.requests[labels] = [0] * (2 * n + 2)
+
+        series[bisect.bisect_left(self.buckets, duration)] += 1
+        series[n - 1] += duration
+        if upstream is not None:
+            overhead = max(0.0, duration - upstream)
+            series[n + bisect.bisect_left(self.buckets, overhead)] += 1
+            series[2 * n - 1] += overhead
+        series[2 * n] += bytes_in
+        series[2 * n + 1] += bytes_out
+
+    def observe_usage(self, provider_id: str, endpoint_id: str, model: typing.Optional[str], usage: typing.Mapping[str, typing.Any], cost: typing.Optional[float], pricing_duration: float):
+        labels = (provider_id, endpoint_id, model or "")
+        series = self.usage.get(labels)
+        if series is None:
+            labels = (provider_id, endpoint_id, self._model_label(provider_id, endpoint_id, model))
+            series = self.usage.get(labels)
+            if series is None:
+                series = self.usage[labels] = [0, 0, 0.0, 0.0, 0]
+
+        series[0] += usage.get("prompt_tokens") or 0
+        series[1] += usage.get("completion_tokens") or 0
+        if cost is not None:
+            series[2] += cost
+        series[3] += pricing_duration
+        series[4] += 1
+
+    def _render_requests(self) -> typing.Iterator[str]:
+        n = len(self.buckets) + 2
+        requests = self.requests.items()
+
+        yield from _family("nexura_requests_total", "counter", "Requests handled.", (
+            f"nexura_requests_total{_format_labels(REQUEST_LABELS, labels)} {sum(series[:n - 1])}" for labels, series in requests
+        ))
+        yield from _family("nexura_request_duration_seconds", "histogram", "Time to answer a request, until the last byte for streamed responses.", (
+            sample for labels, series in requests for sample in _histogram_samples("nexura_request_duration_seconds", REQUEST_LABELS, labels, self.buckets, series[:n - 1], series[n - 1])
+        ))
+        yield from _family("nexura_gateway_overhead_seconds", "histogram", "Time a request spent in the gateway rather than waiting for the upstream (parsing, routing, caching, serialization).", (
+            sample for labels, series in requests if any(series[n:2 * n - 1]) for sample in _histogram_samples("nexura_gateway_overhead_seconds", REQUEST_LABELS, labels, self.buckets, series[n:2 * n - 1], series[2 * n - 1])
+        ))
+        for index, name, documentation in ((2 * n, "nexura_request_bytes_total", "Bytes of request bodies received."), (2 * n + 1, "nexura_response_bytes_total", "Bytes of response bodies sent.")):
+            yield from _family(name, "counter", documentation, (
+                f"{name}{_format_labels(REQUEST_LABELS, labels)} {_format_value(series[index])}" for labels, series in requests
+            ))
+
+    def _render_usage(self) -> typing.Iterator[str]:
+        usage = self.usage.items()
+
+        yield from _family("nexura_tokens_total", "counter", "Tokens used, by type (`prompt` or `completion`).", (
+            f"nexura_tokens_total{_format_labels(USAGE_LABELS + ('type',), labels + (type,))} {_format_value(series[index])}"
+            for labels, series in usage for index, type in ((0, "prompt"), (1, "completion"))
+        ))
+        yield from _family("nexura_cost_dollars_total", "counter", "Cost of the requests.", (
+            f"nexura_cost_dollars_total{_format_labels(USAGE_LABELS, labels)} {_format_value(series[2])}" for labels, series in usage
+        ))
+        # Pricing takes microseconds, its average is enough: a summary without quantiles.
+        yield from _family("nexura_pricing_duration_seconds", "summary", "Time to price a request.", (
+            sample for labels, series in usage for sample in (
+                f"nexura_pricing_duration_seconds_sum{_format_labels(USAGE_LABELS, labels)} {_format_value(series[3])}",
+                f"nexura_pricing_duration_seconds_count{_format_labels(USAGE_LABELS, labels)} {series[4]}",
+            )
+        ))
+
+    def render(self) -> str:
+        lines = [
+            *self._render_requests(),
+            *self.upstream_duration.render(),
+            *self.upstream_ttfb.render(),
+            *self.pool_wait.render(),
+            *self._render_usage(),
+        ]
+
+        return "\n".join(lines) + "\n"
+
+
+class ConnectionTrace():
+    """
+    `httpcore` trace callback recording how long the upstream requests of a provider waited for a connection, kept alive in the pool or newly opened.
+
+    The wait ends when the request starts sending its headers. The callback then removes itself from the request's `extensions`, so the following events aren't traced at all. Requests must set `nexura_start` in their `extensions`.
+    """
+    __slots__ = ("metrics", "labels")
+
+    def __init__(self, metrics: Metrics, labels: Labels):
+        self.metrics = metrics
+        self.labels = labels
+
+    async def __call__(self, name: str, info: typing.Dict[str, typing.Any]):
+        if not name.endswith(".send_request_headers.started"):
+            return
+
+        extensions = info["request"].extensions
+        self.metrics.pool_wait.observe(self.labels, time.perf_counter() - extensions["nexura_start"])
+        del extensions["trace"]
+
+
+def create_metrics() -> typing.Optional[Metrics]:
+    if not config.METRICS_ENABLED:
+        return None
+
+    return Metrics(max_models=config.METRICS_MAX_MODELS)
+
+
+metrics = create_metrics()
@@ -0,0 +1,6 @@
+from nexura.models.api_key import APIKey
+from nexura.models.job import Job
+from nexura.models.usage import UsageRecord, UsageRollup
+from nexura.models.user import User
+
+__all__ = ["APIKey", "Job", "UsageRecord", "UsageRollup", "User"]
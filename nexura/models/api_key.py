@@ -1,15 +1,32 @@
-import secrets
+import typing
 from sqlmodel import Field, Relationship
 
 from nexura.models.base import BaseWithDeleted
+# Kept importable from here, they live apart so the request path doesn't have to import SQLModel.
+from nexura.utils.api_key import generate_apikey, hash_apikey  # noqa: F401
 
-
-def generate_apikey() -> str:
-    return secrets.token_urlsafe(32)
+if typing.TYPE_CHECKING:
+    from nexura.models.user import User
 
 
 class APIKey(BaseWithDeleted, table=True):
-    key: str = Field(default=generate_apikey, primary_key=True)
+    # Only the SHA-256 of the key is stored, the key itself is shown once, when it's created.
+    key_hash: str = Field(primary_key=True)
+    # First characters of the key, to let users tell their keys apart.
+    prefix: str
+    # Jobs submitted with this key are dispatched before those of keys with a lower priority.
+    job_priority: int = 0
+
+    user_id: str = Field(foreign_key="user.id", index=True)
+    user: "User" = Relationship(back_populates="api_keys")
+
+    @classmethod
+    def create(cls, user_id: str) -> typing.Tuple["APIKey", str]:
+        """
+        Create a new API key for a user.
 
-    user_id: str = Field(foreign_key="user.id")
-    user = Relationship(back_populates="api_keys")
+        Returns:
+            Tuple[APIKey, str]: The model to save and the plain key to give to the user.
+        """
+        key = generate_apikey()
+        return cls(key_hash=hash_apikey(key), prefix=key[:8], user_id=user_id), key
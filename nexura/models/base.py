@@ -1,15 +1,16 @@
 import datetime
+import typing
 from sqlmodel import Field, SQLModel
 
 
 class Base(SQLModel):
-    created_at = Field(default=datetime.datetime.utcnow)
-    updated_at = Field(default=datetime.datetime.utcnow)
+    created_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
+    updated_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
 
 
 class BaseWithDeleted(Base):
-    deleted_at = Field(default=None)
+    deleted_at: typing.Optional[datetime.datetime] = Field(default=None)
 
 
 class BaseWithID(Base):
-    id: int = Field(default=None, primary_key=True)
+    id: typing.Optional[int] = Field(default=None, primary_key=True)
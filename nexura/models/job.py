@@ -0,0 +1,41 @@
+import datetime
+import typing
+import uuid
+
+from sqlalchemy import Column, Index, Text
+from sqlmodel import Field
+
+from nexura.models.base import Base
+
+
+class Job(Base, table=True):
+    __tablename__ = "job"
+    # Jobs are claimed in this order.
+    __table_args__ = (Index("ix_job_dispatch", "status", "priority", "run_at"),)
+
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex, primary_key=True)
+    # Hash of the API key, or the client address for anonymous requests.
+    key: str = Field(index=True)
+    provider_id: str
+    endpoint_id: str
+    # Request body, as sent upstream.
+    body: str = Field(sa_column=Column(Text, nullable=False))
+    # URL the finished job is posted to.
+    webhook_url: typing.Optional[str] = None
+
+    # `queued`, `running`, `succeeded`, `failed` or `cancelled`.
+    status: str = "queued"
+    # Higher priorities are dispatched first, from `APIKey.job_priority`.
+    priority: int = 0
+    attempts: int = 0
+    max_attempts: int = 1
+    # Not dispatched before this time, pushed back after every failed attempt.
+    run_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
+    started_at: typing.Optional[datetime.datetime] = None
+    completed_at: typing.Optional[datetime.datetime] = None
+
+    # Upstream response of the last attempt.
+    status_code: typing.Optional[int] = None
+    content_type: typing.Optional[str] = None
+    result: typing.Optional[str] = Field(default=None, sa_column=Column(Text))
+    error: typing.Optional[str] = None
@@ -0,0 +1,32 @@
+import datetime
+import typing
+from sqlmodel import Field
+
+from nexura.models.base import Base, BaseWithID
+
+
+class UsageRecord(BaseWithID, table=True):
+    __tablename__ = "usage_record"
+
+    # Hash of the API key, or the client address for anonymous requests.
+    key: str = Field(index=True)
+    provider_id: str
+    endpoint_id: str
+    model: typing.Optional[str] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: typing.Optional[float] = None
+    # Seconds from receiving the request to the end of the upstream response.
+    latency: float = 0.0
+
+
+class UsageRollup(Base, table=True):
+    __tablename__ = "usage_rollup"
+
+    key: str = Field(primary_key=True)
+    day: datetime.date = Field(primary_key=True)
+    model: str = Field(primary_key=True)
+    requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
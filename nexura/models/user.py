@@ -1,10 +1,12 @@
+import typing
+import uuid
 from sqlmodel import Field, Relationship
 from nexura.models.api_key import APIKey
 
 from nexura.models.base import Base
 
 
-class User(Base):
-    id = Field(default=None, primary_key=True)
+class User(Base, table=True):
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex, primary_key=True)
 
-    api_keys: list[APIKey] = Relationship(back_populates="user")
+    api_keys: typing.List[APIKey] = Relationship(back_populates="user")
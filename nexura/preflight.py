@@ -0,0 +1,57 @@
+from dataclasses import dataclass
+import typing
+
+from nexura import config
+from nexura.exceptions import BudgetExceededError
+
+
+@dataclass
+class CostEstimate:
+    # Model the request is sent to.
+    model: typing.Optional[str]
+    # Tokens of the prompt, counted locally.
+    prompt_tokens: int
+    # Most tokens the request can generate, from `max_tokens` (times the number of choices) or the model's output limit.
+    completion_tokens: int
+    # Price of the request if it generates `completion_tokens`, in dollars.
+    max_cost: typing.Optional[float]
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+# Called with the endpoint, the request body and its estimate before the request is sent, may raise to reject it.
+PreflightHook = typing.Callable[[typing.Any, typing.Any, CostEstimate], None]
+
+preflight_hooks: typing.List[PreflightHook] = []
+
+
+def add_preflight_hook(hook: PreflightHook):
+    preflight_hooks.append(hook)
+
+
+def run_preflight(endpoint, body: typing.Any) -> typing.Optional[CostEstimate]:
+    """
+    Estimate a request and run the preflight hooks on it, once per request.
+
+    Returns:
+        CostEstimate: The estimate, or `None` if the endpoint can't estimate its requests, hooks aren't run then.
+    """
+    estimate = endpoint.estimate_cost(body)
+    if estimate is None:
+        return None
+
+    for hook in preflight_hooks:
+        hook(endpoint, body, estimate)
+
+    return estimate
+
+
+def max_cost_hook(endpoint, body: typing.Any, estimate: CostEstimate):
+    if estimate.max_cost is not None and estimate.max_cost > config.MAX_REQUEST_COST:
+        raise BudgetExceededError(estimate.max_cost, config.MAX_REQUEST_COST)
+
+
+if config.MAX_REQUEST_COST:
+    add_preflight_hook(max_cost_hook)
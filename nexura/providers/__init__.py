@@ -1,54 +1,347 @@
+import logging
+import time
 import typing
+
+import orjson
+
+from nexura import config
+from nexura.caching.keys import canonical_hash
+from nexura.caching.response_cache import CachedResponse, ResponseCache, create_response_cache
+from nexura.caching.singleflight import SingleFlight
+from nexura.metrics import metrics
+from nexura.exceptions import EndpointNotFoundError, ProviderNotFoundError, StrategyNotFoundError, UpstreamError
 from nexura.providers.base import Provider
-from nexura.providers.openai import openai_provider
-from nexura.providers.edenai import edenai_provider
+from nexura.providers.discovery import base_url_overrides, discover_providers, load_provider
+from nexura.providers.endpoint import Endpoint
+from nexura.providers.policy import call_with_policy
+from nexura.providers.streaming import StreamedResponse
+from nexura.strategies.routing.base import RoutingStrategy, Target
+from nexura.strategies.routing.fallback import FallbackStrategy
+from nexura.strategies.routing.hedged import HedgedStrategy
+from nexura.strategies.routing.weighted import LatencyWeightedStrategy
+
+if typing.TYPE_CHECKING:
+    from nexura.caching.semantic import SemanticCache
 
 
+logger = logging.getLogger(__name__)
+
 class NexuraProvider:
-    def __init__(self):
-        self.providers: typing.List[Provider] = []
+    """
+    Registry of all providers and their endpoints.
+
+    Requests are dispatched through `routes`, a precompiled `(provider_id, endpoint_id) -> Endpoint` table holding only enabled providers and endpoints. The table is rebuilt on every registry change and swapped in with a single assignment, so providers can be added, removed, enabled or disabled while requests are being served.
+    """
+    def __init__(
+        self,
+        cache: typing.Optional[ResponseCache] = None,
+        semantic_cache: typing.Optional["SemanticCache"] = None,
+        singleflight: typing.Optional[SingleFlight] = None,
+    ):
+        self.providers: typing.Dict[str, Provider] = {}
+        # Providers registered by reference, imported the first time they're used.
+        self.lazy_providers: typing.Dict[str, str] = {}
+        self.routes: typing.Dict[typing.Tuple[str, str], Endpoint] = {}
+
+        self.cache = cache
+        self.semantic_cache = semantic_cache
+        self.singleflight = singleflight
+
+        self.strategies: typing.Dict[str, RoutingStrategy] = {}
+        self.base_urls = base_url_overrides()
 
     def __generate_unique_provider_id(self, provider_name: str) -> str:
-        provider_id = provider_name.lower().replace(" ", "-")
+        base_id = provider_name.lower().replace(" ", "-")
+        provider_id = base_id
         i = 0
-        while provider_id in [p.id for p in self.providers]:
-            provider_id = f"{provider_id}-{i}"
+        while provider_id in self.providers or provider_id in self.lazy_providers:
+            provider_id = f"{base_id}-{i}"
             i += 1
 
         return provider_id
 
+    @staticmethod
+    def _provider_routes(provider: Provider) -> typing.Dict[typing.Tuple[str, str], Endpoint]:
+        if not provider.enabled:
+            return {}
+
+        return {(provider.id, endpoint.id): endpoint for endpoint in provider.endpoints.values() if endpoint.enabled}
+
+    def build_routes(self):
+        """
+        Rebuild the route table. Call it after adding endpoints to, or toggling endpoints of, an already registered provider.
+        """
+        routes = {}
+        for provider in self.providers.values():
+            routes.update(self._provider_routes(provider))
+
+        self.routes = routes
+
     def add_provider(
-        self, provider: Provider
+        self, provider: Provider, provider_id: typing.Optional[str] = None
     ):
-        provider_id = self.__generate_unique_provider_id(provider.name)
+        provider_id = provider_id or self.__generate_unique_provider_id(provider.name)
         provider.id = provider_id
+        if provider_id in self.base_urls:
+            provider.base_url = self.base_urls[provider_id]
+
+        self.providers[provider_id] = provider
+
+        # Copy-and-swap instead of a full rebuild keeps bulk registration linear in practice.
+        routes = dict(self.routes)
+        routes.update(self._provider_routes(provider))
+        self.routes = routes
+
+    def register_provider(self, provider_id: str, reference: str):
+        """
+        Register a provider by its `module:attribute` reference, without importing it.
+        """
+        self.lazy_providers[provider_id] = reference
+
+    def load_provider(self, provider_id: str) -> Provider:
+        """
+        Import a provider registered with `register_provider` and add it to the registry.
+        """
+        reference = self.lazy_providers.pop(provider_id)
+        provider = load_provider(reference)
+        logger.info(f"Loaded provider {provider_id} from {reference}")
+
+        self.add_provider(provider, provider_id)
+        for endpoint in provider.endpoints.values():
+            endpoint.compile()
 
-        self.providers.append(provider)
+        return provider
+
+    def load_providers(self):
+        """
+        Import all lazily registered providers, e.g. before listing every endpoint.
+        """
+        for provider_id in list(self.lazy_providers):
+            self.load_provider(provider_id)
+
+    def remove_provider(self, provider_id: str) -> Provider:
+        """
+        Unregister a provider. Its HTTP client is left open for requests still in flight, close it with `await provider.close()`.
+        """
+        provider = self.get_provider(provider_id)
+        del self.providers[provider_id]
+        self.build_routes()
+
+        return provider
+
+    def enable_provider(self, provider_id: str):
+        self.get_provider(provider_id).enabled = True
+        self.build_routes()
+
+    def disable_provider(self, provider_id: str):
+        self.get_provider(provider_id).enabled = False
+        self.build_routes()
+
+    def add_strategy(self, name: str, strategy: RoutingStrategy):
+        self.strategies[name] = strategy
+
+    def get_strategy(self, name: str) -> RoutingStrategy:
+        strategy = self.strategies.get(name)
+        if strategy is None:
+            raise StrategyNotFoundError(name)
+
+        return strategy
 
     def get_provider(self, provider_id: str) -> Provider:
-        for provider in self.providers:
-            if provider.id == provider_id:
-                return provider
+        provider = self.providers.get(provider_id)
+        if provider is None and provider_id in self.lazy_providers:
+            provider = self.load_provider(provider_id)
+        if provider is None:
+            raise ProviderNotFoundError(provider_id)
 
-        raise ValueError(f"Provider {provider_id} not found")
+        return provider
+
+    def get_route(self, provider_id: str, endpoint_id: str) -> Endpoint:
+        endpoint = self.routes.get((provider_id, endpoint_id))
+        if endpoint is None and provider_id in self.lazy_providers:
+            self.load_provider(provider_id)
+            endpoint = self.routes.get((provider_id, endpoint_id))
+        if endpoint is None:
+            raise EndpointNotFoundError(provider_id, endpoint_id)
+
+        return endpoint
+
+    async def open(self):
+        self.build_routes()
+        for endpoint in self.routes.values():
+            endpoint.compile()
+
+        for provider in self.providers.values():
+            await provider.open()
+
+    async def close(self):
+        for provider in self.providers.values():
+            await provider.close()
+
+        if self.cache is not None:
+            await self.cache.close()
+
+    async def handle_routed_request(self, strategy_name: str, body: typing.Any):
+        return await self.get_strategy(strategy_name).handle_request(self, body)
 
     async def handle_request(self, provider_id: str, endpoint_id: str, **kwargs):
-        provider = self.get_provider(provider_id)
-        endpoint = provider.get_endpoint(endpoint_id)
-        return await endpoint.handle_request(**kwargs)
+        endpoint = self.get_route(provider_id, endpoint_id)
+        r = await self._handle_request(endpoint, **kwargs)
 
+        # Let callers account the response to the endpoint which produced it, which isn't known up front with routing strategies.
+        r.extensions["nexura_endpoint"] = endpoint
+        r.extensions["nexura_body"] = kwargs.get("body")
 
-nexura_provider = NexuraProvider()
+        return r
+
+    async def handle_typed_request(self, provider_id: str, endpoint_id: str, body: typing.Any) -> typing.Any:
+        """
+        Make a request and validate its response into the dataclass returned by the endpoint (e.g. `CompletionResponse`), whatever its response mode.
+
+        Streamed requests are returned as a `StreamedResponse`.
+
+        Raises:
+            UpstreamError: The upstream answered with an error status.
+        """
+        r = await self.handle_request(provider_id, endpoint_id, body=body)
+        if isinstance(r, StreamedResponse):
+            return r
+
+        if not r.is_success:
+            raise UpstreamError(r.status_code, r.content)
+
+        return r.extensions["nexura_endpoint"].parse_response(r.content)
+
+    async def _handle_request(self, endpoint: Endpoint, **kwargs):
+        provider_id, endpoint_id = endpoint.provider.id, endpoint.id
+
+        body = kwargs.get("body")
+        if body is None:
+            return await self._send(endpoint, **kwargs)
+
+        key = None
+        if self.cache is not None and endpoint.is_deterministic(body):
+            key = canonical_hash(provider_id, endpoint_id, body)
+            cached = await self.cache.get(key)
+            if cached is not None:
+                return cached.to_response()
+
+        semantic_key = None
+        if self.semantic_cache is not None:
+            semantic_key = endpoint.semantic_cache_key(body)
+            if semantic_key is not None:
+                params, text = semantic_key
+                semantic_key = (self.semantic_cache.scope(provider_id, endpoint_id, params), text)
+                cached = self.semantic_cache.lookup(*semantic_key)
+                if cached is not None:
+                    return cached.to_response()
+
+        r = await self._call_upstream(endpoint, **kwargs)
+
+        if r.status_code == 200 and (key is not None or semantic_key is not None):
+            cached = CachedResponse.from_response(r, self._response_cost(endpoint, body, r))
+            if key is not None:
+                await self.cache.set(key, cached)
+            if semantic_key is not None:
+                self.semantic_cache.store(*semantic_key, cached)
+
+        return r
+
+    async def _call_upstream(self, endpoint: Endpoint, **kwargs):
+        body = kwargs["body"]
+        if self.singleflight is None or endpoint.is_streaming(body):
+            return await self._send(endpoint, **kwargs)
+
+        key = canonical_hash(endpoint.provider.id, endpoint.id, body)
+        start = time.perf_counter()
+        r, shared = await self.singleflight.do(key, lambda: self._send(endpoint, **kwargs))
+        if not shared:
+            return r
+
+        # Only the caller which made the upstream call is billed for it, the others get a copy like a cache hit.
+        copy = CachedResponse.from_response(r).to_response()
+        copy.extensions["nexura_upstream_seconds"] = time.perf_counter() - start
+        return copy
+
+    @staticmethod
+    async def _send(endpoint: Endpoint, **kwargs):
+        start = time.perf_counter()
+        # Coalesced callers share the retries too, a single caller retries for all of them.
+        r = await call_with_policy(endpoint, lambda: endpoint.handle_request(**kwargs))
+
+        elapsed = time.perf_counter() - start
+        # Lets the handler tell the time spent in the gateway from the upstream wait.
+        r.extensions["nexura_upstream_seconds"] = elapsed
+        if metrics is not None:
+            metrics.upstream_duration.observe((endpoint.provider.id, endpoint.id, r.status_code), elapsed)
+
+        return r
+
+    def breaker_states(self) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+        """
+        State of the circuit breaker of every served endpoint, by `provider/endpoint`.
+        """
+        return {f"{provider_id}/{endpoint_id}": endpoint.breaker.as_dict() for (provider_id, endpoint_id), endpoint in self.routes.items()}
+
+    @staticmethod
+    def _response_cost(endpoint: Endpoint, body: typing.Any, r) -> typing.Optional[float]:
+        try:
+            return endpoint.calculate_response_cost(body, orjson.loads(r.content))
+        except ValueError:
+            logger.warning(f"Could not price response of {endpoint.provider.id}/{endpoint.id}", exc_info=True)
+            return None
+
+
+def _create_semantic_cache() -> typing.Optional["SemanticCache"]:
+    if not config.SEMANTIC_CACHE_ENABLED:
+        return None
+
+    # Imported here, so NumPy is only loaded when the semantic cache is enabled.
+    from nexura.caching.semantic import create_semantic_cache
+    return create_semantic_cache()
+
+
+# Imported on first use, the adapters import the endpoints of both providers.
+def _completions_to_edenai_chat(body):
+    from nexura.strategies.routing.adapters import completions_to_edenai_chat
+    return completions_to_edenai_chat(body)
+
+
+def _edenai_chat_to_completions(body, response):
+    from nexura.strategies.routing.adapters import edenai_chat_to_completions
+    return edenai_chat_to_completions(body, response)
+
+
+def _edenai_chat_answers_completions(body) -> bool:
+    from nexura.strategies.routing.adapters import edenai_chat_answers_completions
+    return edenai_chat_answers_completions(body)
+
+
+nexura_provider = NexuraProvider(
+    cache=create_response_cache(),
+    semantic_cache=_create_semantic_cache(),
+    singleflight=SingleFlight() if config.SINGLEFLIGHT_ENABLED else None,
+)
 
 
 def initialize_providers():
-    providers = [
-        openai_provider,
-        edenai_provider
+    for provider_id, reference in discover_providers().items():
+        nexura_provider.register_provider(provider_id, reference)
+
+
+def chat_targets() -> typing.List[Target]:
+    # OpenAI chat completions, answered by EdenAI running the same model when OpenAI fails or lags.
+    return [
+        Target("openai", "chat-completions"),
+        Target("edenai", "chat", transform=_completions_to_edenai_chat, transform_response=_edenai_chat_to_completions, accepts=_edenai_chat_answers_completions),
     ]
 
-    for provider in providers:
-        nexura_provider.add_provider(provider)
+
+def initialize_strategies():
+    nexura_provider.add_strategy("chat", FallbackStrategy(chat_targets()))
+    nexura_provider.add_strategy("chat-hedged", HedgedStrategy(chat_targets()))
+    nexura_provider.add_strategy("chat-weighted", LatencyWeightedStrategy(chat_targets()))
 
 
-initialize_providers()
\ No newline at end of file
+initialize_providers()
+initialize_strategies()
@@ -1,5 +1,10 @@
-from typing import Dict, Self
+from typing import Any, Dict, List, Optional
+import time
 
+import httpx
+
+from nexura import config
+from nexura.metrics import ConnectionTrace, metrics
 from nexura.providers.endpoint import Endpoint
 
 
@@ -12,6 +17,9 @@ class Provider():
         auth_schema: str = "Bearer",
         *,
         enabled: bool = True,
+        limits: Optional[httpx.Limits] = None,
+        timeout: Optional[httpx.Timeout] = None,
+        http2: bool = config.HTTP2,
     ):
         self.id = None
         self.name = name
@@ -22,11 +30,21 @@ class Provider():
 
         self.enabled = enabled
 
-    def __generate_unique_endpoint_id(self, provider: Self, endpoint_name: str) -> str:
-        endpoint_id = endpoint_name.lower().replace(" ", "-")
+        self.limits = limits or httpx.Limits(
+            max_connections=config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+        )
+        self.timeout = timeout or httpx.Timeout(config.HTTP_TIMEOUT, connect=config.HTTP_CONNECT_TIMEOUT)
+        self.http2 = http2
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def __generate_unique_endpoint_id(self, endpoint_name: str) -> str:
+        base_id = endpoint_name.lower().replace(" ", "-")
+        endpoint_id = base_id
         i = 0
-        while endpoint_id in [e.name for e in provider.endpoints]:
-            endpoint_id = f"{endpoint_id}-{i}"
+        while endpoint_id in self.endpoints:
+            endpoint_id = f"{base_id}-{i}"
             i += 1
 
         return endpoint_id
@@ -37,8 +55,65 @@ class Provider():
             "Content-Type": content_type,
         }
 
+    def _create_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers(),
+            limits=self.limits,
+            timeout=self.timeout,
+            http2=self.http2,
+            event_hooks=self._event_hooks(),
+            transport=self._transport(),
+        )
+
+    def _transport(self) -> Optional[httpx.AsyncBaseTransport]:
+        if not self.base_url.startswith("mock://"):
+            return None
+
+        # Pointed at the in-process mock upstream with `NEXURA_BASE_URLS`.
+        from nexura.providers.mock import mock_transport
+
+        return mock_transport()
+
+    def _event_hooks(self) -> Dict[str, List[Any]]:
+        if metrics is None:
+            return {}
+
+        # Shared by all the requests of the provider.
+        self._trace = ConnectionTrace(metrics, (self.id,))
+        return {"request": [self._on_request], "response": [self._on_response]}
+
+    async def _on_request(self, request: httpx.Request):
+        request.extensions["nexura_start"] = time.perf_counter()
+        request.extensions["trace"] = self._trace
+
+    async def _on_response(self, response: httpx.Response):
+        # Called once the headers are received, before the body is read.
+        metrics.upstream_ttfb.observe((self.id,), time.perf_counter() - response.request.extensions["nexura_start"])
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Long-lived HTTP client with a connection pool, shared by all endpoints of this provider.
+
+        The client is normally opened by the app lifespan, but it is also created on first use, so endpoints work outside of the app (scripts, benchmarks).
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+
+        return self._client
+
+    async def open(self):
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
     def add_endpoint(self, endpoint: "Endpoint"):
-        endpoint_id = self.__generate_unique_endpoint_id(self, endpoint.name)
+        endpoint_id = self.__generate_unique_endpoint_id(endpoint.name)
         endpoint.id = endpoint_id
         endpoint.provider = self
 
@@ -0,0 +1,71 @@
+from importlib import import_module
+from importlib.metadata import entry_points
+import typing
+
+from nexura import config
+from nexura.providers.base import Provider
+
+
+# Installed packages can add providers by declaring an entry point in this group, e.g. in their `pyproject.toml`:
+#
+#     [project.entry-points."nexura.providers"]
+#     mistral = "nexura_mistral:mistral_provider"
+ENTRY_POINT_GROUP = "nexura.providers"
+
+# Providers shipped with Nexura, loaded the same way as the ones from other packages.
+BUILTIN_PROVIDERS = {
+    "openai": "nexura.providers.openai:openai_provider",
+    "edenai": "nexura.providers.edenai:edenai_provider",
+}
+
+
+def discover_providers() -> typing.Dict[str, str]:
+    """
+    Find the available providers without importing them.
+
+    Returns:
+        Dict[str, str]: Provider id to the `module:attribute` reference of the provider, built in providers first.
+    """
+    providers = dict(BUILTIN_PROVIDERS)
+    if config.MOCK_PROVIDER:
+        providers["mock"] = "nexura.providers.mock:create_mock_provider"
+    if config.PROVIDER_ENTRY_POINTS:
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            providers[entry_point.name] = entry_point.value
+
+    if config.PROVIDERS:
+        enabled = {provider_id.strip() for provider_id in config.PROVIDERS.split(",")}
+        providers = {provider_id: reference for provider_id, reference in providers.items() if provider_id in enabled}
+
+    return providers
+
+
+def base_url_overrides() -> typing.Dict[str, str]:
+    """
+    Base URLs replacing the providers' own, from `NEXURA_BASE_URLS`. `mock` becomes `mock://{provider_id}`, answered by the in-process mock upstream.
+    """
+    overrides = {}
+    for item in (config.BASE_URLS or "").split(","):
+        provider_id, _, base_url = item.partition("=")
+        provider_id, base_url = provider_id.strip(), base_url.strip()
+        if not provider_id or not base_url:
+            continue
+
+        overrides[provider_id] = f"mock://{provider_id}" if base_url == "mock" else base_url
+
+    return overrides
+
+
+def load_provider(reference: str) -> Provider:
+    """
+    Import a provider from its `module:attribute` reference. The attribute is either a `Provider` or a function (or class) returning one.
+    """
+    module_name, _, attribute = reference.partition(":")
+    provider = import_module(module_name)
+    for name in attribute.split("."):
+        provider = getattr(provider, name)
+
+    if not isinstance(provider, Provider):
+        provider = provider()
+
+    return provider
@@ -1,9 +1,9 @@
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, replace
 import typing
 
-import httpx
 from nexura.providers.endpoint import Endpoint
 from nexura.utils.dataclass_with_doc import DataclassWithDoc
+from nexura.utils.serialization import encode, get_adapter
 
 
 @dataclass
@@ -88,11 +88,80 @@ class ChatEndpoint(Endpoint):
     def __init__(self):
         super().__init__("Chat", "POST", "/v2/text/chat", "Chat", "https://docs.edenai.co/reference/text_chat_create", enabled=True, examples_identifier="edenai/examples/chat.json")
 
+    @property
+    def response_type(self) -> typing.Any:
+        # One result per provider, keyed by provider unless `response_as_dict` is false.
+        return typing.Union[typing.Dict[str, ChatResponse], typing.List[ChatResponse]]
+
+    def estimate_tokens(self, body: ChatRequest) -> int:
+        # Roughly 4 characters per token for English text, plus a few tokens of formatting per message.
+        texts = [body.text or "", body.chatbot_global_action or ""] + [turn.message for turn in body.previous_history or []]
+        return sum(len(text) // 4 + 4 for text in texts) + body.max_tokens
+
+    def get_usage(self, data: typing.Any) -> typing.Optional[typing.Dict[str, int]]:
+        # Without `response_as_dict` the response is a list, otherwise it's keyed by provider.
+        results = data if isinstance(data, list) else data.values()
+        results = [result for result in results if isinstance(result, dict) and result.get("usage")]
+        if not results:
+            return None
+
+        usage = {key: sum(result["usage"].get(key, 0) for result in results) for key in ("prompt_tokens", "completion_tokens", "total_tokens")}
+        # What EdenAI bills for all the results, priced by `EdenAIPricingStrategy`.
+        usage["cost"] = sum(result.get("cost") or 0.0 for result in results)
+        return usage
+
+    def get_model(self, body: ChatRequest) -> typing.Optional[str]:
+        # The same providers in any order or spacing are the same model.
+        return ",".join(sorted({provider.strip() for provider in body.providers.split(",") if provider.strip()}))
+
+    def is_deterministic(self, body: ChatRequest) -> bool:
+        return body.temperature == 0
+
+    def semantic_cache_key(self, body: ChatRequest) -> typing.Optional[typing.Tuple[typing.Any, str]]:
+        if body.tool_results:
+            return None
+
+        params = encode(body)
+        for key in ("text", "chatbot_global_action", "previous_history"):
+            params.pop(key, None)
+
+        turns = [f"system: {body.chatbot_global_action or ''}"]
+        turns += [f"{turn.role}: {turn.message}" for turn in body.previous_history or []]
+        turns.append(f"user: {body.text or ''}")
+
+        return params, "\n".join(turns)
+
+    def conversation(self, body: ChatRequest) -> typing.Optional[typing.List[typing.Tuple[str, str]]]:
+        messages = [("system", body.chatbot_global_action)] if body.chatbot_global_action else []
+        messages += [(turn.role, turn.message) for turn in body.previous_history or []]
+        if body.text:
+            messages.append(("user", body.text))
+
+        return messages
+
+    def with_conversation(self, body: ChatRequest, history: typing.List[typing.Tuple[str, str]], summary: typing.Optional[str]) -> ChatRequest:
+        # EdenAI takes a single system message, the summary goes at its end.
+        system = [text for role, text in history if role == "system"]
+        if summary:
+            system.append(f"Summary of the earlier conversation: {summary}")
+        previous_history = [_PreviousHistory(role=role, message=text) for role, text in history if role != "system"] + (body.previous_history or [])
+
+        return replace(body, chatbot_global_action="\n".join(system) or None, previous_history=previous_history or None)
+
+    def reply_text(self, data: typing.Any) -> typing.Optional[str]:
+        results = data if isinstance(data, list) else data.values()
+        # The first provider which answered, like fallback providers do.
+        return next((result["generated_text"] for result in results if isinstance(result, dict) and result.get("generated_text") is not None), None)
+
+    def with_template(self, body: ChatRequest, system: typing.Optional[str], tools: typing.Optional[typing.List[typing.Dict[str, typing.Any]]]) -> typing.Optional[ChatRequest]:
+        if system:
+            system = f"{system}\n{body.chatbot_global_action}" if body.chatbot_global_action else system
+        if tools:
+            tools = get_adapter(typing.List[_Tool]).validate_python(tools) + (body.available_tools or [])
+
+        return replace(body, chatbot_global_action=system or body.chatbot_global_action, available_tools=tools or body.available_tools)
+
     async def handle_request(self, body: ChatRequest) -> ChatResponse:
-        r = await httpx.post(
-            f"{self.provider.base_url}{self.path}",
-            headers=self.provider.headers(),
-            json=asdict(body),
-        )
+        r = await self.provider.client.post(self.path, content=self.encode_body(body), timeout=self.timeout)
 
         return r  # type: ignore
\ No newline at end of file
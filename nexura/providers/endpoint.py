@@ -1,13 +1,34 @@
 from abc import ABC, abstractmethod
+from dataclasses import is_dataclass
+from importlib import resources
 import json
-import os
 import typing
 
+import httpx
+import orjson
+from pydantic import TypeAdapter
+
+from nexura import config
+from nexura.preflight import CostEstimate
 from nexura.providers.example import Example
+from nexura.providers.policy import CircuitBreaker, EndpointPolicy
+from nexura.strategies.pricing.engine import pricing_engine
+from nexura.utils.serialization import compile_encoder, dumps, get_adapter
+
+
+ResponseMode = typing.Literal["passthrough", "typed"]
+
+PASSTHROUGH: ResponseMode = "passthrough"
+TYPED: ResponseMode = "typed"
 
 
 class Endpoint(ABC):
-    def __init__(self, name: str, method: str, path: str, category: typing.Optional[str] = None, original_docs_url: typing.Optional[str] = None, *, enabled: bool = True, examples_identifier: typing.Optional[str] = None):
+    # Upstream response headers relayed to the caller, besides the body.
+    passthrough_headers: typing.Tuple[str, ...] = ("content-type",)
+    # Provider whose pricing strategy prices the requests, the endpoint's own provider when unset.
+    pricing_provider: typing.Optional[str] = None
+
+    def __init__(self, name: str, method: str, path: str, category: typing.Optional[str] = None, original_docs_url: typing.Optional[str] = None, *, enabled: bool = True, examples_identifier: typing.Optional[str] = None, response_mode: typing.Optional[ResponseMode] = None, policy: typing.Optional[EndpointPolicy] = None):
         self.id = None
         self.provider = None
 
@@ -19,14 +40,224 @@ class Endpoint(ABC):
         self.original_docs_url = original_docs_url
         self.enabled = enabled
 
-        self.examples: typing.List[Example] = self.get_examples(examples_identifier) if examples_identifier else []
+        # `passthrough` relays the upstream body unchanged, `typed` validates it into the response dataclass first.
+        self.response_mode = response_mode or config.RESPONSE_MODE
+        if self.response_mode not in typing.get_args(ResponseMode):
+            raise ValueError(f"Unknown response mode {self.response_mode}")
+
+        # Timeouts, retries and circuit breaker of the upstream calls.
+        self.policy = policy or EndpointPolicy()
+        self._breaker: typing.Optional[CircuitBreaker] = None
+
+        self.examples_identifier = examples_identifier
+        self._examples: typing.Optional[typing.List[Example]] = None
+
+        self._body_adapter: typing.Optional[TypeAdapter] = None
+        self._response_adapter: typing.Optional[TypeAdapter] = None
+
+    @property
+    def examples(self) -> typing.List[Example]:
+        """
+        Usage examples shown in the docs, read on first access.
+        """
+        if self._examples is None:
+            self._examples = self.get_examples(self.examples_identifier) if self.examples_identifier else []
+
+        return self._examples
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        """
+        Circuit breaker of the upstream, created on first use once the endpoint belongs to a provider.
+        """
+        if self._breaker is None:
+            self._breaker = CircuitBreaker(self.provider.id, self.id, self.policy.breaker_threshold, self.policy.breaker_reset_timeout)
+
+        return self._breaker
 
-    def get_examples(self, examples_identifier: str):
-        with open(f"{os.getcwd()}/nexura/providers/{examples_identifier}") as f:
-            examples = json.load(f)
+    @property
+    def timeout(self) -> httpx.Timeout:
+        """
+        Timeouts to pass to the provider's client, those of the policy over the client's.
+        """
+        default = self.provider.timeout
+        return httpx.Timeout(
+            connect=self.policy.connect_timeout or default.connect,
+            read=self.policy.read_timeout or default.read,
+            write=default.write,
+            pool=default.pool,
+        )
+
+    def get_examples(self, examples_identifier: str) -> typing.List[Example]:
+        # Read from the installed package rather than the working directory, so it works wherever the app is started from.
+        examples = json.loads(resources.files("nexura.providers").joinpath(examples_identifier).read_text())
 
         return [Example(**example) for example in examples]
 
+    @property
+    def body_type(self) -> typing.Any:
+        return typing.get_type_hints(self.handle_request)["body"]
+
+    @property
+    def response_type(self) -> typing.Any:
+        return typing.get_type_hints(self.handle_request).get("return")
+
+    def compile(self):
+        """
+        Build the request validator, the request encoder and the response validator up front, so the first request doesn't pay for it.
+        """
+        self._body_adapter = get_adapter(self.body_type)
+        if is_dataclass(self.body_type):
+            compile_encoder(self.body_type)
+
+        if self.response_type is not None:
+            self._response_adapter = get_adapter(self.response_type)
+
+    def parse_body(self, data: typing.Any) -> typing.Any:
+        """
+        Validate the request and build the dataclass expected by `handle_request`.
+
+        Args:
+            data: Raw JSON (`bytes` or `str`), parsed and validated in a single pass, or already decoded JSON.
+        """
+        if self._body_adapter is None:
+            self._body_adapter = get_adapter(self.body_type)
+
+        if isinstance(data, (bytes, str)):
+            return self._body_adapter.validate_json(data)
+
+        return self._body_adapter.validate_python(data)
+
+    def encode_body(self, body: typing.Any) -> bytes:
+        """
+        Serialize a request dataclass to the JSON sent upstream, leaving out `None` fields.
+        """
+        return dumps(body)
+
+    def parse_response(self, content: typing.Union[bytes, str]) -> typing.Any:
+        """
+        Parse and validate a raw upstream response straight into the response dataclass returned by `handle_request`.
+        """
+        if self._response_adapter is None:
+            self._response_adapter = get_adapter(self.response_type)
+
+        return self._response_adapter.validate_json(content)
+
+    def calculate_cost(self, body: typing.Any, usage: typing.Dict[str, typing.Any]) -> typing.Optional[float]:
+        """
+        Calculate the price of a request from the `usage` reported by the upstream, with the pricing strategy of the provider.
+
+        Returns:
+            float: The price of the request, or `None` if the endpoint can't be priced.
+        """
+        provider_id = self.pricing_provider or (self.provider.id if self.provider else None)
+        if provider_id is None:
+            return None
+
+        return pricing_engine.calculate_cost(provider_id, usage, self.get_model(body))
+
+    def calculate_response_cost(self, body: typing.Any, data: typing.Dict[str, typing.Any]) -> typing.Optional[float]:
+        """
+        Calculate the price of a request from the decoded upstream response.
+        """
+        usage = self.get_usage(data)
+        return self.calculate_cost(body, usage) if usage else None
+
+    def estimate_cost(self, body: typing.Any) -> typing.Optional[CostEstimate]:
+        """
+        Count the prompt tokens of a request and price its worst case, before sending it. Used by the preflight hooks and `/estimate`.
+
+        Returns:
+            CostEstimate: The estimate, or `None` if the endpoint can't estimate its requests.
+        """
+        return None
+
+    def estimate_tokens(self, body: typing.Any) -> int:
+        """
+        Estimate the tokens a request will use (prompt and completion), before sending it. Used to reserve token rate limits.
+        """
+        estimate = self.estimate_cost(body)
+        return estimate.total_tokens if estimate else 0
+
+    def get_usage(self, data: typing.Any) -> typing.Optional[typing.Dict[str, int]]:
+        """
+        Tokens actually used by a request, read from the decoded upstream response.
+
+        Returns:
+            Dict[str, int]: `prompt_tokens`, `completion_tokens` and `total_tokens`, or `None` if the upstream didn't report usage.
+        """
+        return data.get("usage") if isinstance(data, dict) else None
+
+    def peek_usage(self, content: bytes) -> typing.Optional[typing.Dict[str, int]]:
+        """
+        Tokens used by a request, read from the raw upstream response. Endpoints whose usage can be found without decoding the whole response should override it.
+        """
+        return self.get_usage(orjson.loads(content))
+
+    def get_model(self, body: typing.Any) -> typing.Optional[str]:
+        """
+        Model requested by a request body, for usage accounting.
+        """
+        return getattr(body, "model", None)
+
+    def is_streaming(self, body: typing.Any) -> bool:
+        """
+        Whether the request is answered with a `StreamedResponse`, which can't be cached nor shared between requests.
+        """
+        return False
+
+    def is_deterministic(self, body: typing.Any) -> bool:
+        """
+        Whether the upstream is expected to always return the same response to this request, so it's safe to serve it from cache.
+        """
+        return False
+
+    def semantic_cache_key(self, body: typing.Any) -> typing.Optional[typing.Tuple[typing.Any, str]]:
+        """
+        Split a request for the semantic cache.
+
+        Returns:
+            Tuple[Any, str]: Parameters which must match exactly and the prompt text compared by similarity, or `None` if the request can't be served from the semantic cache.
+        """
+        return None
+
+    def conversation(self, body: typing.Any) -> typing.Optional[typing.List[typing.Tuple[str, str]]]:
+        """
+        Messages of a chat request, as `(role, text)` pairs in order, stored by conversation sessions.
+
+        Returns:
+            List[Tuple[str, str]]: The messages, or `None` if the endpoint doesn't support sessions.
+        """
+        return None
+
+    def with_conversation(self, body: typing.Any, history: typing.List[typing.Tuple[str, str]], summary: typing.Optional[str]) -> typing.Any:
+        """
+        The request with a session's history before its own messages, which replaces its system prompts, and the summary of the compacted messages.
+        """
+        raise NotImplementedError
+
+    def reply_text(self, data: typing.Any) -> typing.Optional[str]:
+        """
+        Text of the reply, read from the decoded upstream response, added to the request's session.
+        """
+        return None
+
+    def message_tokens(self, body: typing.Any, role: str, text: str) -> int:
+        """
+        Tokens of a single message of the conversation, counted once when it's added to a session.
+        """
+        # Roughly 4 characters per token for English text, plus a few tokens of formatting.
+        return len(text) // 4 + 4
+
+    def with_template(self, body: typing.Any, system: typing.Optional[str], tools: typing.Optional[typing.List[typing.Dict[str, typing.Any]]]) -> typing.Any:
+        """
+        The request with a template's system prompt and tools before its own, so the start of the prompt is the same for all the requests using the template.
+
+        Returns:
+            Any: The request, or `None` if the endpoint can't use these templates.
+        """
+        return None
+
     @abstractmethod
     async def handle_request(self, **kwargs):
         raise NotImplementedError
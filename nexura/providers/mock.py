@@ -0,0 +1,422 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import asyncio
+import hashlib
+import math
+import random
+import time
+import typing
+
+import httpx
+import orjson
+
+from nexura import config
+from nexura.providers.base import Provider
+
+
+WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit")
+
+
+@dataclass(frozen=True)
+class Distribution:
+    """
+    Random values drawn from `constant:value`, `uniform:low,high`, `normal:mean,stddev`, `lognormal:median,sigma` or `exponential:mean`. Values are never negative.
+    """
+    kind: str
+    params: typing.Tuple[float, ...]
+
+    KINDS: typing.ClassVar[typing.Dict[str, int]] = {"constant": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exponential": 1}
+
+    @classmethod
+    def parse(cls, value: str) -> "Distribution":
+        kind, _, params = value.partition(":")
+        if not params:
+            # A bare number is a constant.
+            kind, params = "constant", kind
+
+        try:
+            parsed = tuple(float(param) for param in params.split(","))
+        except ValueError:
+            raise ValueError(f"Invalid distribution {value!r}, parameters must be numbers") from None
+
+        if cls.KINDS.get(kind) != len(parsed):
+            raise ValueError(f"Invalid distribution {value!r}, expected one of {', '.join(f'{kind}:{count} parameters' for kind, count in cls.KINDS.items())}")
+        if kind == "lognormal" and parsed[0] <= 0:
+            raise ValueError(f"Invalid distribution {value!r}, the median of a lognormal distribution must be positive")
+
+        return cls(kind, parsed)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "constant":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(*self.params)
+        elif self.kind == "normal":
+            value = rng.gauss(*self.params)
+        elif self.kind == "lognormal":
+            value = rng.lognormvariate(math.log(self.params[0]), self.params[1])
+        else:
+            value = rng.expovariate(1 / self.params[0]) if self.params[0] > 0 else 0.0
+
+        return max(0.0, value)
+
+    def __str__(self) -> str:
+        return f"{self.kind}:{','.join(f'{param:g}' for param in self.params)}"
+
+
+@dataclass
+class MockSettings:
+    """
+    Behaviour of the mock upstream, from the `NEXURA_MOCK_*` settings by default.
+    """
+    # Seconds before the first token (streamed) or before generating the response.
+    latency: Distribution = field(default_factory=lambda: Distribution.parse(config.MOCK_LATENCY))
+    # Seconds per generated token, between streamed chunks.
+    token_delay: float = config.MOCK_TOKEN_DELAY
+    # Completion tokens generated, capped by the request's `max_tokens`.
+    completion_tokens: Distribution = field(default_factory=lambda: Distribution.parse(config.MOCK_COMPLETION_TOKENS))
+    # Share of requests failing, after their latency, with one of `error_statuses`.
+    error_rate: float = config.MOCK_ERROR_RATE
+    error_statuses: typing.Tuple[int, ...] = tuple(int(status) for status in config.MOCK_ERROR_STATUSES.split(","))
+    # Seed of the random draws, for reproducible runs.
+    seed: typing.Optional[int] = config.MOCK_SEED
+
+
+def _prompt_tokens(texts: typing.Iterable[typing.Any]) -> int:
+    # Roughly 4 characters per token plus a few tokens of formatting per message, like the endpoints' estimates.
+    return sum(len(text) // 4 + 4 for text in texts if isinstance(text, str)) or 1
+
+
+class PromptCache():
+    """
+    Simulation of OpenAI's prompt caching: prompts of 1024 tokens and more are cached in steps of 128 tokens, and a request reuses the longest cached prefix of its prompt, messages in order.
+    """
+    MIN_TOKENS = 1024
+    STEP_TOKENS = 128
+    # About 4 characters per token, like `_prompt_tokens`.
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._prefixes: "OrderedDict[bytes, None]" = OrderedDict()
+
+    def lookup(self, texts: typing.Iterable[str]) -> int:
+        """
+        Tokens of the prompt found in the cache, then cache all its prefixes.
+        """
+        prompt = "\n".join(texts).encode()
+        step = self.STEP_TOKENS * self.CHARS_PER_TOKEN
+        end = self.MIN_TOKENS * self.CHARS_PER_TOKEN
+        if len(prompt) < end:
+            return 0
+
+        h = hashlib.blake2b(prompt[:end], digest_size=16)
+        cached, missed = 0, False
+        while True:
+            digest = h.digest()
+            if not missed and digest in self._prefixes:
+                self._prefixes.move_to_end(digest)
+                cached = end // self.CHARS_PER_TOKEN
+            else:
+                missed = True
+                self._prefixes[digest] = None
+
+            if end + step > len(prompt):
+                break
+            h.update(prompt[end:end + step])
+            end += step
+
+        while len(self._prefixes) > self.max_entries:
+            self._prefixes.popitem(last=False)
+
+        return cached
+
+
+def _text(tokens: int) -> str:
+    return " ".join(WORDS[i % len(WORDS)] for i in range(tokens))
+
+
+class MockUpstream():
+    """
+    ASGI app answering like OpenAI chat completions (`/v1/chat/completions`, server-sent events and prompt caching included) and EdenAI chat (`/v2/text/chat`), with configurable latency, errors and token counts, to run and benchmark the gateway offline.
+
+    Providers are pointed at it with `NEXURA_BASE_URLS`, e.g. `NEXURA_BASE_URLS=openai=mock,edenai=mock`, their requests are then answered in-process, without sockets. It also runs as a server, for a gateway in another process or on another host:
+
+        python -m nexura.providers.mock --port 9000
+        NEXURA_BASE_URLS=openai=http://127.0.0.1:9000 uvicorn nexura.main:app
+    """
+    def __init__(self, settings: typing.Optional[MockSettings] = None):
+        self.settings = settings or MockSettings()
+        self.rng = random.Random(self.settings.seed)
+        self.prompt_cache = PromptCache()
+        self.requests = 0
+        self.errors = 0
+
+    def _completion_tokens(self, max_tokens: typing.Any) -> typing.Tuple[int, bool]:
+        tokens = max(1, round(self.settings.completion_tokens.sample(self.rng)))
+        if isinstance(max_tokens, int) and 0 < max_tokens < tokens:
+            return max_tokens, True
+
+        return tokens, False
+
+    def _error(self) -> typing.Optional[int]:
+        if self.settings.error_rate > 0 and self.rng.random() < self.settings.error_rate:
+            self.errors += 1
+            return self.rng.choice(self.settings.error_statuses)
+
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await receive()
+            await send({"type": "lifespan.startup.complete"})
+            await receive()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        self.requests += 1
+        path, method = scope["path"], scope["method"]
+        if method == "POST" and path.endswith("/v1/chat/completions"):
+            handle = self.chat_completions
+        elif method == "POST" and path.endswith("/v2/text/chat"):
+            handle = self.edenai_chat
+        else:
+            return await self._json(send, 404, {"error": {"message": f"Unknown endpoint {method} {path}", "type": "invalid_request_error"}})
+
+        try:
+            data = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return await self._json(send, 400, {"error": {"message": "Invalid JSON body", "type": "invalid_request_error"}})
+
+        await asyncio.sleep(self.settings.latency.sample(self.rng))
+        status = self._error()
+        if status is not None:
+            return await self._json(send, status, {"error": {"message": f"Mock upstream error {status}", "type": "server_error" if status >= 500 else "rate_limit_error" if status == 429 else "invalid_request_error"}})
+
+        await handle(data, send)
+
+    @staticmethod
+    async def _json(send, status: int, content: typing.Any):
+        body = orjson.dumps(content)
+        await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def chat_completions(self, data: typing.Dict[str, typing.Any], send):
+        messages = data.get("messages") or []
+        texts = [f"{message.get('role')}: {message.get('content')}" for message in messages if isinstance(message, dict)]
+        prompt_tokens = _prompt_tokens(message.get("content") for message in messages if isinstance(message, dict))
+        completion_tokens, capped = self._completion_tokens(data.get("max_completion_tokens") or data.get("max_tokens"))
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": min(self.prompt_cache.lookup(texts), prompt_tokens)},
+        }
+        model = data.get("model", "mock")
+        finish_reason = "length" if capped else "stop"
+        created = int(time.time())
+
+        if not data.get("stream"):
+            await asyncio.sleep(completion_tokens * self.settings.token_delay)
+            return await self._json(send, 200, {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": _text(completion_tokens)}, "finish_reason": finish_reason}],
+                "usage": usage,
+            })
+
+        include_usage = bool((data.get("stream_options") or {}).get("include_usage"))
+
+        def event(choices: typing.List[typing.Any], chunk_usage: typing.Any = None) -> bytes:
+            chunk = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": created, "model": model, "choices": choices}
+            if include_usage:
+                chunk["usage"] = chunk_usage
+            return b"data: " + orjson.dumps(chunk) + b"\n\n"
+
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache")]})
+        await send({"type": "http.response.body", "body": event([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]), "more_body": True})
+        for i in range(completion_tokens):
+            if self.settings.token_delay:
+                await asyncio.sleep(self.settings.token_delay)
+            content = WORDS[i % len(WORDS)] if i == 0 else " " + WORDS[i % len(WORDS)]
+            await send({"type": "http.response.body", "body": event([{"index": 0, "delta": {"content": content}, "finish_reason": None}]), "more_body": True})
+
+        tail = event([{"index": 0, "delta": {}, "finish_reason": finish_reason}])
+        if include_usage:
+            tail += event([], usage)
+        await send({"type": "http.response.body", "body": tail + b"data: [DONE]\n\n"})
+
+    async def edenai_chat(self, data: typing.Dict[str, typing.Any], send):
+        history = [turn.get("message") for turn in data.get("previous_history") or [] if isinstance(turn, dict)]
+        prompt_tokens = _prompt_tokens([data.get("text"), data.get("chatbot_global_action"), *history])
+        providers = [provider.strip() for provider in str(data.get("providers") or "mock").split(",") if provider.strip()]
+
+        results = []
+        for provider in providers:
+            completion_tokens, _ = self._completion_tokens(data.get("max_tokens"))
+            generated_text = _text(completion_tokens)
+            results.append({
+                "provider": provider,
+                "status": "success",
+                "generated_text": generated_text,
+                "message": [{"role": "user", "message": data.get("text") or ""}, {"role": "assistant", "message": generated_text}],
+                "cost": round((prompt_tokens + completion_tokens) * 1e-6, 8),
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens},
+            })
+
+        # Providers are called concurrently, the slowest one answers last.
+        await asyncio.sleep(max(result["usage"]["completion_tokens"] for result in results) * self.settings.token_delay)
+        if data.get("response_as_dict", True):
+            return await self._json(send, 200, {result.pop("provider"): result for result in results})
+
+        await self._json(send, 200, results)
+
+
+class _StubStream(httpx.AsyncByteStream):
+    def __init__(self, queue: asyncio.Queue, task: asyncio.Task, disconnected: asyncio.Event):
+        self.queue = queue
+        self.task = task
+        self.disconnected = disconnected
+
+    async def __aiter__(self) -> typing.AsyncIterator[bytes]:
+        while True:
+            chunk = await self.queue.get()
+            if chunk is None:
+                return
+            if isinstance(chunk, BaseException):
+                raise httpx.ReadError(f"Mock upstream failed: {chunk!r}") from chunk
+            yield chunk
+
+    async def aclose(self):
+        self.disconnected.set()
+        if not self.task.done():
+            self.task.cancel()
+
+
+class StubTransport(httpx.AsyncBaseTransport):
+    """
+    Send requests to an ASGI app in the same process, without sockets.
+
+    Unlike `httpx.ASGITransport`, which waits for the whole response, the response is returned with its headers and its body streamed as the app sends it, so server-sent events and time to first byte behave like over the network.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": request.method,
+            "scheme": "http",
+            "path": request.url.path,
+            "raw_path": request.url.raw_path.split(b"?")[0],
+            "query_string": request.url.query,
+            "root_path": "",
+            "headers": [(key.lower(), value) for key, value in request.headers.raw],
+            "server": (request.url.host, request.url.port or 80),
+            "client": ("127.0.0.1", 0),
+        }
+
+        loop = asyncio.get_running_loop()
+        started: asyncio.Future = loop.create_future()
+        queue: asyncio.Queue = asyncio.Queue()
+        disconnected = asyncio.Event()
+        received = False
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {"type": "http.request", "body": body, "more_body": False}
+
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                started.set_result(message)
+            elif message["type"] == "http.response.body":
+                if message.get("body"):
+                    queue.put_nowait(message["body"])
+                if not message.get("more_body"):
+                    queue.put_nowait(None)
+
+        async def run():
+            try:
+                await self.app(scope, receive, send)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not started.done():
+                    started.set_exception(e)
+                queue.put_nowait(e)
+            else:
+                if not started.done():
+                    started.set_exception(RuntimeError("The mock upstream returned without a response"))
+
+        task = asyncio.create_task(run())
+        try:
+            message = await started
+        except BaseException:
+            task.cancel()
+            raise
+
+        return httpx.Response(message["status"], headers=message.get("headers", []), stream=_StubStream(queue, task, disconnected), request=request)
+
+
+_upstream: typing.Optional[MockUpstream] = None
+
+
+def mock_upstream() -> MockUpstream:
+    """
+    The mock upstream shared by the providers pointed at it in this process.
+    """
+    global _upstream
+    if _upstream is None:
+        _upstream = MockUpstream()
+
+    return _upstream
+
+
+def mock_transport() -> StubTransport:
+    return StubTransport(mock_upstream())
+
+
+def create_mock_provider() -> Provider:
+    """
+    The `mock` provider (`NEXURA_MOCK_PROVIDER`): OpenAI chat completions and EdenAI chat, priced like theirs, answered by the in-process mock upstream.
+    """
+    from nexura.providers.edenai.endpoints.chat import ChatEndpoint
+    from nexura.providers.openai.endpoints.completions import ChatCompletionsEndpoint
+
+    provider = Provider("Mock", "mock://mock", "mock")
+    provider.add_endpoint(ChatCompletionsEndpoint())
+    chat = ChatEndpoint()
+    chat.pricing_provider = "edenai"
+    provider.add_endpoint(chat)
+
+    return provider
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the mock upstream, configured by the NEXURA_MOCK_* settings.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    args = parser.parse_args()
+
+    uvicorn.run(mock_upstream(), host=args.host, port=args.port, log_level="warning")
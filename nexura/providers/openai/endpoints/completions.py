@@ -1,9 +1,20 @@
-from dataclasses import asdict, dataclass
+from dataclasses import dataclass, replace
+import logging
 import typing
 
-import httpx
+from pydantic import Field
+
+from nexura.exceptions import PriceNotFoundError
+from nexura.preflight import CostEstimate
 from nexura.providers.endpoint import Endpoint
+from nexura.providers.streaming import StreamedResponse
+from nexura.strategies.pricing.openai import MODEL_MAX_OUTPUT_TOKENS
+from nexura.tokenization.registry import TOKENS_PER_REPLY, count_chat_tokens
 from nexura.utils.dataclass_with_doc import DataclassWithDoc
+from nexura.utils.serialization import encode, peek_field
+
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -58,10 +69,19 @@ class _AssistantMessage(DataclassWithDoc):
     tool_calls: typing.Optional[typing.List[_ToolCall]] = None
 
 
+MESSAGE_TYPES = {"system": _SystemMessage, "user": _UserMessage, "assistant": _AssistantMessage}
+
+
+@dataclass
+class _StreamOptions(DataclassWithDoc):
+    # If set, an additional chunk will be streamed before the `data: [DONE]` message. The `usage` field on this chunk shows the token usage statistics for the entire request, and the `choices` field will always be an empty array. All other chunks will also include a `usage` field, but with a null value.
+    include_usage: typing.Optional[bool] = None
+
+
 @dataclass
 class CompletionsRequest(DataclassWithDoc):
     # A list of messages comprising the conversation so far.
-    messages: typing.List[typing.Union[_SystemMessage, _UserMessage, _AssistantMessage]]
+    messages: typing.List[typing.Annotated[typing.Union[_SystemMessage, _UserMessage, _AssistantMessage], Field(discriminator="role")]]
     # ID of the model to use.
     model: typing.Literal["gpt-4o", "gpt-4o-mini", "gpt-4", "gpt-3.5-turbo"]
     # Number between -2.0 and 2.0. Positive values penalize new tokens based on their existing frequency in the text so far, decreasing the model's likelihood to repeat the same line verbatim.
@@ -86,8 +106,14 @@ class CompletionsRequest(DataclassWithDoc):
     service_tier: typing.Optional[typing.Literal["auto", "default"]] = None
     # Up to 4 sequences where the API will stop generating further tokens.
     stop: typing.Optional[typing.Union[str, typing.List[str]]] = None
-    # [DISABLED:"stream TODO https://platform.openai.com/docs/api-reference/chat/create#chat-create-stream"] If set, partial message deltas will be sent, like in ChatGPT. Tokens will be sent as data-only [server-sent events](https://developer.mozilla.org/en-US/docs/Web/API/Server-sent_events/Using_server-sent_events#Event_stream_format) as they become available, with the stream terminated by a `data: [DONE]` message. [Example Python code](https://cookbook.openai.com/examples/how_to_stream_completions).
+    # What sampling temperature to use, between 0 and 2. Higher values like 0.8 will make the output more random, while lower values like 0.2 will make it more focused and deterministic.\n\nWe generally recommend altering this or `top_p` but not both.
+    temperature: typing.Optional[float] = 1
+    # An alternative to sampling with temperature, called nucleus sampling, where the model considers the results of the tokens with top_p probability mass. So 0.1 means only the tokens comprising the top 10% probability mass are considered.\n\nWe generally recommend altering this or `temperature` but not both.
+    top_p: typing.Optional[float] = 1
+    # If set, partial message deltas will be sent, like in ChatGPT. Tokens will be sent as data-only [server-sent events](https://developer.mozilla.org/en-US/docs/Web/API/Server-sent_events/Using_server-sent_events#Event_stream_format) as they become available, with the stream terminated by a `data: [DONE]` message. [Example Python code](https://cookbook.openai.com/examples/how_to_stream_completions).
     stream: typing.Optional[bool] = False
+    # Options for streaming response. Only set this when you set `stream: true`. Nexura always enables `include_usage` for streamed requests, so they can be priced.
+    stream_options: typing.Optional[_StreamOptions] = None
 
 
 @dataclass
@@ -102,8 +128,8 @@ class _Usage(DataclassWithDoc):
 
 @dataclass
 class _Message(DataclassWithDoc):
-    # The contents of the message.
-    content: str
+    # The contents of the message, `null` when the model called tools.
+    content: typing.Optional[str]
     # The role of the author of this message.
     role: str
     # The refusal message generated by the model.
@@ -151,14 +177,94 @@ class ChatCompletionsEndpoint(Endpoint):
     Given a list of messages comprising a conversation, the model will return a response.
     """
 
+    passthrough_headers = ("content-type", "x-request-id", "openai-model", "openai-processing-ms", "openai-version")
+    # Requests name OpenAI models, whichever provider serves them.
+    pricing_provider = "openai"
+
     def __init__(self):
         super().__init__("Chat Completions", "POST", "/v1/chat/completions", "Chat", "https://platform.openai.com/docs/api-reference/chat/create", enabled=True)
 
+    def estimate_cost(self, body: CompletionsRequest) -> typing.Optional[CostEstimate]:
+        messages = [(message.role, message.content, message.name) for message in body.messages]
+        prompt_tokens = count_chat_tokens(body.model, messages, names=sum(1 for message in body.messages if message.name))
+        # Without `max_tokens`, every choice may go up to the model's output limit.
+        completion_tokens = (body.max_tokens or MODEL_MAX_OUTPUT_TOKENS[body.model]) * (body.n or 1)
+
+        try:
+            max_cost = self.calculate_cost(body, {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens})
+        except PriceNotFoundError:
+            # Counted but not priced, the budget can't be checked.
+            max_cost = None
+
+        return CostEstimate(body.model, prompt_tokens, completion_tokens, max_cost)
+
+    def peek_usage(self, content: bytes) -> typing.Optional[typing.Dict[str, int]]:
+        # `usage` comes after the choices, which never need to be decoded.
+        return peek_field(content, "usage")
+
+    def is_streaming(self, body: CompletionsRequest) -> bool:
+        return bool(body.stream)
+
+    def is_deterministic(self, body: CompletionsRequest) -> bool:
+        return not body.stream and body.n == 1 and (body.temperature == 0 or body.seed is not None)
+
+    def semantic_cache_key(self, body: CompletionsRequest) -> typing.Optional[typing.Tuple[typing.Any, str]]:
+        if body.stream or body.n != 1:
+            return None
+
+        params = encode(body)
+        del params["messages"]
+        text = "\n".join(f"{message.role}: {message.content or ''}" for message in body.messages)
+
+        return params, text
+
+    def conversation(self, body: CompletionsRequest) -> typing.Optional[typing.List[typing.Tuple[str, str]]]:
+        return [(message.role, message.content or "") for message in body.messages]
+
+    def with_conversation(self, body: CompletionsRequest, history: typing.List[typing.Tuple[str, str]], summary: typing.Optional[str]) -> CompletionsRequest:
+        messages = [MESSAGE_TYPES[role](content=text) for role, text in history]
+        if summary:
+            # After the system prompts, so they stay the same from one turn to the next.
+            system = sum(1 for message in messages if message.role == "system")
+            messages.insert(system, _SystemMessage(content=f"Summary of the earlier conversation: {summary}"))
+        messages += [message for message in body.messages if message.role != "system"]
+
+        return replace(body, messages=messages)
+
+    def reply_text(self, data: typing.Any) -> typing.Optional[str]:
+        choices = data.get("choices") if isinstance(data, dict) else None
+        return choices[0]["message"].get("content") if choices else None
+
+    def message_tokens(self, body: CompletionsRequest, role: str, text: str) -> int:
+        return count_chat_tokens(body.model, [(role, text)]) - TOKENS_PER_REPLY
+
+    def with_template(self, body: CompletionsRequest, system: typing.Optional[str], tools: typing.Optional[typing.List[typing.Dict[str, typing.Any]]]) -> typing.Optional[CompletionsRequest]:
+        # Requests don't take tools yet.
+        if tools:
+            return None
+
+        return replace(body, messages=[_SystemMessage(content=system), *body.messages])
+
+    async def stream_request(self, body: CompletionsRequest) -> StreamedResponse:
+        if not (body.stream_options and body.stream_options.include_usage):
+            body = replace(body, stream_options=_StreamOptions(include_usage=True))
+
+        request = self.provider.client.build_request("POST", self.path, content=self.encode_body(body), timeout=self.timeout)
+        r = await self.provider.client.send(request, stream=True)
+
+        def on_usage(usage: typing.Dict[str, typing.Any]):
+            try:
+                cost = self.calculate_cost(body, usage)
+            except PriceNotFoundError:
+                cost = None
+            logger.info(f"Streamed {self.provider.id}/{self.id} request used {usage['total_tokens']} tokens, cost {cost}")
+
+        return StreamedResponse(r, on_usage=on_usage)
+
     async def handle_request(self, body: CompletionsRequest) -> CompletionResponse:
-        r = await httpx.post(
-            f"{self.provider.base_url}{self.path}",
-            headers=self.provider.headers(),
-            json=asdict(body),
-        )
+        if body.stream:
+            return await self.stream_request(body)  # type: ignore
+
+        r = await self.provider.client.post(self.path, content=self.encode_body(body), timeout=self.timeout)
 
         return r  # type: ignore
@@ -0,0 +1,227 @@
+from dataclasses import dataclass
+import asyncio
+import logging
+import random
+import time
+import typing
+
+import httpx
+
+from nexura import config
+from nexura.exceptions import CircuitOpenError
+from nexura.strategies.routing.base import RETRYABLE_STATUS_CODES
+
+if typing.TYPE_CHECKING:
+    from nexura.providers.endpoint import Endpoint
+
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+@dataclass
+class EndpointPolicy:
+    """
+    How an endpoint calls its upstream: timeouts, retries and circuit breaker. Defaults come from the `NEXURA_UPSTREAM_*` and `NEXURA_BREAKER_*` settings.
+    """
+    # Seconds to open a connection and between two received bytes, the provider's client timeouts when unset.
+    connect_timeout: typing.Optional[float] = None
+    read_timeout: typing.Optional[float] = None
+    # Seconds the whole call may take, retries included, 0 disables it.
+    total_timeout: float = config.UPSTREAM_TOTAL_TIMEOUT
+    max_retries: int = config.UPSTREAM_MAX_RETRIES
+    # Statuses retried. Network errors and timeouts are always retried.
+    retry_statuses: typing.FrozenSet[int] = RETRYABLE_STATUS_CODES
+    retry_base: float = config.UPSTREAM_RETRY_BASE
+    # Longest wait before a retry. A `Retry-After` asking for longer isn't waited for, the response is returned.
+    retry_max: float = config.UPSTREAM_RETRY_MAX
+    # Consecutive failures (network errors, timeouts, 408 and 5xx) opening the circuit, 0 disables the breaker.
+    breaker_threshold: int = config.BREAKER_THRESHOLD
+    # Seconds the circuit stays open before a single probe request is let through.
+    breaker_reset_timeout: float = config.BREAKER_RESET_TIMEOUT
+
+    def backoff(self, retry: int) -> float:
+        # Full jitter, so clients failing together don't retry together.
+        return random.uniform(0, min(self.retry_max, self.retry_base * 2 ** retry))
+
+
+class CircuitBreaker():
+    """
+    Stop calling an upstream which keeps failing, and fail fast instead.
+
+    After `threshold` consecutive failures the circuit opens: calls are rejected with `CircuitOpenError` for `reset_timeout` seconds. Then it's half-open, a single probe call is let through, which closes the circuit if it succeeds and opens it again otherwise.
+    """
+    def __init__(self, provider_id: str, endpoint_id: str, threshold: int, reset_timeout: float, clock: typing.Callable[[], float] = time.monotonic):
+        self.provider_id = provider_id
+        self.endpoint_id = endpoint_id
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+
+        self.failures = 0
+        self.opened_at: typing.Optional[float] = None
+        self._probing = False
+
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return CLOSED
+
+        return HALF_OPEN if self.clock() - self.opened_at >= self.reset_timeout else OPEN
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+
+        return max(0.0, self.opened_at + self.reset_timeout - self.clock())
+
+    def acquire(self):
+        """
+        Allow a call, or raise `CircuitOpenError`. Every allowed call must be followed by `success`, `failure` or `release`.
+        """
+        if self.threshold <= 0 or self.opened_at is None:
+            return
+
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return
+
+        self.rejected += 1
+        # While a probe is running, callers retry once it had time to finish.
+        raise CircuitOpenError(self.provider_id, self.endpoint_id, self.retry_after() or self.reset_timeout)
+
+    def success(self):
+        if self.opened_at is not None:
+            logger.info(f"Circuit of {self.provider_id}/{self.endpoint_id} closed")
+
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def failure(self):
+        self.failures += 1
+        if self.threshold <= 0:
+            return
+
+        if self._probing or (self.opened_at is None and self.failures >= self.threshold):
+            if self.opened_at is None:
+                logger.warning(f"Circuit of {self.provider_id}/{self.endpoint_id} opened after {self.failures} consecutive failures")
+            self.opened += 1
+            self.opened_at = self.clock()
+            self._probing = False
+
+    def release(self):
+        """
+        End a call without an outcome (e.g. cancelled), so another probe can be made.
+        """
+        self._probing = False
+
+    def open_for(self, seconds: float):
+        """
+        Open the circuit for `seconds`, as another worker of the host did, unless it's already open or probing.
+        """
+        if self.threshold <= 0 or self.opened_at is not None or seconds <= 0:
+            return
+
+        logger.warning(f"Circuit of {self.provider_id}/{self.endpoint_id} opened by another worker")
+        self.opened_at = self.clock() - self.reset_timeout + min(seconds, self.reset_timeout)
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "retry_after": self.retry_after(),
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+def retry_after(response) -> typing.Optional[float]:
+    """
+    Seconds asked for by the `Retry-After` header of a response (seconds or HTTP date), `None` without one.
+    """
+    value = response.headers.get("retry-after")
+    if value is None:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    import email.utils
+
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+async def _discard(response):
+    # Failed responses which are retried are never read, their connection goes back to the pool.
+    aclose = getattr(response, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
+async def _call_with_retries(endpoint: "Endpoint", call: typing.Callable[[], typing.Awaitable[typing.Any]]):
+    policy, breaker = endpoint.policy, endpoint.breaker
+    retry = 0
+    while True:
+        breaker.acquire()
+        try:
+            response = await call()
+        except httpx.HTTPError:
+            breaker.failure()
+            if retry >= policy.max_retries:
+                raise
+            delay = policy.backoff(retry)
+        except BaseException:
+            breaker.release()
+            raise
+        else:
+            status_code = response.status_code
+            if status_code >= 500 or status_code == 408:
+                breaker.failure()
+            else:
+                breaker.success()
+
+            if status_code not in policy.retry_statuses or retry >= policy.max_retries:
+                return response
+
+            delay = retry_after(response)
+            if delay is None:
+                delay = policy.backoff(retry)
+            elif delay > policy.retry_max:
+                return response
+
+            await _discard(response)
+
+        retry += 1
+        logger.info(f"Retrying request to {endpoint.provider.id}/{endpoint.id} in {delay:.3f}s ({retry}/{policy.max_retries})")
+        await asyncio.sleep(delay)
+
+
+async def call_with_policy(endpoint: "Endpoint", call: typing.Callable[[], typing.Awaitable[typing.Any]]):
+    """
+    Make an upstream call under the endpoint's policy: retried with backoff, through its circuit breaker, within its total timeout.
+
+    Raises:
+        CircuitOpenError: The endpoint's circuit is open.
+        httpx.TimeoutException: The call, retries included, took longer than the total timeout.
+    """
+    total_timeout = endpoint.policy.total_timeout
+    if not total_timeout:
+        return await _call_with_retries(endpoint, call)
+
+    try:
+        return await asyncio.wait_for(_call_with_retries(endpoint, call), total_timeout)
+    except asyncio.TimeoutError:
+        # An `httpx` error, so routing strategies, jobs and batches handle it like other upstream timeouts.
+        raise httpx.TimeoutException(f"Request to {endpoint.provider.id}/{endpoint.id} took longer than {total_timeout}s") from None
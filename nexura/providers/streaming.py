@@ -0,0 +1,111 @@
+import json
+import logging
+import typing
+
+import httpx
+
+
+logger = logging.getLogger(__name__)
+
+
+class StreamedResponse():
+    """
+    Upstream server-sent events relayed to the caller as they arrive.
+
+    Lines are forwarded unchanged and never accumulated, only the chunk carrying `usage` (sent last by OpenAI-compatible APIs when `stream_options.include_usage` is set) is decoded.
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(
+        self,
+        response: httpx.Response,
+        on_usage: typing.Optional[typing.Callable[[typing.Dict[str, typing.Any]], None]] = None,
+    ):
+        self.response = response
+        self.usage_callbacks: typing.List[typing.Callable[[typing.Dict[str, typing.Any]], None]] = [on_usage] if on_usage else []
+
+        self.usage: typing.Optional[typing.Dict[str, typing.Any]] = None
+        # Bytes relayed to the caller so far.
+        self.relayed = 0
+        self.done_callbacks: typing.List[typing.Callable[["StreamedResponse"], None]] = []
+        # Text of the first choice, only accumulated once `collect_text` was called.
+        self.text: typing.Optional[typing.List[str]] = None
+
+    @property
+    def status_code(self) -> int:
+        return self.response.status_code
+
+    @property
+    def headers(self) -> httpx.Headers:
+        return self.response.headers
+
+    @property
+    def extensions(self) -> typing.Dict[str, typing.Any]:
+        return self.response.extensions
+
+    def add_usage_callback(self, callback: typing.Callable[[typing.Dict[str, typing.Any]], None]):
+        """
+        Register a function called with the `usage` once the whole stream has been relayed.
+        """
+        self.usage_callbacks.append(callback)
+
+    def add_done_callback(self, callback: typing.Callable[["StreamedResponse"], None]):
+        """
+        Register a function called with the response once the stream ended, whether it was relayed entirely or not.
+        """
+        self.done_callbacks.append(callback)
+
+    def collect_text(self):
+        """
+        Accumulate the text of the first choice as it's relayed, e.g. to add the reply to a conversation session. Every chunk is then decoded.
+        """
+        self.text = []
+
+    async def aclose(self):
+        await self.response.aclose()
+
+    def _peek_usage(self, line: str):
+        # Cheap substring checks first, so regular delta chunks are never parsed.
+        if not line.startswith("data: {") or '"usage"' not in line or '"usage":null' in line:
+            return
+
+        usage = json.loads(line[6:]).get("usage")
+        if usage:
+            self.usage = usage
+
+    def _peek_text(self, line: str):
+        if not line.startswith("data: {"):
+            return
+
+        for choice in json.loads(line[6:]).get("choices") or []:
+            content = (choice.get("delta") or {}).get("content")
+            if choice.get("index", 0) == 0 and content:
+                self.text.append(content)
+
+    async def __aiter__(self) -> typing.AsyncIterator[bytes]:
+        try:
+            async for line in self.response.aiter_lines():
+                self._peek_usage(line)
+                if self.text is not None:
+                    self._peek_text(line)
+                chunk = f"{line}\n".encode()
+                self.relayed += len(chunk)
+                yield chunk
+        finally:
+            # Also reached when the caller disconnects, so the upstream connection goes back to the pool.
+            await self.response.aclose()
+            for callback in self.done_callbacks:
+                try:
+                    callback(self)
+                except Exception:
+                    logger.exception("Failed to process end of streamed response")
+
+        if self.usage is None:
+            return
+
+        for callback in self.usage_callbacks:
+            try:
+                callback(self.usage)
+            except Exception:
+                logger.exception("Failed to process usage of streamed response")
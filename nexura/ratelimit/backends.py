@@ -0,0 +1,168 @@
+from abc import ABC, abstractmethod
+import logging
+import sqlite3
+import threading
+import time
+import typing
+
+from nexura.exceptions import StateError
+from nexura.state import protocol
+from nexura.state.client import StateClient
+
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitBackend(ABC):
+    """
+    Storage of GCRA state: the theoretical arrival time (TAT) of the next request, per key.
+
+    A bucket whose TAT is past is full, the same as a missing one, so it can be dropped.
+    """
+    # Seconds between two sweeps of the full buckets.
+    SWEEP_INTERVAL = 60.0
+
+    @abstractmethod
+    def update(self, key: str, cost: float, interval: float, tolerance: float) -> float:
+        """
+        Atomically consume `cost` units from the bucket of `key`.
+
+        Args:
+            key (str): The bucket to consume from.
+            cost (float): Number of units to consume.
+            interval (float): Seconds it takes to replenish one unit.
+            tolerance (float): How far ahead of now (in seconds) the TAT may be, i.e. the burst size times `interval`.
+
+        Returns:
+            float: 0 if the units were consumed, otherwise the number of seconds to wait before retrying.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def adjust(self, key: str, delta: float):
+        """
+        Move the TAT of `key` by `delta` seconds, to give back (negative) or take (positive) units already accounted for.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """
+    Per-process buckets. Every operation is a single dict lookup and runs without awaiting, so it's atomic on the event loop without locks.
+
+    Keys are API keys or client addresses, full buckets are swept every `SWEEP_INTERVAL` seconds so the dict doesn't grow with every client ever seen.
+    """
+    def __init__(self):
+        self._tats: typing.Dict[str, float] = {}
+        self._swept = time.monotonic()
+
+    def _sweep(self, now: float):
+        self._tats = {key: tat for key, tat in self._tats.items() if tat > now}
+        self._swept = now
+
+    def update(self, key: str, cost: float, interval: float, tolerance: float) -> float:
+        now = time.monotonic()
+        if now - self._swept > self.SWEEP_INTERVAL:
+            self._sweep(now)
+        tat = max(self._tats.get(key, now), now) + cost * interval
+
+        if tat - now > tolerance:
+            return tat - now - tolerance
+
+        self._tats[key] = tat
+        return 0.0
+
+    def adjust(self, key: str, delta: float):
+        if key in self._tats:
+            self._tats[key] += delta
+
+
+class SQLiteRateLimitBackend(RateLimitBackend):
+    """
+    Buckets stored in a local SQLite file, shared by all worker processes on the host.
+
+    Each update is a single `BEGIN IMMEDIATE` transaction, which serializes concurrent workers. It blocks the event loop for the duration of a local write (tens of microseconds).
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=OFF")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS ratelimit (key TEXT PRIMARY KEY, tat REAL NOT NULL)")
+        self._swept = time.time()
+
+    def update(self, key: str, cost: float, interval: float, tolerance: float) -> float:
+        # Wall clock, since monotonic clocks aren't comparable between processes.
+        now = time.time()
+        with self._lock:
+            if now - self._swept > self.SWEEP_INTERVAL:
+                # Each worker sweeps the shared table, a delete of the full buckets.
+                self._connection.execute("DELETE FROM ratelimit WHERE tat <= ?", (now,))
+                self._swept = now
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._connection.execute("SELECT tat FROM ratelimit WHERE key = ?", (key,)).fetchone()
+                tat = max(row[0] if row else now, now) + cost * interval
+
+                if tat - now > tolerance:
+                    return tat - now - tolerance
+
+                self._connection.execute("INSERT OR REPLACE INTO ratelimit (key, tat) VALUES (?, ?)", (key, tat))
+                return 0.0
+            finally:
+                self._connection.execute("COMMIT")
+
+    def adjust(self, key: str, delta: float):
+        with self._lock:
+            self._connection.execute("UPDATE ratelimit SET tat = tat + ? WHERE key = ?", (delta, key))
+
+    def close(self):
+        self._connection.close()
+
+
+class StateRateLimitBackend(RateLimitBackend):
+    """
+    Buckets held by the state daemon (`nexura.state`), shared by the workers of a host.
+
+    Each update is a blocking round trip on a Unix socket, atomic since the daemon runs them one at a time, and blocks the event loop for tens of microseconds, less than a SQLite write. While the daemon is unreachable, requests are let through rather than failed.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._client = StateClient(path)
+
+    def update(self, key: str, cost: float, interval: float, tolerance: float) -> float:
+        try:
+            _, fields = self._client.request(protocol.GCRA, key.encode(), protocol.number(cost), protocol.number(interval), protocol.number(tolerance))
+        except StateError as e:
+            logger.warning(f"Rate limit not applied: {e}")
+            return 0.0
+
+        return float(fields[0])
+
+    def adjust(self, key: str, delta: float):
+        try:
+            self._client.request(protocol.ADJUST, key.encode(), protocol.number(delta))
+        except StateError as e:
+            logger.warning(f"Rate limit not adjusted: {e}")
+
+    def close(self):
+        self._client.close()
+
+
+def create_backend(url: typing.Optional[str]) -> RateLimitBackend:
+    """
+    Create a rate limit backend from an URL, `sqlite:///path/to/ratelimit.db`, `nexura+unix:///path/to/state.sock` or `None` for in-process buckets.
+    """
+    if not url:
+        return MemoryRateLimitBackend()
+    if url.startswith(protocol.SCHEME):
+        return StateRateLimitBackend(protocol.socket_path(url))
+    if url.startswith("sqlite:///"):
+        return SQLiteRateLimitBackend(url.removeprefix("sqlite:///"))
+
+    raise ValueError(f"Unsupported rate limit backend {url}")
@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+import typing
+
+from nexura import config
+from nexura.exceptions import RateLimitExceededError, RequestTooLargeError
+from nexura.ratelimit.backends import RateLimitBackend, create_backend
+
+
+@dataclass
+class Limit:
+    # Units replenished per `period`.
+    rate: float
+    # Period in seconds.
+    period: float = 1.0
+    # Units that can be consumed at once, defaults to `rate`.
+    burst: typing.Optional[float] = None
+
+    @property
+    def interval(self) -> float:
+        return self.period / self.rate
+
+    @property
+    def capacity(self) -> float:
+        return self.burst if self.burst is not None else self.rate
+
+    @property
+    def tolerance(self) -> float:
+        return self.capacity * self.interval
+
+
+@dataclass
+class Reservation:
+    key: str
+    # Tokens consumed up front, before the actual usage is known.
+    tokens: int
+
+
+class RateLimiter():
+    """
+    Generic cell rate algorithm (GCRA) limiter with two dimensions per API key: requests per second and tokens per minute.
+
+    Tokens are reserved from an estimate before the upstream call and reconciled with the reported `usage` after it. Every check is O(1) and never awaits, so it's atomic on the event loop.
+    """
+    def __init__(
+        self,
+        requests: typing.Optional[Limit] = None,
+        tokens: typing.Optional[Limit] = None,
+        backend: typing.Optional[RateLimitBackend] = None,
+    ):
+        self.requests = requests
+        self.tokens = tokens
+        self.backend = backend or create_backend(None)
+
+        # Per-key limits overriding the defaults above.
+        self.overrides: typing.Dict[str, typing.Tuple[typing.Optional[Limit], typing.Optional[Limit]]] = {}
+
+    def set_limits(self, key: str, requests: typing.Optional[Limit] = None, tokens: typing.Optional[Limit] = None):
+        self.overrides[key] = (requests, tokens)
+
+    def limits(self, key: str) -> typing.Tuple[typing.Optional[Limit], typing.Optional[Limit]]:
+        return self.overrides.get(key, (self.requests, self.tokens))
+
+    def acquire(self, key: str, tokens: int = 0) -> Reservation:
+        """
+        Consume one request and `tokens` estimated tokens of `key`.
+
+        Raises:
+            RequestTooLargeError: If the tokens are more than the burst of the token limit, retrying can't help.
+            RateLimitExceededError: If any of the limits is exceeded, nothing is consumed then.
+        """
+        requests_limit, tokens_limit = self.limits(key)
+
+        if tokens_limit is not None and tokens > tokens_limit.capacity:
+            raise RequestTooLargeError(tokens, tokens_limit.capacity)
+
+        if requests_limit is not None:
+            retry_after = self.backend.update(f"{key}:requests", 1, requests_limit.interval, requests_limit.tolerance)
+            if retry_after:
+                raise RateLimitExceededError("requests", retry_after)
+
+        if tokens_limit is not None and tokens:
+            retry_after = self.backend.update(f"{key}:tokens", tokens, tokens_limit.interval, tokens_limit.tolerance)
+            if retry_after:
+                if requests_limit is not None:
+                    self.backend.adjust(f"{key}:requests", -requests_limit.interval)
+                raise RateLimitExceededError("tokens", retry_after)
+
+        return Reservation(key, tokens)
+
+    def reconcile(self, reservation: Reservation, tokens: typing.Optional[int]):
+        """
+        Replace the estimated tokens of a reservation by the actual usage.
+        """
+        _, tokens_limit = self.limits(reservation.key)
+        if tokens_limit is None or tokens is None or tokens == reservation.tokens:
+            return
+
+        self.backend.adjust(f"{reservation.key}:tokens", (tokens - reservation.tokens) * tokens_limit.interval)
+        reservation.tokens = tokens
+
+
+def create_rate_limiter() -> typing.Optional[RateLimiter]:
+    if not config.RATE_LIMIT_ENABLED:
+        return None
+
+    requests = Limit(config.RATE_LIMIT_RPS, 1.0, config.RATE_LIMIT_RPS_BURST) if config.RATE_LIMIT_RPS else None
+    tokens = Limit(config.RATE_LIMIT_TPM, 60.0) if config.RATE_LIMIT_TPM else None
+
+    return RateLimiter(requests, tokens, create_backend(config.RATE_LIMIT_BACKEND))
+
+
+rate_limiter = create_rate_limiter()
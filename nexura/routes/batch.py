@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import time
+import typing
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+import orjson
+from pydantic import ValidationError
+
+from nexura import config
+from nexura.capture import traffic_capture
+from nexura.exceptions import NotFoundError
+from nexura.metrics import metrics
+from nexura.providers import nexura_provider
+from nexura.routes.handler import account_usage, acquire_rate_limit, capture_request, observe_request, preflight, release_rate_limit, to_response, upstream_errors
+
+
+logger = logging.getLogger(__name__)
+
+_semaphores: typing.Dict[str, asyncio.Semaphore] = {}
+
+
+def provider_semaphore(provider_id: str) -> asyncio.Semaphore:
+    """
+    Bound the batched requests sent to a provider at once, shared by all batches so they can't exhaust its connection pool.
+    """
+    semaphore = _semaphores.get(provider_id)
+    if semaphore is None:
+        semaphore = _semaphores[provider_id] = asyncio.Semaphore(config.BATCH_CONCURRENCY)
+
+    return semaphore
+
+
+def error_line(index: int, status_code: int, detail: typing.Any) -> bytes:
+    return orjson.dumps({"index": index, "status": status_code, "body": {"detail": detail}}) + b"\n"
+
+
+def result_line(index: int, status_code: int, content: bytes, media_type: typing.Optional[str]) -> bytes:
+    if media_type and "json" in media_type:
+        try:
+            orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # Empty or not JSON after all, it's sent as a string below.
+            pass
+        else:
+            # The response is JSON, it's embedded without being encoded again. Raw line breaks can only be whitespace in JSON, so they are dropped to keep it on one line.
+            content = content.strip().replace(b"\n", b"").replace(b"\r", b"")
+            return b'{"index":%d,"status":%d,"body":%s}\n' % (index, status_code, content)
+
+    return orjson.dumps({"index": index, "status": status_code, "body": content.decode(errors="replace") if content else None}) + b"\n"
+
+
+async def run_item(request: Request, index: int, line: bytes) -> bytes:
+    try:
+        item = orjson.loads(line)
+        provider, endpoint, data = item["provider"], item["endpoint"], item["body"]
+    except (orjson.JSONDecodeError, KeyError, TypeError):
+        return error_line(index, 400, "Each line must be a JSON object with `provider`, `endpoint` and `body`")
+
+    try:
+        endpoint_ = nexura_provider.get_route(provider, endpoint)
+    except NotFoundError as e:
+        return error_line(index, 404, str(e))
+
+    start = time.perf_counter()
+    body, r, response, status = None, None, None, 500
+    try:
+        try:
+            body = endpoint_.parse_body(data)
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_input=False))
+
+        if endpoint_.is_streaming(body):
+            raise HTTPException(status_code=400, detail="Streamed requests can't be batched")
+
+        estimate = preflight(endpoint_, body)
+        async with provider_semaphore(endpoint_.provider.id):
+            # Once the request can be sent, so the items of a batch are paced by the semaphore rather than all rejected past the burst.
+            reservation = acquire_rate_limit(request, endpoint_, body, estimate)
+            try:
+                with upstream_errors(f"{provider}/{endpoint}"):
+                    r = await nexura_provider.handle_request(provider, endpoint, body=body)
+            except BaseException:
+                # Open circuit, timeout or retries exhausted: no usage will be reported.
+                release_rate_limit(reservation)
+                raise
+
+        account_usage(request, r, reservation, start)
+        response = to_response(r)
+        status = response.status_code
+    except HTTPException as e:
+        status = e.status_code
+        return error_line(index, e.status_code, e.detail)
+    except Exception:
+        # A single failing request mustn't fail the others.
+        logger.exception(f"Batched request {index} to {provider}/{endpoint} failed")
+        return error_line(index, 500, "Internal Server Error")
+    finally:
+        if metrics is not None:
+            observe_request(request, endpoint_, body, r, response, status, start, bytes_in=len(line))
+        if traffic_capture is not None and traffic_capture.sample():
+            await capture_request(request, endpoint_, r, response, status, start, content=orjson.dumps(data))
+
+    return result_line(index, response.status_code, response.body, response.headers.get("content-type"))
+
+
+async def handle_batch(request: Request) -> StreamingResponse:
+    """
+    Run a JSONL body of requests, one `{"provider": ..., "endpoint": ..., "body": ...}` object per line, which may target different providers.
+
+    Results are streamed back as NDJSON as soon as each request completes, `{"index": ..., "status": ..., "body": ...}` with the index of the request line, blank lines included.
+    """
+    # Numbered before blank lines are skipped, so indices are the caller's line numbers (from 0).
+    lines = [(index, line) for index, line in enumerate((await request.body()).splitlines()) if line.strip()]
+    if len(lines) > config.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batches are limited to {config.BATCH_MAX_ITEMS} requests")
+
+    async def results() -> typing.AsyncIterator[bytes]:
+        tasks = [asyncio.create_task(run_item(request, index, line)) for index, line in lines]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            # The client disconnected: requests not sent yet are dropped.
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
@@ -0,0 +1,5 @@
+from nexura.providers import nexura_provider
+
+
+async def breaker_states() -> dict:
+    return nexura_provider.breaker_states()
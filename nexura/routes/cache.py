@@ -0,0 +1,18 @@
+from fastapi import HTTPException
+
+from nexura.providers import nexura_provider
+
+
+async def cache_stats() -> dict:
+    if nexura_provider.cache is None and nexura_provider.semantic_cache is None and nexura_provider.singleflight is None:
+        raise HTTPException(status_code=404, detail="Response caches are disabled")
+
+    stats = {}
+    if nexura_provider.cache is not None:
+        stats["exact"] = nexura_provider.cache.stats()
+    if nexura_provider.semantic_cache is not None:
+        stats["semantic"] = nexura_provider.semantic_cache.stats()
+    if nexura_provider.singleflight is not None:
+        stats["singleflight"] = nexura_provider.singleflight.stats()
+
+    return stats
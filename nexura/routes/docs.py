@@ -0,0 +1,54 @@
+import hashlib
+import os
+import typing
+
+from fastapi import HTTPException, Request, Response
+
+from nexura import config
+
+
+class PrecomputedFile():
+    """
+    File generated ahead of time (e.g. `docs.json` by `generate_docs.py`), kept in memory with its ETag and reloaded only when it changes on disk.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime: typing.Optional[int] = None
+        self.content = b""
+        self.etag = ""
+
+    def load(self) -> typing.Tuple[bytes, str]:
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self._mtime:
+            with open(self.path, "rb") as f:
+                content = f.read()
+
+            self.content, self.etag, self._mtime = content, f'"{hashlib.sha256(content).hexdigest()[:32]}"', mtime
+
+        return self.content, self.etag
+
+
+def etag_matches(etag: str, if_none_match: typing.Optional[str]) -> bool:
+    if not if_none_match:
+        return False
+
+    # Weak comparison, as required for `If-None-Match`.
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+docs_file = PrecomputedFile(config.DOCS_PATH)
+
+
+async def docs_json(request: Request) -> Response:
+    try:
+        content, etag = docs_file.load()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Documentation wasn't generated, run `python generate_docs.py`")
+
+    # Clients may keep it, but have to revalidate it, which is answered without a body while it didn't change.
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(etag, request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=content, media_type="application/json", headers=headers)
@@ -0,0 +1,30 @@
+from fastapi import HTTPException, Request, Response
+
+from nexura.exceptions import NotFoundError
+from nexura.providers import nexura_provider
+from nexura.routes.handler import parse_body
+from nexura.utils.serialization import dumps
+
+
+async def estimate_request(provider: str, endpoint: str, request: Request) -> Response:
+    """
+    Prompt tokens and worst-case cost of a request, without sending it.
+    """
+    try:
+        endpoint_ = nexura_provider.get_route(provider, endpoint)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    body = await parse_body(endpoint_, request)
+    estimate = endpoint_.estimate_cost(body)
+    if estimate is None:
+        raise HTTPException(status_code=422, detail=f"Requests to {provider}/{endpoint} can't be estimated")
+
+    content = dumps({
+        "model": estimate.model,
+        "prompt_tokens": estimate.prompt_tokens,
+        "completion_tokens": estimate.completion_tokens,
+        "total_tokens": estimate.total_tokens,
+        "max_cost": estimate.max_cost,
+    })
+    return Response(content=content, media_type="application/json")
@@ -1,9 +1,354 @@
+from contextlib import contextmanager
+import logging
+import math
+import time
 import typing
-from nexura.models.response import Response
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+import httpx
+import orjson
+from pydantic import ValidationError
+
+from nexura.capture import traffic_capture
+from nexura.exceptions import BudgetExceededError, CircuitOpenError, NotFoundError, PriceNotFoundError, RateLimitExceededError, RequestTooLargeError, SessionError, TemplateError
+from nexura.ledger import UsageEntry, usage_ledger
+from nexura.metrics import metrics
+from nexura.preflight import CostEstimate, run_preflight
 from nexura.providers import nexura_provider
+from nexura.providers.endpoint import TYPED, Endpoint
+from nexura.providers.streaming import StreamedResponse
+from nexura.ratelimit.limiter import Reservation, rate_limiter
+from nexura.sessions import Turn, session_store
+from nexura.templates import Template, template_registry
+from nexura.utils.api_key import bearer_token, hash_apikey
+from nexura.utils.serialization import dumps
+
+
+logger = logging.getLogger(__name__)
+
+async def parse_body(endpoint: Endpoint, request: Request) -> typing.Any:
+    try:
+        return endpoint.parse_body(await request.body())
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_input=False))
+
+
+def api_key(request: Request) -> str:
+    """
+    Key the request is accounted to: the hash of its API key, or the client address for anonymous requests.
+    """
+    authenticated = getattr(request.state, "api_key", None)
+    if authenticated is not None:
+        return authenticated.key_hash
+
+    key = bearer_token(request)
+    if key:
+        return hash_apikey(key)
+
+    return request.client.host if request.client else "anonymous"
+
+
+def preflight(endpoint: Endpoint, body: typing.Any) -> typing.Optional[CostEstimate]:
+    try:
+        return run_preflight(endpoint, body)
+    except BudgetExceededError as e:
+        raise HTTPException(status_code=402, detail=str(e))
+
+
+def acquire_rate_limit(request: Request, endpoint: Endpoint, body: typing.Any, estimate: typing.Optional[CostEstimate] = None) -> typing.Optional[Reservation]:
+    if rate_limiter is None:
+        return None
+
+    # Tokens were already counted by the preflight, when the endpoint supports it.
+    tokens = estimate.total_tokens if estimate is not None else endpoint.estimate_tokens(body)
+    try:
+        return rate_limiter.acquire(api_key(request), tokens)
+    except RequestTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except RateLimitExceededError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+
+
+def release_rate_limit(reservation: typing.Optional[Reservation]):
+    """
+    Give back the tokens reserved for a request which got no response from the upstream.
+    """
+    if reservation is not None and reservation.tokens:
+        rate_limiter.reconcile(reservation, 0)
+
+
+async def open_session(request: Request, endpoint: Endpoint, body: typing.Any, session: str) -> typing.Tuple[typing.Any, Turn]:
+    if session_store is None:
+        raise HTTPException(status_code=400, detail="Conversation sessions are disabled")
+
+    try:
+        return await session_store.open(session_store.key(api_key(request), session), endpoint, body)
+    except SessionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def save_turn(r, turn: Turn):
+    """
+    Add a request and its reply to its session, once the whole reply is relayed for streamed responses. Failed requests aren't added, so they can be retried.
+    """
+    if r.status_code != 200:
+        return
+
+    if isinstance(r, StreamedResponse):
+        r.collect_text()
+        # Only streams relayed entirely report their usage.
+        r.add_usage_callback(lambda usage: session_store.save_later(turn, "".join(r.text)))
+        return
+
+    try:
+        data = orjson.loads(r.content)
+    except ValueError:
+        # Not a reply the conversation can go on from.
+        return
+
+    await session_store.save(turn, r.extensions["nexura_endpoint"].reply_text(data))
+
+
+async def expand_templates(request: Request, endpoint: Endpoint, body: typing.Any, references: str) -> typing.Tuple[typing.Any, typing.List[Template]]:
+    if template_registry is None:
+        raise HTTPException(status_code=400, detail="Prompt templates are disabled")
+
+    try:
+        return await template_registry.expand(api_key(request), endpoint, body, references)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except TemplateError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def observe_templates(r, templates: typing.List[Template]):
+    """
+    Account the usage of a response, prompt cache hits included, to the templates of its request.
+    """
+    if isinstance(r, StreamedResponse):
+        r.add_usage_callback(lambda usage: template_registry.observe(templates, usage))
+        return
+
+    # Responses from the gateway's caches didn't reach the provider.
+    if r.status_code != 200 or r.extensions.get("nexura_cached"):
+        return
+
+    usage = r.extensions["nexura_endpoint"].peek_usage(r.content)
+    if usage:
+        template_registry.observe(templates, usage)
+
+
+@contextmanager
+def upstream_errors(target: str):
+    """
+    Answer upstream failures which aren't responses: `503` while the circuit is open, `504` on timeouts, `502` on other network errors.
+    """
+    try:
+        yield
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+    except httpx.TimeoutException as e:
+        raise HTTPException(status_code=504, detail=f"Request to {target} timed out: {e}")
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Request to {target} failed: {e!r}")
+
+
+def record_usage(
+    key: typing.Optional[str],
+    endpoint: Endpoint,
+    body: typing.Any,
+    usage: typing.Optional[typing.Dict[str, int]],
+    reservation: typing.Optional[Reservation],
+    latency: float,
+):
+    if reservation is not None and reservation.tokens:
+        # Failed and cached requests don't use any upstream tokens.
+        rate_limiter.reconcile(reservation, usage["total_tokens"] if usage else 0)
 
+    if not usage or (usage_ledger is None and metrics is None):
+        return
 
-async def handle_request(provider: str, endpoint_id: str, body: typing.Any) -> Response:
-    response = nexura_provider.handle_request(provider, endpoint_id, body=body)
+    model = endpoint.get_model(body)
+    start = time.perf_counter()
+    try:
+        cost = endpoint.calculate_cost(body, usage)
+    except PriceNotFoundError as e:
+        # The upstream already answered, the request is recorded without a cost.
+        logger.warning(f"Could not price request to {endpoint.provider.id}/{endpoint.id}: {e}")
+        cost = None
+    if metrics is not None:
+        metrics.observe_usage(endpoint.provider.id, endpoint.id, model, usage, cost, time.perf_counter() - start)
+
+    if usage_ledger is not None:
+        usage_ledger.record(UsageEntry(
+            key=key,
+            provider_id=endpoint.provider.id,
+            endpoint_id=endpoint.id,
+            model=model,
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+            cost=cost,
+            latency=latency,
+        ))
+
+
+def account_usage(request: Request, r, reservation: typing.Optional[Reservation], start: float):
+    """
+    Reconcile the rate limit reservation and record the usage of a response, once it's known.
+    """
+    if reservation is None and usage_ledger is None and metrics is None:
+        return
+
+    # Only the ledger needs the key, hashing it is skipped when only metrics are recorded.
+    key = api_key(request) if usage_ledger is not None else None
+    endpoint = r.extensions["nexura_endpoint"]
+    body = r.extensions["nexura_body"]
+
+    if isinstance(r, StreamedResponse):
+        r.add_usage_callback(lambda usage: record_usage(key, endpoint, body, usage, reservation, time.perf_counter() - start))
+        return
+
+    usage = None
+    if r.status_code == 200 and not r.extensions.get("nexura_cached"):
+        usage = endpoint.peek_usage(r.content)
+
+    record_usage(key, endpoint, body, usage, reservation, time.perf_counter() - start)
+
+
+def to_response(r) -> Response:
+    if isinstance(r, StreamedResponse):
+        return StreamingResponse(r, status_code=r.status_code, media_type=r.media_type)
+
+    endpoint = r.extensions["nexura_endpoint"]
+    headers = {name: r.headers[name] for name in endpoint.passthrough_headers if name in r.headers}
+
+    if endpoint.response_mode == TYPED and r.status_code == 200:
+        try:
+            typed = endpoint.parse_response(r.content)
+        except ValidationError:
+            raise HTTPException(status_code=502, detail=f"Invalid response from {endpoint.provider.id}/{endpoint.id}")
+
+        headers["content-type"] = "application/json"
+        return Response(content=dumps(typed), headers=headers)
+
+    # Passthrough: the upstream body is relayed as is, without being decoded.
+    return Response(content=r.content, status_code=r.status_code, headers=headers)
+
+
+def observe_request(request: Request, endpoint: Endpoint, body: typing.Any, r, response: typing.Optional[Response], status: int, start: float, bytes_in: typing.Optional[int] = None):
+    """
+    Record the metrics of a request, once its response is sent for streamed ones.
+
+    Args:
+        bytes_in: Size of the request, the body of the HTTP request by default.
+    """
+    upstream = None
+    if r is not None:
+        # With routing strategies, the endpoint which answered rather than the first target.
+        endpoint = r.extensions["nexura_endpoint"]
+        # Responses from cache never waited for the upstream.
+        upstream = r.extensions.get("nexura_upstream_seconds", 0.0)
+
+    model = endpoint.get_model(body) if body is not None else None
+    if bytes_in is None:
+        bytes_in = int(request.headers.get("content-length") or 0)
+
+    def observe(bytes_out: int):
+        metrics.observe_request(endpoint.provider.id, endpoint.id, model, status, time.perf_counter() - start, upstream, bytes_in, bytes_out)
+
+    if isinstance(r, StreamedResponse) and response is not None:
+        r.add_done_callback(lambda streamed: observe(streamed.relayed))
+    else:
+        observe(len(response.body) if response is not None else 0)
+
+
+async def capture_request(request: Request, endpoint: Endpoint, r, response: typing.Optional[Response], status: int, start: float, content: typing.Optional[bytes] = None):
+    """
+    Add a request and its response to the traffic capture, once its response is sent for streamed ones.
+
+    Args:
+        content: Body of the request, the body of the HTTP request by default.
+    """
+    if r is not None:
+        endpoint = r.extensions["nexura_endpoint"]
+    upstream = r.extensions.get("nexura_upstream_seconds", 0.0) if r is not None else None
+    if content is None:
+        content = await request.body()
+
+    if isinstance(r, StreamedResponse) and response is not None:
+        r.add_done_callback(lambda streamed: traffic_capture.record(endpoint.provider.id, endpoint.id, content, status, None, time.perf_counter() - start, upstream, streamed=True))
+    else:
+        traffic_capture.record(endpoint.provider.id, endpoint.id, content, status, response.body if response is not None else None, time.perf_counter() - start, upstream)
+
+
+async def proxy(request: Request, endpoint: Endpoint, target: str, send: typing.Callable[[typing.Any], typing.Awaitable[typing.Any]], session: typing.Optional[str] = None, template: typing.Optional[str] = None) -> Response:
+    """
+    Validate a request, run the preflight and rate limits, send it with `send(body)`, then account its usage and answer it.
+
+    Args:
+        endpoint: The endpoint validating the request, the first target of routing strategies.
+        target: Name of the upstream in error messages.
+        session: Id of the conversation session the request is a turn of, its history is added before it's sent.
+        template: Comma separated `name@version` of the prompt templates put first in the request.
+    """
+    start = time.perf_counter()
+    body, r, response, status = None, None, None, 500
+    try:
+        body = await parse_body(endpoint, request)
+        turn = None
+        if session is not None:
+            body, turn = await open_session(request, endpoint, body, session)
+        templates = None
+        if template is not None:
+            # After the session's history, so templates are stored once, in the registry, and stay first.
+            body, templates = await expand_templates(request, endpoint, body, template)
+        estimate = preflight(endpoint, body)
+        reservation = acquire_rate_limit(request, endpoint, body, estimate)
+
+        try:
+            with upstream_errors(target):
+                r = await send(body)
+        except BaseException:
+            # Open circuit, timeout or retries exhausted: no usage will be reported, the reservation would hold the tokens until they're replenished.
+            release_rate_limit(reservation)
+            raise
+        account_usage(request, r, reservation, start)
+        if templates:
+            observe_templates(r, templates)
+        if turn is not None:
+            await save_turn(r, turn)
+
+        response = to_response(r)
+        status = response.status_code
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    finally:
+        if metrics is not None:
+            observe_request(request, endpoint, body, r, response, status, start)
+        if traffic_capture is not None and traffic_capture.sample():
+            await capture_request(request, endpoint, r, response, status, start)
 
     return response
+
+
+async def handle_request(provider: str, endpoint: str, request: Request, session: typing.Optional[str] = None, template: typing.Optional[str] = None) -> Response:
+    try:
+        endpoint_ = nexura_provider.get_route(provider, endpoint)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return await proxy(request, endpoint_, f"{provider}/{endpoint}", lambda body: nexura_provider.handle_request(provider, endpoint, body=body), session, template)
+
+
+async def handle_routed_request(strategy: str, request: Request, session: typing.Optional[str] = None, template: typing.Optional[str] = None) -> Response:
+    try:
+        strategy_ = nexura_provider.get_strategy(strategy)
+        # The first target defines the request type accepted by the strategy.
+        first = strategy_.targets[0]
+        endpoint_ = nexura_provider.get_route(first.provider_id, first.endpoint_id)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return await proxy(request, endpoint_, strategy, lambda body: nexura_provider.handle_routed_request(strategy, body), session, template)
@@ -0,0 +1,94 @@
+import typing
+
+from fastapi import HTTPException, Request, Response
+import orjson
+
+from nexura.exceptions import NotFoundError, WebhookError
+from nexura.jobs import check_webhook_url, job_queue
+from nexura.providers import nexura_provider
+from nexura.routes.handler import api_key, parse_body, preflight
+
+
+def job_content(job) -> bytes:
+    """
+    JSON of a job as returned by `GET /jobs/{id}` and posted to its webhook, with the upstream response once it's known.
+    """
+    content = orjson.dumps({
+        "id": job.id,
+        "status": job.status,
+        "provider": job.provider_id,
+        "endpoint": job.endpoint_id,
+        "attempts": job.attempts,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "completed_at": job.completed_at,
+        "error": job.error,
+    })
+    if job.status_code is None:
+        return content
+
+    result = None
+    if job.content_type and "json" in job.content_type and job.result:
+        body = job.result.encode()
+        try:
+            orjson.loads(body)
+        except orjson.JSONDecodeError:
+            # Truncated, or an error page labelled as JSON, it's sent as a string below.
+            pass
+        else:
+            # The stored response is JSON, it's embedded without being encoded again.
+            result = b'{"status":%d,"body":%s}' % (job.status_code, body)
+    if result is None:
+        result = orjson.dumps({"status": job.status_code, "body": job.result})
+
+    return content[:-1] + b',"result":' + result + b"}"
+
+
+async def submit_job(provider: str, endpoint: str, request: Request, webhook_url: typing.Optional[str] = None) -> Response:
+    """
+    Queue a request to run in the background, answered with the job id right away. The outcome is polled with `GET /jobs/{id}`, or posted to `webhook_url` once known.
+    """
+    try:
+        endpoint_ = nexura_provider.get_route(provider, endpoint)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    if webhook_url is not None:
+        try:
+            await check_webhook_url(webhook_url)
+        except WebhookError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    body = await parse_body(endpoint_, request)
+    if endpoint_.is_streaming(body):
+        raise HTTPException(status_code=400, detail="Streamed requests can't run as jobs")
+
+    preflight(endpoint_, body)
+
+    authenticated = getattr(request.state, "api_key", None)
+    priority = authenticated.job_priority if authenticated is not None else 0
+    job = await job_queue.submit(api_key(request), provider, endpoint, endpoint_.encode_body(body).decode(), priority, webhook_url)
+
+    return Response(content=orjson.dumps({"id": job.id, "status": job.status}), status_code=202, media_type="application/json", headers={"Location": f"/jobs/{job.id}"})
+
+
+async def get_owned_job(job_id: str, request: Request):
+    job = await job_queue.get(job_id)
+    # Jobs of other keys are reported as missing.
+    if job is None or job.key != api_key(request):
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+    return job
+
+
+async def get_job(job_id: str, request: Request) -> Response:
+    job = await get_owned_job(job_id, request)
+    return Response(content=job_content(job), media_type="application/json")
+
+
+async def cancel_job(job_id: str, request: Request) -> Response:
+    await get_owned_job(job_id, request)
+    if not await job_queue.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job {job_id} already started")
+
+    return await get_job(job_id, request)
@@ -0,0 +1,10 @@
+from fastapi import Response
+
+from nexura.metrics import metrics
+from nexura.state.sync import state_sync
+
+
+async def metrics_view() -> Response:
+    # With several workers, the metrics of all of them, whichever answers.
+    shared = metrics if state_sync is None else await state_sync.shared_metrics()
+    return Response(content=shared.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,9 @@
+from nexura.state.sync import state_sync
+from nexura.strategies.routing.stats import routing_stats
+
+
+async def routing_stats_view() -> dict:
+    if state_sync is not None:
+        return await state_sync.shared_routing_stats()
+
+    return routing_stats.as_dict()
@@ -0,0 +1,37 @@
+from fastapi import HTTPException, Request, Response
+
+from nexura.routes.handler import api_key
+from nexura.sessions import SessionState, session_store
+
+
+async def session_stats() -> dict:
+    return session_store.stats()
+
+
+async def get_owned_session(session_id: str, request: Request) -> SessionState:
+    state = await session_store.get(session_store.key(api_key(request), session_id))
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+
+    return state
+
+
+async def get_session(session_id: str, request: Request) -> dict:
+    """
+    History of a conversation session, as sent upstream on its next turn without limits.
+    """
+    state = await get_owned_session(session_id, request)
+    return {
+        "id": session_id,
+        "messages": [{"role": role, "content": text, "tokens": tokens} for role, text, tokens in state.pinned + state.messages],
+        "summary": state.summary,
+        "tokens": state.tokens,
+        "total_messages": state.total,
+    }
+
+
+async def delete_session(session_id: str, request: Request) -> Response:
+    await get_owned_session(session_id, request)
+    await session_store.delete(session_store.key(api_key(request), session_id))
+
+    return Response(status_code=204)
@@ -0,0 +1,49 @@
+from dataclasses import asdict
+
+from fastapi import HTTPException, Request, Response
+import orjson
+from pydantic import ValidationError
+
+from nexura.exceptions import NotFoundError, TemplateError
+from nexura.routes.handler import api_key
+from nexura.state.sync import state_sync
+from nexura.templates import TemplateContent, template_registry
+from nexura.utils.serialization import get_adapter
+
+
+async def template_stats(request: Request) -> dict:
+    """
+    Usage of every template of the API key: requests, bytes clients didn't send, and hits of the providers' prompt caches.
+    """
+    if state_sync is not None:
+        return await state_sync.shared_template_stats(api_key(request))
+
+    return template_registry.stats(api_key(request))
+
+
+async def get_template(name: str, version: int, request: Request) -> dict:
+    try:
+        template = await template_registry.get(api_key(request), f"{name}@{version}")
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return {"name": template.name, "version": template.version, **asdict(template.content), "stats": template.stats.as_dict()}
+
+
+async def put_template(name: str, version: int, request: Request) -> Response:
+    """
+    Register a version of a template for the API key. Versions are immutable: registering one again is only accepted with the same content.
+    """
+    try:
+        content = get_adapter(TemplateContent).validate_json(await request.body())
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_input=False))
+    if not content.system and not content.tools:
+        raise HTTPException(status_code=422, detail="A template needs a system prompt or tools")
+
+    try:
+        template, created = await template_registry.add(api_key(request), name, version, content)
+    except TemplateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return Response(content=orjson.dumps({"name": template.name, "version": template.version, "size": template.size}), status_code=201 if created else 200, media_type="application/json")
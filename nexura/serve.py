@@ -0,0 +1,79 @@
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import typing
+
+from nexura import config
+from nexura.state import protocol
+
+
+def available_cores() -> int:
+    # Cores this process may run on, which can be fewer than the host's in a container.
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+
+    return os.cpu_count() or 1
+
+
+def wait_for_socket(path: str, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(path)
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"State daemon did not start on {path}")
+            time.sleep(0.02)
+
+
+def start_state_daemon(path: str) -> subprocess.Popen:
+    """
+    Start the state daemon, and point the workers' cache, rate limiter, sessions and templates at it unless they have their own backend. The workers also share their metrics, routing statistics and open circuits through it.
+    """
+    daemon = subprocess.Popen([sys.executable, "-m", "nexura.state", path])
+    wait_for_socket(path)
+
+    url = f"{protocol.SCHEME}{path}"
+    os.environ.setdefault("NEXURA_CACHE_BACKEND", url)
+    os.environ.setdefault("NEXURA_RATE_LIMIT_BACKEND", url)
+    os.environ.setdefault("NEXURA_SESSIONS_BACKEND", url)
+    os.environ.setdefault("NEXURA_TEMPLATES_BACKEND", url)
+    os.environ.setdefault("NEXURA_STATE_BACKEND", url)
+
+    return daemon
+
+
+def main(argv: typing.Optional[typing.Sequence[str]] = None):
+    """
+    Serve the app with several worker processes, one per core by default, sharing caches, counters and rate limit buckets through the state daemon.
+
+        python -m nexura.serve --port 8000 --workers 4
+    """
+    parser = argparse.ArgumentParser(description="Serve Nexura with several worker processes sharing their state.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=config.WORKERS, help="worker processes, 0 for one per available core (default: NEXURA_WORKERS or 0)")
+    parser.add_argument("--state-socket", default=config.STATE_SOCKET, help=f"Unix socket of the state daemon (default: {config.STATE_SOCKET})")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    workers = args.workers or available_cores()
+    # A single worker has nothing to share, it keeps its state in process.
+    daemon = start_state_daemon(args.state_socket) if workers > 1 else None
+    try:
+        uvicorn.run("nexura.main:app", host=args.host, port=args.port, workers=workers, log_level=args.log_level)
+    finally:
+        if daemon is not None:
+            daemon.terminate()
+            daemon.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+import asyncio
+from dataclasses import dataclass, field
+import logging
+import typing
+
+import orjson
+
+from nexura import config
+from nexura.caching.backends import CacheBackend, create_backend
+from nexura.caching.lru import LRUCache
+from nexura.exceptions import SessionError
+
+if typing.TYPE_CHECKING:
+    from nexura.providers.endpoint import Endpoint
+
+
+logger = logging.getLogger(__name__)
+
+# A stored message: `[role, text, tokens]`, its tokens counted once when it's added.
+Message = typing.List[typing.Any]
+Summarizer = typing.Callable[[typing.Optional[str], typing.List[Message]], typing.Awaitable[str]]
+
+SUMMARY_PROMPT = "Summarize the conversation below in a few sentences, keeping the facts, names, numbers and decisions needed to carry it on. Start from the earlier summary when there is one."
+
+
+@dataclass
+class SessionState:
+    # Messages sent with every request, the system prompts.
+    pinned: typing.List[Message] = field(default_factory=list)
+    # The conversation, oldest first, without the messages compacted away.
+    messages: typing.List[Message] = field(default_factory=list)
+    # Summary of the compacted messages, when a summarizer is configured.
+    summary: typing.Optional[str] = None
+    # Messages ever added, compacted ones included.
+    total: int = 0
+
+    def dumps(self) -> bytes:
+        return orjson.dumps(self)
+
+    @classmethod
+    def loads(cls, data: bytes) -> "SessionState":
+        return cls(**orjson.loads(data))
+
+    @property
+    def tokens(self) -> int:
+        return sum(message[2] for message in self.pinned) + sum(message[2] for message in self.messages)
+
+
+@dataclass
+class Turn:
+    """
+    A request of a session, saved with the upstream's reply once it's known.
+    """
+    key: str
+    endpoint: "Endpoint"
+    body: typing.Any
+    state: SessionState
+    # Messages of the request itself, besides its system prompts.
+    messages: typing.List[Message]
+
+    def message(self, role: str, text: str) -> Message:
+        return [role, text, self.endpoint.message_tokens(self.body, role, text)]
+
+
+class SessionStore():
+    """
+    Conversation sessions: clients send a session id and only the new messages, and Nexura sends the whole conversation upstream.
+
+    Messages are stored once, as `[role, text, tokens]`, in the in-process LRU or in a backend shared by all workers. A request is rebuilt from the session's system prompts, the summary of compacted messages if any, and the most recent messages fitting in `max_tokens` (the completion's `max_tokens` included) and `max_messages`.
+
+    Histories growing beyond those limits are compacted once the turn is saved: the oldest messages are dropped until half the limits are used, so a summary is made every few turns rather than on every one. With a `summarizer`, dropped messages are folded into the session's summary in the background.
+
+    The turns of a session are expected one at a time: of two concurrent turns, the one saved last wins.
+    """
+    def __init__(
+        self,
+        lru: LRUCache,
+        backend: typing.Optional[CacheBackend] = None,
+        max_tokens: int = 0,
+        max_messages: int = 0,
+        summarizer: typing.Optional[Summarizer] = None,
+    ):
+        self.lru = lru
+        self.backend = backend
+        self.max_tokens = max_tokens
+        self.max_messages = max_messages
+        self.summarizer = summarizer
+
+        self._tasks: typing.Set[asyncio.Task] = set()
+
+        self.turns = 0
+        self.compacted = 0
+        self.summaries = 0
+
+    @staticmethod
+    def key(owner: str, session_id: str) -> str:
+        # Sessions belong to an API key, other keys can't read them. Owners and ids are encoded apart, so an owner with colons (an IPv6 address) can't reach another's sessions.
+        return "session:" + orjson.dumps([owner, session_id]).decode()
+
+    async def get(self, key: str) -> typing.Optional[SessionState]:
+        # With a backend, it's the only copy: a session moves between workers from one turn to the next.
+        data = await self.backend.get(key) if self.backend is not None else self.lru.get(key)
+        return SessionState.loads(data) if data is not None else None
+
+    async def _set(self, key: str, state: SessionState):
+        data = state.dumps()
+        if self.backend is not None:
+            await self.backend.set(key, data, self.lru.ttl)
+        else:
+            self.lru.set(key, data)
+
+    async def delete(self, key: str):
+        if self.backend is not None:
+            await self.backend.delete(key)
+        else:
+            self.lru.delete(key)
+
+    def _window(self, state: SessionState, budget: int) -> typing.List[Message]:
+        """
+        The most recent messages of a session fitting in `budget` tokens and `max_messages`.
+        """
+        start = max(len(state.messages) - self.max_messages, 0) if self.max_messages else 0
+        if not self.max_tokens:
+            return state.messages[start:]
+
+        first = len(state.messages)
+        while first > start and state.messages[first - 1][2] <= budget:
+            first -= 1
+            budget -= state.messages[first][2]
+
+        return state.messages[first:]
+
+    async def open(self, key: str, endpoint: "Endpoint", body: typing.Any) -> typing.Tuple[typing.Any, Turn]:
+        """
+        Rebuild a request of a session with the conversation so far.
+
+        Returns:
+            Tuple[Any, Turn]: The request to send upstream, and the turn to `save` with its reply.
+
+        Raises:
+            SessionError: The endpoint doesn't support sessions.
+        """
+        conversation = endpoint.conversation(body)
+        if conversation is None:
+            raise SessionError(f"Endpoint {endpoint.id} of provider {endpoint.provider.id} doesn't support sessions")
+
+        state = await self.get(key) or SessionState()
+        turn = Turn(key, endpoint, body, state, [])
+        system = []
+        for role, text in conversation:
+            (system if role == "system" else turn.messages).append(turn.message(role, text))
+        if system:
+            # The system prompts of a request replace the session's.
+            state.pinned = system
+
+        budget = self.max_tokens - sum(message[2] for message in state.pinned + turn.messages) - (getattr(body, "max_tokens", None) or 0)
+        if state.summary:
+            budget -= len(state.summary) // 4
+        history = state.pinned + self._window(state, budget)
+
+        return endpoint.with_conversation(body, [(role, text) for role, text, _ in history], state.summary), turn
+
+    def _compact(self, state: SessionState) -> typing.List[Message]:
+        over_tokens = self.max_tokens and state.tokens > self.max_tokens
+        over_messages = self.max_messages and len(state.messages) > self.max_messages
+        if not (over_tokens or over_messages):
+            return []
+
+        tokens = state.tokens
+        first = 0
+        while first < len(state.messages) and ((self.max_tokens and tokens > self.max_tokens // 2) or (self.max_messages and len(state.messages) - first > self.max_messages // 2)):
+            tokens -= state.messages[first][2]
+            first += 1
+
+        compacted, state.messages = state.messages[:first], state.messages[first:]
+        self.compacted += len(compacted)
+        return compacted
+
+    async def save(self, turn: Turn, reply: typing.Optional[str]):
+        """
+        Add the messages of a turn and the upstream's reply to its session.
+        """
+        state = turn.state
+        messages = turn.messages + ([turn.message("assistant", reply)] if reply is not None else [])
+        state.messages += messages
+        state.total += len(messages)
+        self.turns += 1
+
+        compacted = self._compact(state)
+        await self._set(turn.key, state)
+
+        if compacted and self.summarizer is not None:
+            task = asyncio.create_task(self._summarize(turn.key, state.summary, compacted))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def save_later(self, turn: Turn, reply: typing.Optional[str]):
+        """
+        `save` from a callback which can't await, e.g. at the end of a streamed response.
+        """
+        task = asyncio.get_running_loop().create_task(self.save(turn, reply))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _summarize(self, key: str, summary: typing.Optional[str], messages: typing.List[Message]):
+        try:
+            summary = await self.summarizer(summary, messages)
+        except Exception:
+            # The session goes on without the compacted messages.
+            logger.warning(f"Could not summarize {len(messages)} messages of a session", exc_info=True)
+            return
+
+        # The session was saved again meanwhile, only the summary is updated.
+        state = await self.get(key)
+        if state is not None:
+            state.summary = summary
+            await self._set(key, state)
+            self.summaries += 1
+
+    async def close(self):
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.backend is not None:
+            await self.backend.close()
+
+    def stats(self) -> typing.Dict[str, int]:
+        stats = {
+            "turns": self.turns,
+            "compacted": self.compacted,
+            "summaries": self.summaries,
+        }
+        # With a backend the LRU is unused, and backends don't count their entries.
+        if self.backend is None:
+            stats["entries"] = len(self.lru)
+            stats["bytes"] = self.lru.size
+
+        return stats
+
+
+async def summarize_with_model(summary: typing.Optional[str], messages: typing.List[Message]) -> str:
+    """
+    Fold messages into a session's summary with `NEXURA_SESSIONS_SUMMARY_MODEL`, through the OpenAI chat completions endpoint.
+    """
+    # Imported here, the providers import the request handling this module is part of.
+    from nexura.providers import nexura_provider
+    from nexura.providers.openai.endpoints.completions import CompletionsRequest, _SystemMessage, _UserMessage
+
+    transcript = "\n".join(f"{role}: {text}" for role, text, _ in messages)
+    if summary:
+        transcript = f"Earlier summary: {summary}\n\n{transcript}"
+
+    response = await nexura_provider.handle_typed_request("openai", "chat-completions", CompletionsRequest(
+        messages=[_SystemMessage(content=SUMMARY_PROMPT), _UserMessage(content=transcript)],
+        model=config.SESSIONS_SUMMARY_MODEL,
+        max_tokens=config.SESSIONS_SUMMARY_MAX_TOKENS,
+        temperature=0,
+    ))
+
+    return response.choices[0].message.content or ""
+
+
+def create_session_store() -> typing.Optional[SessionStore]:
+    if not config.SESSIONS_ENABLED:
+        return None
+
+    return SessionStore(
+        LRUCache(config.SESSIONS_MAX_ENTRIES, config.SESSIONS_MAX_BYTES, config.SESSIONS_TTL),
+        backend=create_backend(config.SESSIONS_BACKEND) if config.SESSIONS_BACKEND else None,
+        max_tokens=config.SESSIONS_MAX_TOKENS,
+        max_messages=config.SESSIONS_MAX_MESSAGES,
+        summarizer=summarize_with_model if config.SESSIONS_SUMMARY_MODEL else None,
+    )
+
+
+session_store = create_session_store()
@@ -0,0 +1,4 @@
+from nexura.state.server import main
+
+
+main()
@@ -0,0 +1,144 @@
+import asyncio
+import collections
+import socket
+import threading
+import typing
+
+from nexura.exceptions import StateError
+from nexura.state import protocol
+
+
+Reply = typing.Tuple[int, typing.List[bytes]]
+
+
+def _check(status: int, fields: typing.List[bytes]) -> Reply:
+    if status == protocol.ERROR:
+        raise StateError(fields[0].decode() if fields else "Unknown error")
+
+    return status, fields
+
+
+class StateClient():
+    """
+    Blocking client of the state daemon, for callers which can't await (the rate limiter). A request is a single round trip on a Unix socket, tens of microseconds.
+
+    The connection is opened on first use and reopened once if it was closed, e.g. by a daemon restart.
+    """
+    def __init__(self, path: str, timeout: float = 5.0):
+        self.path = path
+        self.timeout = timeout
+        self._socket: typing.Optional[socket.socket] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.path)
+        return sock
+
+    def _receive(self, sock: socket.socket, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionResetError("The state daemon closed the connection")
+            data += chunk
+
+        return bytes(data)
+
+    def _request(self, frame: bytes) -> Reply:
+        if self._socket is None:
+            self._socket = self._connect()
+
+        self._socket.sendall(frame)
+        length, status = protocol.HEADER.unpack(self._receive(self._socket, protocol.HEADER.size))
+        return status, protocol.decode(self._receive(self._socket, length))
+
+    def request(self, operation: int, *fields: bytes) -> Reply:
+        frame = protocol.encode(operation, *fields)
+        with self._lock:
+            try:
+                reply = self._request(frame)
+            except OSError:
+                # A stale connection, or a reply half read: start over on a new one.
+                self.close()
+                try:
+                    reply = self._request(frame)
+                except OSError as e:
+                    self.close()
+                    raise StateError(f"State daemon at {self.path} unavailable: {e}") from e
+
+        return _check(*reply)
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+class AsyncStateClient():
+    """
+    Client of the state daemon for the event loop, over a single connection per process.
+
+    Requests are pipelined: they are written as they come and their replies, which arrive in the same order, are read by a background task. Concurrent requests don't wait for each other's round trip.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._writer: typing.Optional[asyncio.StreamWriter] = None
+        self._reader_task: typing.Optional[asyncio.Task] = None
+        self._pending: typing.Deque[asyncio.Future] = collections.deque()
+        self._connecting: typing.Optional[asyncio.Lock] = None
+
+    async def _connect(self):
+        if self._connecting is None:
+            self._connecting = asyncio.Lock()
+
+        async with self._connecting:
+            if self._writer is not None:
+                return
+
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path)
+            except OSError as e:
+                raise StateError(f"State daemon at {self.path} unavailable: {e}") from e
+
+            self._writer = writer
+            self._reader_task = asyncio.create_task(self._read_replies(reader))
+
+    async def _read_replies(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                length, status = protocol.HEADER.unpack(await reader.readexactly(protocol.HEADER.size))
+                fields = protocol.decode(await reader.readexactly(length))
+                future = self._pending.popleft()
+                if not future.done():
+                    future.set_result((status, fields))
+        except (OSError, asyncio.IncompleteReadError) as e:
+            self._disconnect(StateError(f"Lost the connection to the state daemon at {self.path}: {e}"))
+
+    def _disconnect(self, error: Exception):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+        # Requests in flight fail, the next one reconnects.
+        while self._pending:
+            future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+
+    async def request(self, operation: int, *fields: bytes) -> Reply:
+        if self._writer is None:
+            await self._connect()
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(future)
+        self._writer.write(protocol.encode(operation, *fields))
+
+        return _check(*await future)
+
+    async def close(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        self._disconnect(StateError("State client closed"))
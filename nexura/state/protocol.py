@@ -0,0 +1,50 @@
+import struct
+import typing
+
+
+# Backend URLs pointing at the state daemon, e.g. `nexura+unix:///run/nexura/state.sock`.
+SCHEME = "nexura+unix://"
+
+# Operations, the first byte of every request.
+GET = 1
+SET = 2
+DELETE = 3
+INCR = 4
+GCRA = 5
+ADJUST = 6
+COUNTERS = 7
+CAS = 8
+
+# Statuses, the first byte of every response.
+OK = 0
+MISSING = 1
+ERROR = 2
+
+# Every frame is the length of its body and a code (operation or status), then fields, each prefixed by its length.
+HEADER = struct.Struct("!IB")
+_LENGTH = struct.Struct("!I")
+
+
+def socket_path(url: str) -> str:
+    return url.removeprefix(SCHEME)
+
+
+def encode(code: int, *fields: bytes) -> bytes:
+    body = b"".join(_LENGTH.pack(len(field)) + field for field in fields)
+    return HEADER.pack(len(body), code) + body
+
+
+def decode(body: bytes) -> typing.List[bytes]:
+    fields = []
+    offset = 0
+    while offset < len(body):
+        (length,) = _LENGTH.unpack_from(body, offset)
+        offset += _LENGTH.size
+        fields.append(body[offset:offset + length])
+        offset += length
+
+    return fields
+
+
+def number(value: float) -> bytes:
+    return repr(value).encode()
@@ -0,0 +1,136 @@
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import typing
+
+from nexura import config
+from nexura.caching.lru import LRUCache
+from nexura.ratelimit.backends import MemoryRateLimitBackend
+from nexura.state import protocol
+
+
+logger = logging.getLogger(__name__)
+
+
+class StateServer():
+    """
+    State shared by the worker processes of a host: a cache, counters and rate limit buckets, served on a Unix socket.
+
+    A single event loop owns all the state, so every operation is atomic without locks, and a worker's request is a round trip on the socket. Replies to requests pipelined on a connection are sent in order. The state lives in memory and is lost when the daemon stops, like a worker's own caches.
+    """
+    def __init__(self, path: str, max_entries: int = 100000, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.cache = LRUCache(max_entries, max_bytes)
+        self.counters: typing.Dict[str, float] = {}
+        self.buckets = MemoryRateLimitBackend()
+
+        self._connections: typing.Dict[asyncio.Task, asyncio.StreamWriter] = {}
+        self.requests = 0
+
+    def handle(self, operation: int, fields: typing.List[bytes]) -> bytes:
+        self.requests += 1
+        key = fields[0].decode() if fields else ""
+
+        if operation == protocol.GET:
+            value = self.cache.get(key)
+            return protocol.encode(protocol.MISSING) if value is None else protocol.encode(protocol.OK, value)
+
+        if operation == protocol.SET:
+            ttl = float(fields[2]) if fields[2] else None
+            self.cache.set(key, fields[1], ttl)
+            return protocol.encode(protocol.OK)
+
+        if operation == protocol.CAS:
+            # Set if the current value is the expected one, the fourth field, or if there's none without it.
+            expected = fields[3] if len(fields) > 3 else None
+            if self.cache.get(key) != expected:
+                return protocol.encode(protocol.OK, b"0")
+            ttl = float(fields[2]) if fields[2] else None
+            self.cache.set(key, fields[1], ttl)
+            return protocol.encode(protocol.OK, b"1")
+
+        if operation == protocol.DELETE:
+            self.cache.delete(key)
+            return protocol.encode(protocol.OK)
+
+        if operation == protocol.INCR:
+            value = self.counters[key] = self.counters.get(key, 0) + float(fields[1])
+            return protocol.encode(protocol.OK, protocol.number(value))
+
+        if operation == protocol.GCRA:
+            retry_after = self.buckets.update(key, float(fields[1]), float(fields[2]), float(fields[3]))
+            return protocol.encode(protocol.OK, protocol.number(retry_after))
+
+        if operation == protocol.ADJUST:
+            self.buckets.adjust(key, float(fields[1]))
+            return protocol.encode(protocol.OK)
+
+        if operation == protocol.COUNTERS:
+            # Counters whose name starts with the key, as name and value pairs.
+            return protocol.encode(protocol.OK, *(item for name, value in self.counters.items() if name.startswith(key) for item in (name.encode(), protocol.number(value))))
+
+        return protocol.encode(protocol.ERROR, f"Unknown operation {operation}".encode())
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            while True:
+                length, operation = protocol.HEADER.unpack(await reader.readexactly(protocol.HEADER.size))
+                fields = protocol.decode(await reader.readexactly(length))
+                try:
+                    reply = self.handle(operation, fields)
+                except (IndexError, ValueError, UnicodeDecodeError) as e:
+                    reply = protocol.encode(protocol.ERROR, f"Invalid request: {e}".encode())
+
+                writer.write(reply)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            del self._connections[task]
+            writer.close()
+
+    async def serve(self, stop: typing.Optional[asyncio.Event] = None):
+        if os.path.exists(self.path):
+            # Left by a daemon which didn't stop cleanly.
+            os.unlink(self.path)
+
+        server = await asyncio.start_unix_server(self._serve, self.path)
+        # Only the user running the gateway can connect.
+        os.chmod(self.path, 0o600)
+        logger.info(f"State daemon listening on {self.path}")
+
+        stop = stop or asyncio.Event()
+        try:
+            async with server:
+                await stop.wait()
+
+                # Closing the connections ends their handlers, rather than cancelling them mid-read.
+                for writer in self._connections.values():
+                    writer.close()
+                await asyncio.gather(*self._connections, return_exceptions=True)
+        finally:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+
+def main(argv: typing.Optional[typing.Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="State daemon shared by the worker processes of a host: cache, counters and rate limit buckets.")
+    parser.add_argument("path", nargs="?", default=config.STATE_SOCKET, help=f"Unix socket to listen on (default: {config.STATE_SOCKET})")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    server = StateServer(args.path, config.STATE_MAX_ENTRIES, config.STATE_MAX_BYTES)
+
+    async def run():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+
+        await server.serve(stop)
+
+    asyncio.run(run())
@@ -0,0 +1,206 @@
+import asyncio
+import dataclasses
+import logging
+import time
+import typing
+
+import orjson
+
+from nexura import config
+from nexura.exceptions import StateError
+from nexura.metrics import Metrics, metrics
+from nexura.providers import NexuraProvider, nexura_provider
+from nexura.providers.policy import OPEN, CircuitBreaker
+from nexura.state import protocol
+from nexura.state.client import AsyncStateClient
+from nexura.strategies.routing.stats import EndpointStats, RoutingStats, routing_stats
+from nexura.templates import SHARED, TemplateRegistry, TemplateStats, template_registry
+
+
+logger = logging.getLogger(__name__)
+
+# Prefixes of the daemon's counters and cache keys.
+METRICS_PREFIX = "metrics:"
+ROUTING_PREFIX = "routing:"
+TEMPLATES_PREFIX = "templates:"
+BREAKER_PREFIX = "breaker:"
+
+TEMPLATE_FIELDS = tuple(field.name for field in dataclasses.fields(TemplateStats))
+
+
+class StateSync():
+    """
+    Share the metrics, routing and template statistics and open circuits of a worker with the other workers of the host, through the state daemon.
+
+    Requests keep recording in process, without a round trip. Every `interval` seconds, the worker adds what it recorded since the previous exchange to the daemon's counters (`INCR`), publishes the circuits it opened and opens those opened by other workers. `/metrics`, `/routing/stats` and `/templates` first push the worker's latest values, then read the totals of all workers (`COUNTERS`).
+
+    Routing decisions still use the worker's own moving averages of latency and error rate, which can't be added up.
+    """
+    def __init__(self, path: str, providers: NexuraProvider, metrics: typing.Optional[Metrics], stats: RoutingStats, templates: typing.Optional[TemplateRegistry] = None, interval: float = 1.0):
+        self.providers = providers
+        self.metrics = metrics
+        self.stats = stats
+        self.templates = templates
+        self.interval = interval
+
+        self._client = AsyncStateClient(path)
+        # Values already added to the daemon's counters, by counter name.
+        self._pushed: typing.Dict[str, float] = {}
+        self._pushing: typing.Optional[asyncio.Lock] = None
+        self._task: typing.Optional[asyncio.Task] = None
+
+    def _values(self) -> typing.Iterator[typing.Tuple[str, float]]:
+        if self.metrics is not None:
+            for family, labels, index, value in self.metrics.values():
+                yield METRICS_PREFIX + orjson.dumps([family, labels, index]).decode(), value
+
+        for (provider_id, endpoint_id), stats in self.stats.endpoints.items():
+            for field in ("requests", "errors"):
+                yield ROUTING_PREFIX + orjson.dumps([provider_id, endpoint_id, field]).decode(), getattr(stats, field)
+
+        if self.templates is not None:
+            for owner, names in self.templates.templates.items():
+                for name, versions in names.items():
+                    for version, template in versions.items():
+                        for field in TEMPLATE_FIELDS:
+                            yield TEMPLATES_PREFIX + orjson.dumps([owner, name, version, field]).decode(), getattr(template.stats, field)
+
+    async def push(self):
+        """
+        Add the values recorded since the previous push to the daemon's counters. Those which failed are added by the next one.
+        """
+        if self._pushing is None:
+            self._pushing = asyncio.Lock()
+
+        # Concurrent pushes would add the same values twice.
+        async with self._pushing:
+            deltas = [(name, value - self._pushed.get(name, 0)) for name, value in self._values()]
+            deltas = [(name, delta) for name, delta in deltas if delta]
+            results = await asyncio.gather(*(self._client.request(protocol.INCR, name.encode(), protocol.number(delta)) for name, delta in deltas), return_exceptions=True)
+
+            error = None
+            for (name, delta), result in zip(deltas, results):
+                if isinstance(result, StateError):
+                    error = result
+                elif isinstance(result, BaseException):
+                    raise result
+                else:
+                    self._pushed[name] = self._pushed.get(name, 0) + delta
+
+            if error is not None:
+                logger.warning(f"Failed to share metrics with the state daemon: {error}")
+
+    async def _counters(self, prefix: str) -> typing.Iterator[typing.Tuple[typing.Any, float]]:
+        _, fields = await self._client.request(protocol.COUNTERS, prefix.encode())
+        # Names are a prefix above, then JSON.
+        return ((orjson.loads(fields[i].partition(b":")[2]), float(fields[i + 1])) for i in range(0, len(fields), 2))
+
+    async def shared_metrics(self) -> Metrics:
+        """
+        Metrics of all the workers, or of this one while the daemon is unreachable.
+        """
+        await self.push()
+        try:
+            counters = await self._counters(METRICS_PREFIX)
+        except StateError as e:
+            logger.warning(f"Serving this worker's metrics only: {e}")
+            return self.metrics
+
+        totals = Metrics(self.metrics.buckets)
+        for (family, labels, index), value in counters:
+            totals.add(family, tuple(labels), index, value)
+
+        return totals
+
+    async def shared_routing_stats(self) -> typing.Dict[str, typing.Any]:
+        """
+        Routing statistics of this worker, with the requests and errors of all the workers.
+        """
+        await self.push()
+        stats = self.stats.as_dict()
+        try:
+            counters = await self._counters(ROUTING_PREFIX)
+        except StateError as e:
+            logger.warning(f"Serving this worker's routing statistics only: {e}")
+            return stats
+
+        for (provider_id, endpoint_id, field), value in counters:
+            stats.setdefault(f"{provider_id}/{endpoint_id}", EndpointStats().as_dict())[field] = int(value)
+
+        return stats
+
+    async def shared_template_stats(self, owner: str) -> typing.Dict[str, typing.Any]:
+        """
+        Usage of the templates an API key can use, by all the workers.
+        """
+        await self.push()
+        stats = self.templates.stats(owner)
+        # The templates of the file first, those of the key replace them.
+        totals: typing.List[typing.Dict[str, TemplateStats]] = [{}, {}]
+        try:
+            for owner_, owner_totals in zip((SHARED, owner), totals):
+                # The owner's counters only: its JSON string, then the name.
+                prefix = TEMPLATES_PREFIX + orjson.dumps([owner_]).decode()[:-1] + ","
+                for (_, name, version, field), value in await self._counters(prefix):
+                    setattr(owner_totals.setdefault(f"{name}@{version}", TemplateStats()), field, int(value))
+        except StateError as e:
+            logger.warning(f"Serving this worker's template statistics only: {e}")
+            return stats
+
+        for owner_totals in totals:
+            stats.update((reference, template_stats.as_dict()) for reference, template_stats in owner_totals.items())
+
+        return stats
+
+    async def _exchange_breaker(self, breaker: CircuitBreaker):
+        key = f"{BREAKER_PREFIX}{breaker.provider_id}/{breaker.endpoint_id}".encode()
+        if breaker.state == OPEN:
+            # Until when it's open, as wall clock time since the workers' monotonic clocks differ.
+            retry_after = breaker.retry_after()
+            await self._client.request(protocol.SET, key, protocol.number(time.time() + retry_after), protocol.number(retry_after))
+        elif breaker.opened_at is None:
+            status, fields = await self._client.request(protocol.GET, key)
+            if status == protocol.OK:
+                breaker.open_for(float(fields[0]) - time.time())
+
+    async def exchange_breakers(self):
+        """
+        Publish the circuits this worker opened, and open those opened by other workers.
+        """
+        await asyncio.gather(*(self._exchange_breaker(endpoint.breaker) for endpoint in self.providers.routes.values() if endpoint.policy.breaker_threshold > 0))
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.push()
+                await self.exchange_breakers()
+            except StateError as e:
+                logger.warning(f"Failed to share circuit states with the state daemon: {e}")
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the background task, and push the values recorded since the last exchange.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        await self.push()
+        await self._client.close()
+
+
+def create_state_sync() -> typing.Optional[StateSync]:
+    if not config.STATE_BACKEND:
+        return None
+
+    if not config.STATE_BACKEND.startswith(protocol.SCHEME):
+        raise ValueError(f"Unsupported state backend {config.STATE_BACKEND}, expected {protocol.SCHEME}/path/to/state.sock")
+
+    return StateSync(protocol.socket_path(config.STATE_BACKEND), nexura_provider, metrics, routing_stats, template_registry, config.STATE_SYNC_INTERVAL)
+
+
+state_sync = create_state_sync()
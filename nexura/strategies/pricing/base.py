@@ -0,0 +1,221 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+import bisect
+import datetime
+import typing
+
+from nexura.exceptions import PriceNotFoundError
+
+if typing.TYPE_CHECKING:
+    import numpy as np
+
+
+def factorize(values: typing.Iterable[typing.Any]) -> typing.Tuple[typing.List[typing.Any], "np.ndarray"]:
+    """
+    Distinct values and the index of every value among them.
+
+    A single pass through dicts, which is several times faster than the sort of `np.unique` on millions of strings.
+    """
+    import numpy as np
+
+    values = values.tolist() if isinstance(values, np.ndarray) else list(values)
+    uniques = list(dict.fromkeys(values))
+    index = {value: i for i, value in enumerate(uniques)}
+
+    return uniques, np.fromiter(map(index.__getitem__, values), dtype=np.intp, count=len(values))
+
+
+@dataclass
+class IOPricing:
+    input_price: float
+    output_price: float
+
+
+@dataclass
+class PriceVersion:
+    # First day (UTC) the prices apply to.
+    effective_from: datetime.date
+    # Price of 1M tokens for each model, models missing from a version keep their previous price.
+    prices: typing.Dict[str, IOPricing]
+
+
+class PriceTable():
+    """
+    Prices of a provider's models over time, as a list of versions with effective dates.
+
+    Every version is resolved against the previous ones when the table is built, so a lookup is a binary search on the dates and a dict lookup.
+    """
+    def __init__(self, versions: typing.Iterable[PriceVersion]):
+        self.versions: typing.List[PriceVersion] = []
+
+        prices: typing.Dict[str, IOPricing] = {}
+        for version in sorted(versions, key=lambda version: version.effective_from):
+            prices = prices | version.prices
+            if self.versions and self.versions[-1].effective_from == version.effective_from:
+                self.versions[-1] = PriceVersion(version.effective_from, prices)
+            else:
+                self.versions.append(PriceVersion(version.effective_from, prices))
+
+        self.dates = [version.effective_from for version in self.versions]
+        self.models = sorted({model for version in self.versions for model in version.prices})
+
+    @classmethod
+    def from_dict(cls, versions: typing.Iterable[typing.Dict[str, typing.Any]]) -> "PriceTable":
+        """
+        Build a table from its JSON form: `[{"effective_from": "2024-10-02", "prices": {"gpt-4o": [2.5, 10.0]}}]`, prices being input and output prices of 1M tokens.
+        """
+        return cls(PriceVersion(
+            datetime.date.fromisoformat(version["effective_from"]),
+            {model: IOPricing(*price) if isinstance(price, (list, tuple)) else IOPricing(**price) for model, price in version["prices"].items()},
+        ) for version in versions)
+
+    def get(self, model: str, at: typing.Optional[datetime.date] = None) -> typing.Optional[IOPricing]:
+        """
+        Price of `model` on the day `at` (today by default), `None` if it had none.
+        """
+        index = bisect.bisect_right(self.dates, at or datetime.datetime.utcnow().date()) - 1
+        if index < 0:
+            return None
+
+        return self.versions[index].prices.get(model)
+
+    def matrices(self) -> typing.Tuple["np.ndarray", "np.ndarray"]:
+        """
+        Input and output prices of every version (rows) and model (columns, in `models` order), `NaN` where a model has no price.
+        """
+        import numpy as np
+
+        input_prices = np.full((len(self.versions), len(self.models)), np.nan)
+        output_prices = np.full((len(self.versions), len(self.models)), np.nan)
+        for i, version in enumerate(self.versions):
+            for j, model in enumerate(self.models):
+                price = version.prices.get(model)
+                if price is not None:
+                    input_prices[i, j], output_prices[i, j] = price.input_price, price.output_price
+
+        return input_prices, output_prices
+
+
+class PricingStrategy(ABC):
+    """
+    Price the requests sent to a single provider, one at a time or as a batch of ledger rows.
+    """
+    @abstractmethod
+    def calculate_cost(self, usage: typing.Mapping[str, typing.Any], model: typing.Optional[str], at: typing.Optional[datetime.date] = None) -> typing.Optional[float]:
+        """
+        Price of a request.
+
+        Args:
+            usage: Usage reported by the upstream (`prompt_tokens`, `completion_tokens`, and `cost` for providers reporting it).
+            model: The model used.
+            at: Day the request was sent, today by default.
+
+        Returns:
+            float: The price of the request, or `None` if it can't be priced.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def calculate_batch(
+        self,
+        models: "np.ndarray",
+        prompt_tokens: "np.ndarray",
+        completion_tokens: "np.ndarray",
+        at: typing.Optional["np.ndarray"] = None,
+        reported_costs: typing.Optional["np.ndarray"] = None,
+    ) -> "np.ndarray":
+        """
+        Price many requests at once, e.g. all the ledger rows of a month.
+
+        Args:
+            models: Model of every request.
+            prompt_tokens: Prompt tokens of every request.
+            completion_tokens: Completion tokens of every request.
+            at: Day of every request (`datetime64[D]`), today by default.
+            reported_costs: Cost reported by the upstream for every request, for providers reporting it.
+
+        Returns:
+            np.ndarray: Price of every request, `NaN` for requests which can't be priced.
+        """
+        raise NotImplementedError
+
+
+class TokenPricingStrategy(PricingStrategy):
+    """
+    Price requests from their tokens, with the per 1M tokens prices of a `PriceTable`.
+    """
+    def __init__(self, provider_id: str, table: PriceTable):
+        self.provider_id = provider_id
+        self.table = table
+
+    def calculate_price(self, prompt_tokens: int, completion_tokens: int, model: str, at: typing.Optional[datetime.date] = None) -> float:
+        """
+        Calculate the price of a request based on the number of tokens generated by the model and user.
+
+        Args:
+            prompt_tokens (int): The number of tokens provided by the user.
+            completion_tokens (int): The number of tokens generated by the model.
+            model (str): The model used to generate the tokens.
+            at (datetime.date): Day the request was sent, today by default.
+
+        Raises:
+            PriceNotFoundError: If the model had no price on that day.
+
+        Returns:
+            float: The price of the request.
+        """
+        pricing = self.table.get(model, at)
+        if pricing is None:
+            raise PriceNotFoundError(self.provider_id, model, at)
+
+        return (pricing.input_price / 1000000 * prompt_tokens) + (pricing.output_price / 1000000 * completion_tokens)
+
+    def calculate_cost(self, usage: typing.Mapping[str, typing.Any], model: typing.Optional[str], at: typing.Optional[datetime.date] = None) -> typing.Optional[float]:
+        return self.calculate_price(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0), model, at)
+
+    def calculate_batch(self, models, prompt_tokens, completion_tokens, at=None, reported_costs=None):
+        import numpy as np
+
+        # Models are mapped to columns once per distinct model rather than once per row.
+        names, codes = factorize(models)
+        columns = np.array([self._column(name) for name in names], dtype=np.intp)[codes]
+
+        if at is None:
+            at = np.full(len(columns), np.datetime64(datetime.datetime.utcnow().date(), "D"))
+        rows = np.searchsorted(np.array(self.table.dates, dtype="datetime64[D]"), np.asarray(at, dtype="datetime64[D]"), side="right") - 1
+
+        input_prices, output_prices = self.table.matrices()
+        # An extra NaN row and column for requests before the first version or with unknown models.
+        input_prices = np.pad(input_prices, ((0, 1), (0, 1)), constant_values=np.nan)
+        output_prices = np.pad(output_prices, ((0, 1), (0, 1)), constant_values=np.nan)
+
+        return (
+            np.asarray(prompt_tokens, dtype=np.float64) * input_prices[rows, columns]
+            + np.asarray(completion_tokens, dtype=np.float64) * output_prices[rows, columns]
+        ) / 1000000
+
+    def _column(self, model: str) -> int:
+        index = bisect.bisect_left(self.table.models, model)
+        if index < len(self.table.models) and self.table.models[index] == model:
+            return index
+
+        return -1
+
+
+class ReportedCostStrategy(PricingStrategy):
+    """
+    Use the cost the provider reports in its response, for providers billing by their own rules (e.g. EdenAI, which resells other providers).
+    """
+    def __init__(self, provider_id: str):
+        self.provider_id = provider_id
+
+    def calculate_cost(self, usage: typing.Mapping[str, typing.Any], model: typing.Optional[str], at: typing.Optional[datetime.date] = None) -> typing.Optional[float]:
+        return usage.get("cost")
+
+    def calculate_batch(self, models, prompt_tokens, completion_tokens, at=None, reported_costs=None):
+        import numpy as np
+
+        if reported_costs is None:
+            return np.full(len(prompt_tokens), np.nan)
+
+        return np.asarray(reported_costs, dtype=np.float64)
@@ -0,0 +1,11 @@
+from nexura.strategies.pricing.base import ReportedCostStrategy
+
+
+class EdenAIPricingStrategy(ReportedCostStrategy):
+    """
+    Pricing strategy for EdenAI.
+
+    EdenAI bills the requests it forwards to other providers at its own rates, and reports the `cost` of every result in its response.
+    """
+    def __init__(self):
+        super().__init__("edenai")
@@ -0,0 +1,116 @@
+import datetime
+import json
+import logging
+import typing
+
+from nexura import config
+from nexura.strategies.pricing.base import PriceTable, PriceVersion, PricingStrategy, TokenPricingStrategy, factorize
+from nexura.strategies.pricing.edenai import EdenAIPricingStrategy
+from nexura.strategies.pricing.openai import OpenAIPricingStrategy
+
+if typing.TYPE_CHECKING:
+    import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+# Strategies of the built-in providers, created with the price versions configured for them.
+BUILTIN_STRATEGIES: typing.Dict[str, typing.Callable[[typing.List[PriceVersion]], PricingStrategy]] = {
+    "openai": OpenAIPricingStrategy,
+    "edenai": lambda versions: EdenAIPricingStrategy(),
+}
+
+
+def load_price_versions(path: str) -> typing.Dict[str, typing.List[PriceVersion]]:
+    """
+    Read the price tables of `NEXURA_PRICING_PATH`, keyed by provider.
+    """
+    with open(path) as f:
+        tables = json.load(f)
+
+    return {provider_id: PriceTable.from_dict(versions).versions for provider_id, versions in tables.items()}
+
+
+class PricingEngine():
+    """
+    Pricing strategy of every provider.
+
+    Built-in providers have their own strategy, any other provider with a price table in `NEXURA_PRICING_PATH` is priced from its tokens. Strategies are created on first use.
+    """
+    def __init__(self, pricing_path: typing.Optional[str] = None):
+        self.pricing_path = pricing_path
+        self.strategies: typing.Dict[str, typing.Optional[PricingStrategy]] = {}
+        self._versions: typing.Optional[typing.Dict[str, typing.List[PriceVersion]]] = None
+
+    @property
+    def versions(self) -> typing.Dict[str, typing.List[PriceVersion]]:
+        if self._versions is None:
+            self._versions = load_price_versions(self.pricing_path) if self.pricing_path else {}
+
+        return self._versions
+
+    def register(self, provider_id: str, strategy: PricingStrategy):
+        self.strategies[provider_id] = strategy
+
+    def get(self, provider_id: str) -> typing.Optional[PricingStrategy]:
+        if provider_id in self.strategies:
+            return self.strategies[provider_id]
+
+        versions = self.versions.get(provider_id, [])
+        if provider_id in BUILTIN_STRATEGIES:
+            strategy = BUILTIN_STRATEGIES[provider_id](versions)
+        elif versions:
+            strategy = TokenPricingStrategy(provider_id, PriceTable(versions))
+        else:
+            logger.debug(f"No pricing strategy for provider {provider_id}, its requests aren't priced")
+            strategy = None
+
+        self.strategies[provider_id] = strategy
+        return strategy
+
+    def calculate_cost(self, provider_id: str, usage: typing.Mapping[str, typing.Any], model: typing.Optional[str], at: typing.Optional[datetime.date] = None) -> typing.Optional[float]:
+        strategy = self.get(provider_id)
+        return strategy.calculate_cost(usage, model, at) if strategy is not None else None
+
+    def calculate_batch(
+        self,
+        provider_ids: "np.ndarray",
+        models: "np.ndarray",
+        prompt_tokens: "np.ndarray",
+        completion_tokens: "np.ndarray",
+        at: typing.Optional["np.ndarray"] = None,
+        reported_costs: typing.Optional["np.ndarray"] = None,
+    ) -> "np.ndarray":
+        """
+        Price ledger rows of any providers at once, e.g. for month-end reconciliation. Rows are grouped by provider and every group is priced by its strategy in a single vectorized call.
+
+        Returns:
+            np.ndarray: Price of every row, `NaN` for rows which can't be priced.
+        """
+        import numpy as np
+
+        provider_ids, models = np.asarray(provider_ids), np.asarray(models)
+        prompt_tokens, completion_tokens = np.asarray(prompt_tokens), np.asarray(completion_tokens)
+        at = np.asarray(at, dtype="datetime64[D]") if at is not None else None
+        reported_costs = np.asarray(reported_costs, dtype=np.float64) if reported_costs is not None else None
+        costs = np.full(len(provider_ids), np.nan)
+
+        names, codes = factorize(provider_ids)
+        for i, provider_id in enumerate(names):
+            strategy = self.get(provider_id)
+            if strategy is None:
+                continue
+
+            rows = np.flatnonzero(codes == i) if len(names) > 1 else slice(None)
+            costs[rows] = strategy.calculate_batch(
+                models[rows],
+                prompt_tokens[rows],
+                completion_tokens[rows],
+                at[rows] if at is not None else None,
+                reported_costs[rows] if reported_costs is not None else None,
+            )
+
+        return costs
+
+
+pricing_engine = PricingEngine(config.PRICING_PATH)
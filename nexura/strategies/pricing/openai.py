@@ -1,42 +1,31 @@
+import datetime
 import typing
-from dataclasses import dataclass
 
-
-@dataclass
-class IOPricing:
-    input_price: float
-    output_price: float
+from nexura.strategies.pricing.base import IOPricing, PriceTable, PriceVersion, TokenPricingStrategy
 
 
 # 1M tokens pricing for each model supported by OpenAI.
-MODEL_PRICING_MAP: typing.Dict[str, float] = {
+MODEL_PRICING_MAP: typing.Dict[str, IOPricing] = {
     "gpt-4o": IOPricing(5.00, 15.00),
     "gpt-4o-mini": IOPricing(0.150, 0.600),
     "gpt-4": IOPricing(30.00, 30.00),
     "gpt-3.5-turbo": IOPricing(3.000, 6.000),
 }
 
+# Most tokens each model can generate in a single completion, what a request without `max_tokens` may use.
+MODEL_MAX_OUTPUT_TOKENS: typing.Dict[str, int] = {
+    "gpt-4o": 4096,
+    "gpt-4o-mini": 16384,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 4096,
+}
+
 
-class OpenAIPricingStrategy():
+class OpenAIPricingStrategy(TokenPricingStrategy):
     """
     Pricing strategy for OpenAI models.
 
-    OpenAI uses a token-based pricing model. This strategy calculates the price of a request based on the number of tokens generated by the model and user.
+    OpenAI uses a token-based pricing model. This strategy calculates the price of a request based on the number of tokens generated by the model and user, with `MODEL_PRICING_MAP` as the first version of its price table.
     """
-    def calculate_price(self, prompt_tokens: int, completion_tokens: int, model: str):
-        """
-        Calculate the price of a request based on the number of tokens generated by the model and user.
-
-        Args:
-            prompt_tokens (int): The number of tokens provided by the user.
-            completion_tokens (int): The number of tokens generated by the model.
-            model (str): The model used to generate the tokens.
-
-        Returns:
-            float: The price of the request.
-        """
-        model_pricing = MODEL_PRICING_MAP.get(model)
-        if model_pricing is None:
-            raise ValueError(f"Model {model} is not supported by OpenAI.")
-
-        return (model_pricing.input_price / 1000000 * prompt_tokens) + (model_pricing.output_price / 1000000 * completion_tokens)
+    def __init__(self, versions: typing.Iterable[PriceVersion] = ()):
+        super().__init__("openai", PriceTable([PriceVersion(datetime.date.min, MODEL_PRICING_MAP), *versions]))
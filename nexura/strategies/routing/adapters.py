@@ -0,0 +1,70 @@
+import time
+import typing
+import uuid
+
+import httpx
+import orjson
+
+from nexura.providers.edenai.endpoints.chat import ChatRequest, _PreviousHistory
+from nexura.providers.openai.endpoints.completions import CompletionsRequest
+
+
+def edenai_chat_answers_completions(body: CompletionsRequest) -> bool:
+    """
+    Whether EdenAI chat can stand in for a chat completions request: it neither streams nor returns several choices.
+    """
+    return not body.stream and (body.n or 1) == 1
+
+
+def completions_to_edenai_chat(body: CompletionsRequest) -> ChatRequest:
+    """
+    Convert an OpenAI chat completions request to an EdenAI chat request running the same OpenAI model.
+
+    System messages become the `chatbot_global_action`, the last user message the `text`, and the others the `previous_history`.
+    """
+    system = [m.content for m in body.messages if m.role == "system"]
+    conversation = [m for m in body.messages if m.role != "system"]
+
+    text = None
+    if conversation and conversation[-1].role == "user":
+        text = conversation.pop().content
+
+    return ChatRequest(
+        providers=f"openai/{body.model}",
+        fallback_providers=[],
+        text=text,
+        chatbot_global_action="\n".join(system) or None,
+        previous_history=[_PreviousHistory(role=m.role, message=m.content or "") for m in conversation],
+        temperature=body.temperature if body.temperature is not None else 0,
+        max_tokens=body.max_tokens or 1000,
+    )
+
+
+def edenai_chat_to_completions(body: CompletionsRequest, response: httpx.Response) -> httpx.Response:
+    """
+    Convert the response of an EdenAI chat request made by `completions_to_edenai_chat` to an OpenAI chat completion.
+
+    A result EdenAI reports as failed is answered with `502`, and error statuses are relayed as is.
+    """
+    if response.status_code != 200:
+        return response
+
+    data = orjson.loads(response.content)
+    results = [result for result in (data if isinstance(data, list) else data.values()) if isinstance(result, dict)]
+    result = next((result for result in results if result.get("status") == "success"), None)
+    if result is None:
+        error = next((result.get("error") for result in results if result.get("error")), None) or {}
+        message = error.get("message") if isinstance(error, dict) else str(error)
+        content = {"error": {"message": message or "EdenAI chat failed", "type": "upstream_error"}}
+        return httpx.Response(502, json=content, extensions=response.extensions)
+
+    usage = result.get("usage") or {}
+    content = {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": result.get("generated_text") or ""}, "finish_reason": "stop", "logprobs": None}],
+        "usage": {key: usage.get(key) or 0 for key in ("prompt_tokens", "completion_tokens", "total_tokens")},
+    }
+    return httpx.Response(200, headers={"content-type": "application/json"}, content=orjson.dumps(content), extensions=response.extensions)
@@ -0,0 +1,106 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+import time
+import typing
+
+import httpx
+
+from nexura.exceptions import CircuitOpenError
+from nexura.strategies.routing.stats import RoutingStats, routing_stats
+
+
+# Upstream statuses after which another provider should be tried.
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+# Errors after which another provider should be tried.
+UPSTREAM_ERRORS = (httpx.HTTPError, CircuitOpenError)
+
+
+@dataclass
+class Target:
+    provider_id: str
+    endpoint_id: str
+    # Converts the incoming request body to the request type of this endpoint, when it differs from the first target.
+    transform: typing.Optional[typing.Callable[[typing.Any], typing.Any]] = None
+    # Static weight, multiplied by the live score in weighted routing.
+    weight: float = 1.0
+    # Converts a response of this endpoint back to the response type of the first target, from the incoming request body and the response.
+    transform_response: typing.Optional[typing.Callable[[typing.Any, typing.Any], typing.Any]] = None
+    # Whether this endpoint can answer an incoming request, e.g. not a streamed one if it can't stream. Targets which can't are skipped.
+    accepts: typing.Optional[typing.Callable[[typing.Any], bool]] = None
+
+    def prepare(self, body: typing.Any) -> typing.Any:
+        return self.transform(body) if self.transform is not None else body
+
+    def can_answer(self, body: typing.Any) -> bool:
+        return self.accepts is None or self.accepts(body)
+
+
+class RoutingStrategy(ABC):
+    """
+    Dispatch a single request to one or more provider endpoints.
+
+    The first target defines the request and response types of the strategy, other targets convert the request with their `transform` and their response with `transform_response`.
+    """
+    def __init__(self, targets: typing.List[Target], stats: RoutingStats = routing_stats):
+        if not targets:
+            raise ValueError("Routing strategy requires at least one target")
+
+        self.targets = targets
+        self.stats = stats
+
+    def targets_for(self, body: typing.Any) -> typing.List[Target]:
+        """
+        Targets which can answer a request, in order. The first target answers every request.
+        """
+        return [target for target in self.targets if target.can_answer(body)]
+
+    @staticmethod
+    def is_failure(response: typing.Any) -> bool:
+        return response.status_code in RETRYABLE_STATUS_CODES
+
+    async def call(self, registry, target: Target, body: typing.Any):
+        """
+        Send the request to a single target, recording its latency and outcome.
+        """
+        stats = self.stats.get(target.provider_id, target.endpoint_id)
+        start = time.perf_counter()
+        try:
+            response = await registry.handle_request(target.provider_id, target.endpoint_id, body=target.prepare(body))
+        except UPSTREAM_ERRORS:
+            stats.observe(time.perf_counter() - start, error=True)
+            raise
+
+        if target.transform_response is not None:
+            response = target.transform_response(body, response)
+            # It has the first target's schema now, it's accounted like that target's responses.
+            first = self.targets[0]
+            response.extensions["nexura_endpoint"] = registry.get_route(first.provider_id, first.endpoint_id)
+            response.extensions["nexura_body"] = body
+
+        stats.observe(time.perf_counter() - start, error=self.is_failure(response))
+        return response
+
+    async def call_in_order(self, registry, targets: typing.Iterable[Target], body: typing.Any):
+        """
+        Try targets one after another until one succeeds. The last failed response is returned, or the last error raised, if all of them fail.
+        """
+        response = None
+        error: typing.Optional[Exception] = None
+        for target in targets:
+            try:
+                response = await self.call(registry, target, body)
+            except UPSTREAM_ERRORS as e:
+                error = e
+                continue
+
+            if not self.is_failure(response):
+                return response
+
+        if response is None and error is not None:
+            raise error
+
+        return response
+
+    @abstractmethod
+    async def handle_request(self, registry, body: typing.Any):
+        raise NotImplementedError
@@ -0,0 +1,11 @@
+import typing
+
+from nexura.strategies.routing.base import RoutingStrategy
+
+
+class FallbackStrategy(RoutingStrategy):
+    """
+    Send the request to the first target, and to the next ones in order only if the previous failed (network error, timeout, 429 or 5xx).
+    """
+    async def handle_request(self, registry, body: typing.Any):
+        return await self.call_in_order(registry, self.targets_for(body), body)
@@ -0,0 +1,93 @@
+import asyncio
+import typing
+
+from nexura.strategies.routing.base import UPSTREAM_ERRORS, RoutingStrategy, Target
+from nexura.strategies.routing.stats import RoutingStats, routing_stats
+
+
+class HedgedStrategy(RoutingStrategy):
+    """
+    Send the request to the first target and, if it hasn't answered within its p95 latency, also to the next one. The first successful response wins and the requests still running are cancelled.
+
+    A failed response launches the next target right away. Without latency samples yet, `default_delay` is used.
+    """
+    def __init__(
+        self,
+        targets: typing.List[Target],
+        stats: RoutingStats = routing_stats,
+        *,
+        default_delay: float = 1.0,
+        min_delay: float = 0.05,
+        quantile: float = 0.95,
+    ):
+        super().__init__(targets, stats)
+
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.quantile = quantile
+
+    def delay(self, target: Target) -> float:
+        latency = self.stats.get(target.provider_id, target.endpoint_id).percentile(self.quantile)
+        return max(self.min_delay, latency) if latency is not None else self.default_delay
+
+    @staticmethod
+    async def _discard(response: typing.Any):
+        # A losing streamed response holds an open upstream connection.
+        aclose = getattr(response, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    async def handle_request(self, registry, body: typing.Any):
+        targets = self.targets_for(body)
+        launched = 0
+        pending: typing.Set[asyncio.Task] = set()
+
+        def launch():
+            nonlocal launched
+            pending.add(asyncio.ensure_future(self.call(registry, targets[launched], body)))
+            launched += 1
+
+        launch()
+        winner = None
+        failed_response = None
+        error: typing.Optional[Exception] = None
+        try:
+            while pending and winner is None:
+                timeout = self.delay(targets[launched - 1]) if launched < len(targets) else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    launch()
+                    continue
+
+                for task in done:
+                    if task.exception() is not None:
+                        if not isinstance(task.exception(), UPSTREAM_ERRORS):
+                            raise task.exception()
+                        error = task.exception()
+                        continue
+
+                    response = task.result()
+                    if winner is not None:
+                        await self._discard(response)
+                    elif not self.is_failure(response):
+                        winner = response
+                    else:
+                        # Only the latest failed response is kept, to be returned if every target fails.
+                        if failed_response is not None:
+                            await self._discard(failed_response)
+                        failed_response = response
+
+                if winner is None and launched < len(targets):
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if winner is not None:
+            if failed_response is not None:
+                await self._discard(failed_response)
+            return winner
+        if failed_response is not None:
+            return failed_response
+
+        raise error
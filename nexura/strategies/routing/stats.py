@@ -0,0 +1,64 @@
+from collections import deque
+import typing
+
+
+class EndpointStats():
+    """
+    Live latency and error statistics of a single provider endpoint.
+
+    Latency and error rate are exponentially weighted moving averages, so they follow an upstream degrading or recovering within a few requests. Percentiles are computed from a window of the most recent latencies.
+    """
+    def __init__(self, alpha: float = 0.2, window: int = 256):
+        self.alpha = alpha
+
+        self.latency: typing.Optional[float] = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+
+        self._latencies: typing.Deque[float] = deque(maxlen=window)
+
+    def observe(self, latency: float, error: bool = False):
+        self.requests += 1
+        if error:
+            self.errors += 1
+        else:
+            # Failures are often fast (connection refused, 503), they shouldn't make an upstream look quicker.
+            self.latency = latency if self.latency is None else self.alpha * latency + (1 - self.alpha) * self.latency
+            self._latencies.append(latency)
+
+        self.error_rate = self.alpha * float(error) + (1 - self.alpha) * self.error_rate
+
+    def percentile(self, q: float) -> typing.Optional[float]:
+        if not self._latencies:
+            return None
+
+        latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "latency": self.latency,
+            "p95": self.percentile(0.95),
+            "error_rate": self.error_rate,
+            "requests": self.requests,
+            "errors": self.errors,
+        }
+
+
+class RoutingStats():
+    def __init__(self):
+        self.endpoints: typing.Dict[typing.Tuple[str, str], EndpointStats] = {}
+
+    def get(self, provider_id: str, endpoint_id: str) -> EndpointStats:
+        stats = self.endpoints.get((provider_id, endpoint_id))
+        if stats is None:
+            stats = self.endpoints[(provider_id, endpoint_id)] = EndpointStats()
+
+        return stats
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+        return {f"{provider_id}/{endpoint_id}": stats.as_dict() for (provider_id, endpoint_id), stats in self.endpoints.items()}
+
+
+routing_stats = RoutingStats()
@@ -0,0 +1,36 @@
+import random
+import typing
+
+from nexura.strategies.routing.base import RoutingStrategy, Target
+
+
+class LatencyWeightedStrategy(RoutingStrategy):
+    """
+    Pick a target at random, weighted by its live EWMA latency and error rate, and fall back to the others by decreasing score.
+
+    Targets without any traffic yet get the best observed latency, so they are explored instead of starved.
+    """
+    # Penalty exponent applied to the success rate, 4 means a 10% error rate costs about a third of the traffic.
+    ERROR_PENALTY = 4
+
+    def score(self, target: Target, default_latency: float) -> float:
+        stats = self.stats.get(target.provider_id, target.endpoint_id)
+        latency = stats.latency if stats.latency is not None else default_latency
+
+        return target.weight / max(latency, 1e-3) * (1 - stats.error_rate) ** self.ERROR_PENALTY
+
+    def order(self, targets: typing.List[Target]) -> typing.List[Target]:
+        latencies = [
+            stats.latency for stats in (self.stats.get(t.provider_id, t.endpoint_id) for t in targets)
+            if stats.latency is not None
+        ]
+        default_latency = min(latencies) if latencies else 1.0
+
+        scores = [self.score(target, default_latency) for target in targets]
+        first = random.choices(range(len(targets)), weights=scores)[0] if sum(scores) > 0 else 0
+        rest = sorted((i for i in range(len(targets)) if i != first), key=lambda i: scores[i], reverse=True)
+
+        return [targets[first]] + [targets[i] for i in rest]
+
+    async def handle_request(self, registry, body: typing.Any):
+        return await self.call_in_order(registry, self.order(self.targets_for(body)), body)
@@ -0,0 +1,254 @@
+from dataclasses import dataclass, field
+import json
+import logging
+import sys
+import typing
+
+import orjson
+from pydantic import ValidationError
+
+from nexura import config
+from nexura.caching.backends import CacheBackend, create_backend
+from nexura.exceptions import TemplateError, TemplateNotFoundError
+
+if typing.TYPE_CHECKING:
+    from nexura.providers.endpoint import Endpoint
+
+
+logger = logging.getLogger(__name__)
+
+# Owner of the templates loaded from `NEXURA_TEMPLATES_PATH`, which every API key can use.
+SHARED = ""
+
+
+@dataclass
+class TemplateContent:
+    # System prompt put first in the requests using the template.
+    system: typing.Optional[str] = None
+    # Tool definitions (`name`, `description` and JSON Schema `parameters`), offered before the request's own.
+    tools: typing.Optional[typing.List[typing.Dict[str, typing.Any]]] = None
+
+
+@dataclass
+class TemplateStats:
+    # Requests the template was expanded in.
+    requests: int = 0
+    # Bytes of the template clients didn't send.
+    bytes_saved: int = 0
+    # Upstream responses reporting their usage, and those with part of the prompt read from the provider's prompt cache.
+    responses: int = 0
+    hits: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "requests": self.requests,
+            "bytes_saved": self.bytes_saved,
+            "responses": self.responses,
+            "prefix_hits": self.hits,
+            "prefix_hit_rate": self.hits / self.responses if self.responses else None,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cached_token_share": self.cached_tokens / self.prompt_tokens if self.prompt_tokens else None,
+        }
+
+
+@dataclass
+class Template:
+    name: str
+    version: int
+    content: TemplateContent
+    # Bytes of the content, as clients would have sent it.
+    size: int = 0
+    stats: TemplateStats = field(default_factory=TemplateStats)
+
+    @property
+    def reference(self) -> str:
+        return f"{self.name}@{self.version}"
+
+
+class TemplateRegistry():
+    """
+    Versioned system prompts and tool definitions, referenced by requests as `name@version` and expanded by the gateway.
+
+    Versions are immutable, so a template is the same byte for byte in every request using it, and it's put first: the prompt prefix providers cache (OpenAI caches prompts of 1024 tokens and more, in steps of 128) is then shared by all those requests. Texts are interned, every request shares a single copy.
+
+    Templates belong to the API key that registered them, and those of the file loaded at startup to every key. With a backend, registered templates are stored there, so every worker finds them: a version is stored only if it doesn't exist yet and the latest version only moves forward, both atomically, so workers registering concurrently can't replace each other's. Immutable versions are then kept in process once read, only bare names look up the latest version in the backend.
+    """
+    def __init__(self, backend: typing.Optional[CacheBackend] = None):
+        # By owner, name and version.
+        self.templates: typing.Dict[str, typing.Dict[str, typing.Dict[int, Template]]] = {}
+        self.backend = backend
+
+    @staticmethod
+    def _key(owner: str, name: str, version: typing.Optional[int] = None) -> str:
+        # The latest version of a template without `version`.
+        return "template:" + orjson.dumps([owner, name] if version is None else [owner, name, version]).decode()
+
+    def _intern(self, owner: str, name: str, version: int, content: TemplateContent) -> Template:
+        if content.system:
+            content.system = sys.intern(content.system)
+        template = Template(name, version, content, len(orjson.dumps(content)))
+        self.templates.setdefault(owner, {}).setdefault(name, {})[version] = template
+
+        return template
+
+    async def _find(self, owner: str, name: str, version: int) -> typing.Optional[Template]:
+        template = self.templates.get(owner, {}).get(name, {}).get(version)
+        if template is None and self.backend is not None:
+            data = await self.backend.get(self._key(owner, name, version))
+            if data is not None:
+                template = self._intern(owner, name, version, TemplateContent(**orjson.loads(data)))
+
+        return template
+
+    async def _latest(self, owner: str, name: str) -> typing.Optional[int]:
+        if self.backend is not None:
+            data = await self.backend.get(self._key(owner, name))
+            return int(data) if data is not None else None
+
+        versions = self.templates.get(owner, {}).get(name)
+        return max(versions) if versions else None
+
+    async def add(self, owner: str, name: str, version: int, content: TemplateContent) -> typing.Tuple[Template, bool]:
+        """
+        Register a version of a template for an API key.
+
+        Returns:
+            Tuple[Template, bool]: The template, and whether it's new rather than registered already with the same content.
+
+        Raises:
+            TemplateError: The template is empty, or this version exists with another content.
+        """
+        if not content.system and not content.tools:
+            raise TemplateError(f"Template {name}@{version} has neither a system prompt nor tools")
+
+        existing = await self._find(owner, name, version)
+        if existing is None and self.backend is not None:
+            if not await self.backend.compare_and_set(self._key(owner, name, version), None, orjson.dumps(content)):
+                # Another worker registered this version first.
+                existing = await self._find(owner, name, version)
+
+        if existing is not None:
+            if existing.content != content:
+                raise TemplateError(f"Template {name}@{version} already exists with another content, register a new version")
+            return existing, False
+
+        template = self._intern(owner, name, version, content)
+        if self.backend is not None:
+            await self._advance_latest(owner, name, version)
+
+        return template, True
+
+    async def _advance_latest(self, owner: str, name: str, version: int):
+        key = self._key(owner, name)
+        while True:
+            latest = await self.backend.get(key)
+            if latest is not None and int(latest) >= version:
+                return
+            # Retried when another worker moved it meanwhile, to a version which may be later.
+            if await self.backend.compare_and_set(key, latest, str(version).encode()):
+                return
+
+    async def get(self, owner: str, reference: str) -> Template:
+        """
+        A template of an API key, or loaded from the file, by `name@version`, or its latest version for a bare `name`.
+        """
+        name, _, version = reference.partition("@")
+        template = None
+        if not version:
+            latest = await self._latest(owner, name)
+            if latest is not None:
+                template = await self._find(owner, name, latest)
+            elif self.templates.get(SHARED, {}).get(name):
+                versions = self.templates[SHARED][name]
+                template = versions[max(versions)]
+        elif version.isdigit():
+            template = await self._find(owner, name, int(version)) or self.templates.get(SHARED, {}).get(name, {}).get(int(version))
+
+        if template is None:
+            raise TemplateNotFoundError(reference)
+
+        return template
+
+    def load(self, path: str):
+        """
+        Register the templates of a JSON file, `{"name": {"1": {"system": "...", "tools": [...]}}}`, for every API key. Each worker loads the file, they aren't written to the backend.
+        """
+        with open(path) as f:
+            templates = json.load(f)
+
+        for name, versions in templates.items():
+            for version, content in versions.items():
+                content = TemplateContent(**content)
+                if not content.system and not content.tools:
+                    raise TemplateError(f"Template {name}@{version} has neither a system prompt nor tools")
+                self._intern(SHARED, name, int(version), content)
+
+        logger.info(f"Loaded {sum(len(versions) for versions in templates.values())} templates from {path}")
+
+    async def expand(self, owner: str, endpoint: "Endpoint", body: typing.Any, references: str) -> typing.Tuple[typing.Any, typing.List[Template]]:
+        """
+        Put the templates referenced by a request (comma separated `name@version`) first in it, system prompts and tools in the order given.
+
+        Raises:
+            TemplateNotFoundError: A template doesn't exist.
+            TemplateError: The endpoint can't use the templates.
+        """
+        templates = [await self.get(owner, reference.strip()) for reference in references.split(",") if reference.strip()]
+        system = "\n".join(template.content.system for template in templates if template.content.system) or None
+        tools = [tool for template in templates for tool in template.content.tools or []] or None
+
+        try:
+            expanded = endpoint.with_template(body, system, tools)
+        except ValidationError as e:
+            raise TemplateError(f"Invalid tools in templates {references}: {e}")
+        if expanded is None:
+            raise TemplateError(f"Endpoint {endpoint.id} of provider {endpoint.provider.id} doesn't support {'tool' if tools else 'system prompt'} templates")
+
+        for template in templates:
+            template.stats.requests += 1
+            template.stats.bytes_saved += template.size
+
+        return expanded, templates
+
+    @staticmethod
+    def observe(templates: typing.List[Template], usage: typing.Dict[str, typing.Any]):
+        """
+        Account the usage of a response to the templates of its request, prompt cache hits included.
+        """
+        prompt_tokens = usage.get("prompt_tokens") or 0
+        # OpenAI-compatible APIs report the tokens read from their prompt cache.
+        cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        for template in templates:
+            stats = template.stats
+            stats.responses += 1
+            stats.prompt_tokens += prompt_tokens
+            stats.cached_tokens += cached_tokens
+            if cached_tokens:
+                stats.hits += 1
+
+    def stats(self, owner: str) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+        """
+        Usage of the templates an API key can use, in this process.
+        """
+        return {template.reference: template.stats.as_dict() for owner_ in (SHARED, owner) for versions in self.templates.get(owner_, {}).values() for template in versions.values()}
+
+    async def close(self):
+        if self.backend is not None:
+            await self.backend.close()
+
+
+def create_template_registry() -> typing.Optional[TemplateRegistry]:
+    if not config.TEMPLATES_ENABLED:
+        return None
+
+    registry = TemplateRegistry(create_backend(config.TEMPLATES_BACKEND) if config.TEMPLATES_BACKEND else None)
+    if config.TEMPLATES_PATH:
+        registry.load(config.TEMPLATES_PATH)
+
+    return registry
+
+
+template_registry = create_template_registry()
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import os
+import typing
+
+from nexura import config
+from nexura.tokenization.tokenizers import CL100K_PATTERN, O200K_PATTERN, BPETokenizer, HeuristicTokenizer, Tokenizer, TiktokenTokenizer
+
+
+logger = logging.getLogger(__name__)
+
+# Vocabulary used by each model.
+MODEL_ENCODINGS: typing.Dict[str, str] = {
+    "gpt-4o": "o200k_base",
+    "gpt-4o-mini": "o200k_base",
+    "gpt-4": "cl100k_base",
+    "gpt-3.5-turbo": "cl100k_base",
+}
+
+ENCODING_PATTERNS: typing.Dict[str, str] = {
+    "o200k_base": O200K_PATTERN,
+    "cl100k_base": CL100K_PATTERN,
+}
+
+# Tokens added by the chat format: for every message, and to prime the assistant's reply.
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_NAME = 1
+TOKENS_PER_REPLY = 3
+
+_tokenizers: typing.Dict[str, Tokenizer] = {}
+
+
+def register_tokenizer(name: str, tokenizer: Tokenizer):
+    """
+    Use `tokenizer` for a model or an encoding (e.g. `gpt-4o` or `o200k_base`), instead of the one found by `get_tokenizer`.
+    """
+    _tokenizers[name] = tokenizer
+
+
+def _load_tokenizer(encoding: str) -> Tokenizer:
+    if config.TOKENIZER_DIR:
+        path = os.path.join(config.TOKENIZER_DIR, f"{encoding}.tiktoken")
+        if os.path.exists(path):
+            return BPETokenizer.from_file(path, ENCODING_PATTERNS.get(encoding, CL100K_PATTERN))
+
+    try:
+        return TiktokenTokenizer(encoding)
+    except Exception as e:
+        # Not installed, or its vocabulary couldn't be downloaded.
+        logger.warning(f"No vocabulary for {encoding} ({e}), token counts are estimated from the text length")
+        return HeuristicTokenizer()
+
+
+async def load_tokenizers(encodings: typing.Optional[typing.Iterable[str]] = None):
+    """
+    Load the vocabularies of `encodings`, all those of `MODEL_ENCODINGS` by default, in a thread: `tiktoken` may download them, which mustn't block the event loop. Called at startup, so requests find them loaded.
+    """
+    for encoding in encodings or sorted(set(MODEL_ENCODINGS.values())):
+        if encoding not in _tokenizers:
+            _tokenizers[encoding] = await asyncio.to_thread(_load_tokenizer, encoding)
+
+
+def get_tokenizer(model: str) -> Tokenizer:
+    """
+    Tokenizer of a model, loaded once and shared.
+
+    Vocabularies are looked for in `NEXURA_TOKENIZER_DIR` (`{encoding}.tiktoken` files), then through the optional `tiktoken` package. Without any, tokens are estimated from the text length.
+    """
+    tokenizer = _tokenizers.get(model)
+    if tokenizer is not None:
+        return tokenizer
+
+    encoding = MODEL_ENCODINGS.get(model, "cl100k_base")
+    tokenizer = _tokenizers.get(encoding)
+    if tokenizer is None:
+        # Only outside of the app, where `load_tokenizers` didn't run.
+        tokenizer = _tokenizers[encoding] = _load_tokenizer(encoding)
+
+    _tokenizers[model] = tokenizer
+    return tokenizer
+
+
+def count_chat_tokens(model: str, messages: typing.Sequence[typing.Sequence[typing.Optional[str]]], names: int = 0) -> int:
+    """
+    Count the prompt tokens of a chat conversation.
+
+    Args:
+        model: The model the conversation is sent to.
+        messages: Texts of every message: its role, content and name if any.
+        names: Number of messages with a `name`.
+
+    Returns:
+        int: Tokens of all messages, including the chat format overhead.
+    """
+    # All texts are counted in a single call, so tokenizers can batch them.
+    texts = [text for message in messages for text in message if text]
+    return sum(get_tokenizer(model).count_many(texts)) + TOKENS_PER_MESSAGE * len(messages) + TOKENS_PER_NAME * names + TOKENS_PER_REPLY
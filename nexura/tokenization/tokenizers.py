@@ -0,0 +1,138 @@
+from abc import ABC, abstractmethod
+import base64
+import math
+import re
+import typing
+
+
+# Pre-tokenization patterns of OpenAI's encodings, translated for the `re` module which has no `\p{...}` classes: letters are `[^\W\d_]` and numbers `\d`.
+# Pieces are identical to the original ones for text using the Latin alphabet, and close for other scripts.
+CL100K_PATTERN = r"""'(?i:[sdmt]|ll|ve|re)|(?:[^\r\n\w]|_)?+[^\W\d_]+|\d{1,3}| ?(?:[^\s\w]|_)++[\r\n]*|\s*[\r\n]|\s+(?!\S)|\s+"""
+
+_UPPER = r"[A-ZÀ-ÖØ-Þ]"
+_LOWER = r"[^\W\d_A-ZÀ-ÖØ-Þ]"
+_CONTRACTION = r"(?i:'s|'t|'re|'ve|'m|'ll|'d)?"
+O200K_PATTERN = "|".join([
+    rf"(?:[^\r\n\w]|_)?{_UPPER}*{_LOWER}+{_CONTRACTION}",
+    rf"(?:[^\r\n\w]|_)?{_UPPER}+{_LOWER}*{_CONTRACTION}",
+    r"\d{1,3}",
+    r" ?(?:[^\s\w]|_)+[\r\n/]*",
+    r"\s*[\r\n]+",
+    r"\s+(?!\S)",
+    r"\s+",
+])
+
+
+class Tokenizer(ABC):
+    @abstractmethod
+    def count(self, text: str) -> int:
+        raise NotImplementedError
+
+    def count_many(self, texts: typing.Sequence[str]) -> typing.List[int]:
+        """
+        Count the tokens of many texts at once, e.g. all the messages of a conversation.
+        """
+        return [self.count(text) for text in texts]
+
+
+class HeuristicTokenizer(Tokenizer):
+    """
+    Estimate tokens from the length of the text, used when no vocabulary is available for a model.
+    """
+    def __init__(self, chars_per_token: float = 4.0):
+        self.chars_per_token = chars_per_token
+
+    def count(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token)
+
+
+class BPETokenizer(Tokenizer):
+    """
+    Byte pair encoding tokenizer, compatible with the vocabularies of `tiktoken` (e.g. `cl100k_base.tiktoken`).
+
+    Text is first split into pieces (words, numbers, punctuation), each piece is then encoded separately. Pieces repeat a lot in practice, so their token counts are cached, which makes counting a conversation mostly a regex scan and dict lookups.
+    """
+    def __init__(self, ranks: typing.Dict[bytes, int], pattern: str = CL100K_PATTERN, max_cache: int = 100000):
+        self.ranks = ranks
+        self.pattern = re.compile(pattern)
+        self.max_cache = max_cache
+        self._counts: typing.Dict[str, int] = {}
+
+    @classmethod
+    def from_file(cls, path: str, pattern: str = CL100K_PATTERN, **kwargs) -> "BPETokenizer":
+        """
+        Load a vocabulary in the `tiktoken` format: one base64 encoded token and its rank per line.
+        """
+        ranks = {}
+        with open(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    token, rank = line.split()
+                    ranks[base64.b64decode(token)] = int(rank)
+
+        return cls(ranks, pattern, **kwargs)
+
+    def _merge(self, piece: bytes) -> typing.List[bytes]:
+        parts = [piece[i:i + 1] for i in range(len(piece))]
+        ranks = self.ranks
+        while len(parts) > 1:
+            # Merge the adjacent pair with the lowest rank, until no pair is in the vocabulary.
+            best_rank, best = None, -1
+            for i in range(len(parts) - 1):
+                rank = ranks.get(parts[i] + parts[i + 1])
+                if rank is not None and (best_rank is None or rank < best_rank):
+                    best_rank, best = rank, i
+
+            if best_rank is None:
+                break
+
+            parts[best:best + 2] = [parts[best] + parts[best + 1]]
+
+        return parts
+
+    def encode(self, text: str) -> typing.List[int]:
+        tokens = []
+        for piece in self.pattern.findall(text):
+            encoded = piece.encode()
+            rank = self.ranks.get(encoded)
+            if rank is not None:
+                tokens.append(rank)
+            else:
+                tokens.extend(self.ranks[part] for part in self._merge(encoded))
+
+        return tokens
+
+    def count(self, text: str) -> int:
+        counts = self._counts
+        total = 0
+        for piece in self.pattern.findall(text):
+            count = counts.get(piece)
+            if count is None:
+                encoded = piece.encode()
+                count = 1 if encoded in self.ranks else len(self._merge(encoded))
+                if len(counts) >= self.max_cache:
+                    counts.clear()
+                counts[piece] = count
+
+            total += count
+
+        return total
+
+
+class TiktokenTokenizer(Tokenizer):
+    """
+    Exact counts from OpenAI's `tiktoken`, requires the optional `tiktoken` package (and its vocabulary files, downloaded on first use).
+    """
+    def __init__(self, encoding_name: str):
+        try:
+            import tiktoken
+        except ImportError as e:
+            raise ImportError("TiktokenTokenizer requires the `tiktoken` package, install it with `pip install tiktoken`") from e
+
+        self.encoding = tiktoken.get_encoding(encoding_name)
+
+    def count(self, text: str) -> int:
+        return len(self.encoding.encode_ordinary(text))
+
+    def count_many(self, texts: typing.Sequence[str]) -> typing.List[int]:
+        return [len(tokens) for tokens in self.encoding.encode_ordinary_batch(list(texts))]
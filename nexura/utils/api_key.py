@@ -0,0 +1,19 @@
+import hashlib
+import secrets
+import typing
+
+from fastapi import Request
+
+
+def generate_apikey() -> str:
+    return secrets.token_urlsafe(32)
+
+
+def hash_apikey(key: str) -> str:
+    # Keys are 256 random bits, so a fast hash is enough, there is nothing to brute force.
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def bearer_token(request: Request) -> typing.Optional[str]:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    return token if scheme.lower() == "bearer" and token else None
@@ -1,12 +1,17 @@
 from dataclasses import dataclass
+from functools import cache
 
-from simple_parsing.docstring import get_attribute_docstring, AttributeDocString
 from typing import get_type_hints
 from dataclasses import asdict
 
 
 # https://stackoverflow.com/questions/66239221/how-to-access-a-dataclass-docstring-and-comments
+# Reading the comments means parsing the source of the class, so it's done once per dataclass. Don't mutate the returned dict.
+@cache
 def get_dataclass_attributes_doc(some_dataclass):
+    # Only needed to generate the docs, so it isn't imported with every request dataclass.
+    from simple_parsing.docstring import get_attribute_docstring, AttributeDocString
+
     def get_attribute_unified_doc(some_dataclass, key):
         """Returns a string that chains the above-comment, inline-comment and docstring """
         all_docstrings: AttributeDocString = get_attribute_docstring(some_dataclass, key)
@@ -0,0 +1,145 @@
+from dataclasses import fields, is_dataclass
+import json
+import typing
+
+import orjson
+from pydantic import TypeAdapter
+
+
+_decoder = json.JSONDecoder()
+
+_encoders: typing.Dict[type, typing.Callable[[typing.Any], typing.Dict[str, typing.Any]]] = {}
+_adapters: typing.Dict[typing.Any, TypeAdapter] = {}
+
+
+def _encode_any(value: typing.Any) -> typing.Any:
+    # Fallback for values whose type isn't known statically, e.g. members of a union of dataclasses.
+    encoder = _encoders.get(type(value))
+    if encoder is not None:
+        return encoder(value)
+    if is_dataclass(value) and not isinstance(value, type):
+        return compile_encoder(type(value))(value)
+    if isinstance(value, list):
+        return [_encode_any(item) for item in value]
+
+    return value
+
+
+def _strip_optional(_type: typing.Any) -> typing.Any:
+    if typing.get_origin(_type) is typing.Union:
+        args = [arg for arg in typing.get_args(_type) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+
+    return _type
+
+
+def _value_expression(_type: typing.Any, var: str, namespace: typing.Dict[str, typing.Any], depth: int = 0) -> str:
+    """
+    Python expression converting `var`, of type `_type`, to JSON compatible values.
+    """
+    _type = _strip_optional(_type)
+    origin = typing.get_origin(_type)
+
+    if is_dataclass(_type):
+        name = f"_encode_{_type.__name__}_{id(_type)}"
+        namespace[name] = compile_encoder(_type)
+        return f"{name}({var})"
+
+    if origin is list:
+        item = f"_i{depth}"
+        expression = _value_expression(typing.get_args(_type)[0], item, namespace, depth + 1)
+        return var if expression == item else f"[{expression} for {item} in {var}]"
+
+    if origin is dict:
+        item = f"_v{depth}"
+        expression = _value_expression(typing.get_args(_type)[1], item, namespace, depth + 1)
+        return var if expression == item else f"{{_k{depth}: {expression} for _k{depth}, {item} in {var}.items()}}"
+
+    if origin is typing.Union and any(is_dataclass(arg) or typing.get_origin(arg) is list for arg in typing.get_args(_type)):
+        return f"_encode_any({var})"
+
+    # str, int, float, bool, Literal, Any: passed through as is.
+    return var
+
+
+def compile_encoder(cls: type) -> typing.Callable[[typing.Any], typing.Dict[str, typing.Any]]:
+    """
+    Generate a function converting instances of the dataclass `cls` to dicts, leaving out `None` fields.
+
+    Unlike `dataclasses.asdict` it doesn't deep copy values and doesn't inspect types at runtime, each field is converted by code specialized for its annotated type.
+    """
+    encoder = _encoders.get(cls)
+    if encoder is not None:
+        return encoder
+
+    # Registered before compiling the fields, so recursive dataclasses refer to themselves.
+    namespace: typing.Dict[str, typing.Any] = {"_encode_any": _encode_any}
+    _encoders[cls] = lambda obj: _encoders[cls](obj)
+
+    hints = typing.get_type_hints(cls)
+    lines = ["def encode(obj):", "    d = {}"]
+    for field in fields(cls):
+        lines.append(f"    v = obj.{field.name}")
+        lines.append("    if v is not None:")
+        lines.append(f"        d[{field.name!r}] = {_value_expression(hints[field.name], 'v', namespace)}")
+    lines.append("    return d")
+
+    exec("\n".join(lines), namespace)
+    encoder = _encoders[cls] = namespace["encode"]
+    encoder.__qualname__ = f"encode_{cls.__name__}"
+
+    return encoder
+
+
+def encode(obj: typing.Any) -> typing.Any:
+    """
+    Convert a dataclass (or a list of them) to JSON compatible values, leaving out `None` fields.
+    """
+    return _encode_any(obj)
+
+
+def dumps(obj: typing.Any) -> bytes:
+    return orjson.dumps(encode(obj))
+
+
+def get_adapter(_type: typing.Any) -> TypeAdapter:
+    """
+    pydantic-core validator of `_type`, built once per type.
+    """
+    adapter = _adapters.get(_type)
+    if adapter is None:
+        adapter = _adapters[_type] = TypeAdapter(_type)
+
+    return adapter
+
+
+def loads(_type: typing.Any, data: typing.Union[str, bytes]) -> typing.Any:
+    """
+    Parse and validate JSON straight into `_type` (e.g. a request or response dataclass), in a single pass.
+    """
+    return get_adapter(_type).validate_json(data)
+
+
+def peek_field(content: bytes, name: str) -> typing.Any:
+    """
+    Decode only the value of the last `name` key of a JSON document, e.g. the `usage` OpenAI-compatible APIs send after the choices.
+
+    Quotes inside JSON strings are always escaped, so the searched `"name":` can't match string contents. It can still match a key of a nested object, so only use it for keys appearing last at the top level.
+
+    Returns:
+        Any: The decoded value, or `None` if the key isn't there.
+    """
+    key = f'"{name}"'.encode()
+    start = content.rfind(key)
+    while start != -1:
+        colon = content.find(b":", start + len(key))
+        # Only whitespace between the key and the colon, otherwise it's a string value equal to `name`.
+        if colon != -1 and not content[start + len(key):colon].strip():
+            tail = content[colon + 1:].decode()
+            value, _ = _decoder.raw_decode(tail, len(tail) - len(tail.lstrip()))
+            return value
+
+        start = content.rfind(key, 0, start)
+
+    return None